@@ -1,18 +1,54 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+import json
+import os
 import threading
-import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
 from web_search_functions import (
+    SEARCH_ENGINE,
+    live_search,
     search_part_number_in_system_general_limited,
     search_part_number_in_dataio,
     search_part_number_in_bpmicro
 )
+from browser_pool import browser_pool_stats
+from http_client import direct_backend_stats
+from result_cache import result_cache_stats, single_flight_stats
+from prewarm import prewarm_stats, start_prewarm_scheduler
+from catalog import catalog_stats, get_catalog
+from asset_cache import asset_cache_stats
+from request_filter import request_filter_stats
+from wait_engine import wait_stats
+from batch_search import BatchJobs, csv_header, csv_line, parse_part_list
+from part_normalize import clean_part_number
+from variation_search import VariationHints
 
 app = Flask(__name__)
 
 # Store search results temporarily
 search_status = {}
 
+# (website key, display name, search function) in the order results are shown
+VENDORS = [
+    ('systemgeneral', 'System General', search_part_number_in_system_general_limited),
+    ('dataio', 'DataIO', search_part_number_in_dataio),
+    ('bpmicro', 'BPMicro', search_part_number_in_bpmicro),
+]
+
+# Maximum number of vendors searched at the same time for one search
+SEARCH_CONCURRENCY = int(os.environ.get('SEARCH_CONCURRENCY', '3'))
+
+# 'all' waits for every selected vendor, 'first_hit' stops at the first match
+SEARCH_MODES = ('all', 'first_hit')
+
+# BOM batch searches over the same vendor searches
+batch_jobs = BatchJobs(VENDORS)
+
+# Off-peak refresh of the most requested parts (only when PREWARM=1)
+start_prewarm_scheduler({key: partial(live_search, key) for key, _, _ in VENDORS})
+
 @app.route('/')
 def index():
     """Serve the main page"""
@@ -23,8 +59,10 @@ def search_devices():
     """API endpoint to start device search"""
     try:
         data = request.get_json()
-        part_number = data.get('part_number', '').strip()
+        part_number = clean_part_number(data.get('part_number', ''))
         websites = data.get('websites', [])
+        mode = data.get('mode', 'all')
+        no_cache = bool(data.get('no_cache', False))
         
         if not part_number:
             return jsonify({'error': 'Part number is required'}), 400
@@ -32,8 +70,11 @@ def search_devices():
         if not websites:
             return jsonify({'error': 'At least one website must be selected'}), 400
         
-        # Generate unique search ID
-        search_id = f"search_{int(time.time() * 1000)}"
+        if mode not in SEARCH_MODES:
+            return jsonify({'error': f"Unknown search mode '{mode}'"}), 400
+        
+        # Unique per request, even for identical searches started in the same millisecond
+        search_id = f"search_{uuid.uuid4().hex}"
         
         # Initialize search status
         search_status[search_id] = {
@@ -41,13 +82,14 @@ def search_devices():
             'progress': 0,
             'results': [],
             'current_search': '',
+            'mode': mode,
             'start_time': datetime.now().isoformat()
         }
         
         # Start search in background thread
         search_thread = threading.Thread(
             target=perform_search,
-            args=(search_id, part_number, websites)
+            args=(search_id, part_number, websites, mode, no_cache)
         )
         search_thread.daemon = True
         search_thread.start()
@@ -65,139 +107,243 @@ def get_search_status(search_id):
     
     return jsonify(search_status[search_id])
 
-def perform_search(search_id, part_number, websites):
+@app.route('/api/suggest', methods=['GET'])
+def suggest_part_numbers():
+    """Typeahead for the part number input from the local catalog"""
+    prefix = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    catalog = get_catalog()
+    if catalog is None or len(prefix) < 2:
+        return jsonify({'suggestions': []})
+    return jsonify({'suggestions': catalog.suggest(prefix, limit)})
+
+@app.route('/api/batch', methods=['POST'])
+def start_batch():
+    """Start a batch search over a list of part numbers, pasted text or an uploaded CSV"""
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            data = request.form
+            part_numbers = parse_part_list(upload.read().decode('utf-8-sig', errors='replace'))
+            websites = [key for value in data.getlist('websites') for key in value.split(',')]
+            no_cache = data.get('no_cache', '').lower() in ('1', 'true', 'on')
+        else:
+            data = request.get_json() or {}
+            part_numbers = data.get('part_numbers')
+            if not isinstance(part_numbers, list):
+                part_numbers = parse_part_list(part_numbers or data.get('text', ''))
+            websites = data.get('websites', [])
+            no_cache = bool(data.get('no_cache', False))
+        mode = data.get('mode', 'all')
+        
+        if mode not in SEARCH_MODES:
+            return jsonify({'error': f"Unknown search mode '{mode}'"}), 400
+        
+        batch_id = batch_jobs.create(part_numbers, websites, mode, no_cache)
+        return jsonify(batch_jobs.status(batch_id))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """Progress, throughput and ETA of a batch plus the rows completed after sequence number ?after="""
+    status = batch_jobs.status(batch_id)
+    if status is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    try:
+        after = int(request.args.get('after', 0))
+    except ValueError:
+        return jsonify({'error': 'after must be a number'}), 400
+    status['rows'] = batch_jobs.rows(batch_id, after)
+    return jsonify(status)
+
+@app.route('/api/batch/<batch_id>/results.<fmt>', methods=['GET'])
+def download_batch(batch_id, fmt):
+    """Batch rows as JSON lines or CSV; ?follow=1 streams the rows still to come as they complete"""
+    status = batch_jobs.status(batch_id)
+    if status is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    if fmt not in ('jsonl', 'csv'):
+        return jsonify({'error': f"Unknown format '{fmt}'"}), 400
+    follow = request.args.get('follow', '').lower() in ('1', 'true', 'yes')
+    websites = status['websites']
+    
+    def generate():
+        if fmt == 'csv':
+            yield csv_header(websites, {key: name for key, name, _ in VENDORS})
+        for row in batch_jobs.iter_rows(batch_id, follow=follow):
+            yield csv_line(row, websites) if fmt == 'csv' else json.dumps(row) + '\n'
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    headers = {} if follow else {'Content-Disposition': f'attachment; filename={batch_id}.{fmt}'}
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+@app.route('/api/batch/<batch_id>/cancel', methods=['POST'])
+def cancel_batch(batch_id):
+    """Stop a running batch, keeping the rows it completed"""
+    if batch_jobs.status(batch_id) is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    if not batch_jobs.cancel(batch_id):
+        return jsonify({'error': 'Batch is not running'}), 409
+    return jsonify(batch_jobs.status(batch_id))
+
+@app.route('/api/batch/<batch_id>/resume', methods=['POST'])
+def resume_batch(batch_id):
+    """Search the remaining parts of a cancelled or interrupted batch"""
+    if batch_jobs.status(batch_id) is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    if not batch_jobs.resume(batch_id):
+        return jsonify({'error': 'Batch is running or already completed'}), 409
+    return jsonify(batch_jobs.status(batch_id))
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Expose browser pool, warm page, direct backend, wait, request filter, asset cache and batch counters for monitoring"""
+    stats = {
+        'search_engine': SEARCH_ENGINE,
+        'browser_pool': browser_pool_stats(),
+        'direct_backends': direct_backend_stats(),
+        'result_cache': result_cache_stats(),
+        'single_flight': single_flight_stats(),
+        'prewarm': prewarm_stats(),
+        'catalog': catalog_stats(),
+        'waits': wait_stats(),
+        'request_filter': request_filter_stats(),
+        'asset_cache': asset_cache_stats(),
+        'batch': batch_jobs.stats(),
+    }
+    if SEARCH_ENGINE == 'async':
+        from async_engine import get_search_engine
+        stats['async_engine'] = get_search_engine().stats()
+    return jsonify(stats)
+
+def _build_result(website_name, part_number, result, meta=None):
+    """Turn a vendor search return value into the status JSON entry"""
+    meta = meta or {}
+    if result:
+        socket_info, actual_part = result
+        return {
+            'website': website_name,
+            'status': 'found',
+            'socket_info': socket_info,
+            'part_used': actual_part,
+            'modified': actual_part != part_number,
+            'chars_removed': len(part_number) - len(actual_part) if actual_part != part_number else 0,
+            'cached': meta.get('cached', False),
+            'stale': meta.get('stale', False),
+            'coalesced': meta.get('coalesced', False),
+            'catalog': meta.get('catalog', False),
+            'alternates': meta.get('alternates', []),
+            'probes_saved': meta.get('probes_saved', 0),
+            'hinted_by': meta.get('hinted_by')
+        }
+    return {
+        'website': website_name,
+        'status': 'not_found',
+        'socket_info': None,
+        'part_used': part_number,
+        'modified': False,
+        'chars_removed': 0,
+        'cached': meta.get('cached', False),
+        'stale': meta.get('stale', False),
+        'coalesced': meta.get('coalesced', False)
+    }
+
+def _error_result(website_name, part_number, error):
+    return {
+        'website': website_name,
+        'status': 'error',
+        'error': str(error),
+        'socket_info': None,
+        'part_used': part_number,
+        'modified': False,
+        'chars_removed': 0
+    }
+
+def _skipped_result(website_name, part_number):
+    return {
+        'website': website_name,
+        'status': 'skipped',
+        'socket_info': None,
+        'part_used': part_number,
+        'modified': False,
+        'chars_removed': 0
+    }
+
+def perform_search(search_id, part_number, websites, mode='all', no_cache=False):
     """Perform the actual search operations in background"""
     try:
         status = search_status[search_id]
         status['current_search'] = f'Starting search for part number: {part_number}'
         
-        results = []
-        total_websites = len(websites)
+        # Keep the UI order stable regardless of which vendor finishes first
+        selected = [vendor for vendor in VENDORS if vendor[0] in websites]
+        completed = {}
         
-        # Search System General if selected
-        if 'systemgeneral' in websites:
-            status['current_search'] = '🔍 Searching System General...'
-            status['progress'] = (len(results) / total_websites) * 100
-            
-            try:
-                result = search_part_number_in_system_general_limited(part_number)
-                if result:
-                    socket_info, actual_part = result
-                    results.append({
-                        'website': 'System General',
-                        'status': 'found',
-                        'socket_info': socket_info,
-                        'part_used': actual_part,
-                        'modified': actual_part != part_number,
-                        'chars_removed': len(part_number) - len(actual_part) if actual_part != part_number else 0
-                    })
-                else:
-                    results.append({
-                        'website': 'System General',
-                        'status': 'not_found',
-                        'socket_info': None,
-                        'part_used': part_number,
-                        'modified': False,
-                        'chars_removed': 0
-                    })
-            except Exception as e:
-                results.append({
-                    'website': 'System General',
-                    'status': 'error',
-                    'error': str(e),
-                    'socket_info': None,
-                    'part_used': part_number,
-                    'modified': False,
-                    'chars_removed': 0
-                })
-        
-        # Search DataIO if selected
-        if 'dataio' in websites:
-            status['current_search'] = '🔍 Searching DataIO...'
-            status['progress'] = (len(results) / total_websites) * 100
-            
-            try:
-                result = search_part_number_in_dataio(part_number)
-                if result:
-                    socket_info, actual_part = result
-                    results.append({
-                        'website': 'DataIO',
-                        'status': 'found',
-                        'socket_info': socket_info,
-                        'part_used': actual_part,
-                        'modified': actual_part != part_number,
-                        'chars_removed': len(part_number) - len(actual_part) if actual_part != part_number else 0
-                    })
-                else:
-                    results.append({
-                        'website': 'DataIO',
-                        'status': 'not_found',
-                        'socket_info': None,
-                        'part_used': part_number,
-                        'modified': False,
-                        'chars_removed': 0
-                    })
-            except Exception as e:
-                results.append({
-                    'website': 'DataIO',
-                    'status': 'error',
-                    'error': str(e),
-                    'socket_info': None,
-                    'part_used': part_number,
-                    'modified': False,
-                    'chars_removed': 0
-                })
-        
-        # Search BPMicro if selected
-        if 'bpmicro' in websites:
-            status['current_search'] = '🔍 Searching BPMicro...'
-            status['progress'] = (len(results) / total_websites) * 100
-            
+        def publish():
+            status['results'] = [completed[key] for key, _, _ in selected if key in completed]
+            status['progress'] = (len(completed) / len(selected)) * 100 if selected else 100
+            running = [name for key, name, _ in selected if key not in completed]
+            if running:
+                status['current_search'] = f"🔍 Searching {', '.join(running)}..."
+        
+        if selected:
+            publish()
+            # In first_hit mode the first match cancels the vendors still running
+            cancel_event = threading.Event()
+            # Variations that matched at one vendor are tried early by the others
+            hints = VariationHints()
+            metas = {key: {} for key, _, _ in selected}
+            executor = ThreadPoolExecutor(max_workers=max(1, min(SEARCH_CONCURRENCY, len(selected))))
             try:
-                result = search_part_number_in_bpmicro(part_number)
-                if result:
-                    socket_info, actual_part = result
-                    results.append({
-                        'website': 'BPMicro',
-                        'status': 'found',
-                        'socket_info': socket_info,
-                        'part_used': actual_part,
-                        'modified': actual_part != part_number,
-                        'chars_removed': len(part_number) - len(actual_part) if actual_part != part_number else 0
-                    })
-                else:
-                    results.append({
-                        'website': 'BPMicro',
-                        'status': 'not_found',
-                        'socket_info': None,
-                        'part_used': part_number,
-                        'modified': False,
-                        'chars_removed': 0
-                    })
-            except Exception as e:
-                results.append({
-                    'website': 'BPMicro',
-                    'status': 'error',
-                    'error': str(e),
-                    'socket_info': None,
-                    'part_used': part_number,
-                    'modified': False,
-                    'chars_removed': 0
-                })
+                futures = {
+                    executor.submit(
+                        search_function, part_number,
+                        cancel_event=cancel_event, no_cache=no_cache, meta=metas[key], hints=hints
+                    ): (key, website_name)
+                    for key, website_name, search_function in selected
+                }
+                for future in as_completed(futures):
+                    key, website_name = futures[future]
+                    try:
+                        completed[key] = _build_result(website_name, part_number, future.result(), metas[key])
+                    except Exception as e:
+                        completed[key] = _error_result(website_name, part_number, e)
+                    if mode == 'first_hit' and completed[key]['status'] == 'found':
+                        cancel_event.set()
+                        for other_key, other_name, _ in selected:
+                            if other_key not in completed:
+                                completed[other_key] = _skipped_result(other_name, part_number)
+                        publish()
+                        break
+                    publish()
+            finally:
+                # Cancelled vendors close their pages in the background
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        results = status['results']
         
         # Update final status
         status['status'] = 'completed'
         status['progress'] = 100
-        status['results'] = results
         status['current_search'] = 'Search completed!'
         status['end_time'] = datetime.now().isoformat()
         
         # Check if any results were found
         found_results = [r for r in results if r['status'] == 'found']
+        skipped_results = [r for r in results if r['status'] == 'skipped']
         status['summary'] = {
-            'total_searched': len(results),
+            'total_searched': len(results) - len(skipped_results),
+            'skipped_count': len(skipped_results),
             'found_count': len(found_results),
-            'has_results': len(found_results) > 0
+            'has_results': len(found_results) > 0,
+            'probes_saved': sum(r.get('probes_saved', 0) for r in found_results)
         }
         
     except Exception as e:
@@ -0,0 +1,475 @@
+"""On-disk cache of vendor static assets and persisted browser storage state.
+
+Every pooled or async browser context starts empty, so each search used to
+download the same vendor scripts and stylesheets again and repeat the
+first-visit cookie setup. Two things now carry over between contexts and
+process restarts:
+
+- Assets: GET responses for scripts, stylesheets and iframe documents are
+  kept in ASSET_CACHE_DIR, bodies stored once per content hash, and served
+  back through context.route(). They are fresh for their Cache-Control
+  max-age, or ASSET_CACHE_TTL seconds for scripts and styles without one.
+  Expired entries are revalidated with If-None-Match/If-Modified-Since.
+  no-store responses and documents without max-age or validators are never
+  kept. Least recently used bodies are evicted beyond ASSET_CACHE_MAX_BYTES.
+- Storage state: cookies and localStorage of each vendor's context are
+  saved to STORAGE_STATE_DIR/<vendor>.json when it closes (at most every
+  STORAGE_STATE_SAVE_INTERVAL seconds) and loaded into its next context,
+  unless older than STORAGE_STATE_MAX_AGE. Concurrent contexts share the
+  file, so session cookies (no expiry, or a known session id such as
+  ASP.NET_SessionId) are left out: each context starts its own session.
+
+navigation_timer() times the search form loads (page.goto plus the iframe
+waits). A load is warm when the cache served at least one asset during it,
+cold otherwise, and both are reported as 'asset_cache' in /api/stats.
+ASSET_CACHE=0 and STORAGE_STATE=0 turn the two parts off.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+ASSET_CACHE_ENABLED = os.environ.get("ASSET_CACHE", "1").lower() not in ("0", "false", "no")
+ASSET_CACHE_DIR = os.environ.get("ASSET_CACHE_DIR", os.path.join(_HERE, "asset_cache"))
+ASSET_CACHE_MAX_BYTES = int(os.environ.get("ASSET_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+ASSET_CACHE_TTL = float(os.environ.get("ASSET_CACHE_TTL", "3600"))
+STORAGE_STATE_ENABLED = os.environ.get("STORAGE_STATE", "1").lower() not in ("0", "false", "no")
+STORAGE_STATE_DIR = os.environ.get("STORAGE_STATE_DIR", os.path.join(_HERE, "storage_state"))
+STORAGE_STATE_MAX_AGE = float(os.environ.get("STORAGE_STATE_MAX_AGE", str(7 * 24 * 3600)))
+STORAGE_STATE_SAVE_INTERVAL = float(os.environ.get("STORAGE_STATE_SAVE_INTERVAL", "300"))
+
+CACHEABLE_TYPES = ("script", "stylesheet", "document")
+# Response headers replayed with a cached body
+KEPT_HEADERS = ("content-type", "access-control-allow-origin", "etag", "last-modified")
+
+_MAX_AGE_PATTERN = re.compile(r"max-age\s*=\s*(\d+)")
+
+# Persistent cookies that still identify one server-side session
+SESSION_COOKIE_PREFIXES = ("asp.net_sessionid", ".aspxauth", "__requestverificationtoken", "jsessionid", "phpsessid")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    fresh_until REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_last_used ON assets (last_used);
+CREATE INDEX IF NOT EXISTS assets_digest ON assets (digest);
+"""
+
+
+class AssetCache:
+    """SQLite index of url -> content-addressed body file"""
+
+    def __init__(self, directory=ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_BYTES, ttl=ASSET_CACHE_TTL):
+        self.directory = directory
+        self.max_bytes = max(1, max_bytes)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._stats = {"stores": 0, "evictions": 0, "not_cacheable": 0}
+
+    def _connection(self):
+        # A forked worker must not reuse its parent's connection
+        if self._db is None or self._pid != os.getpid():
+            os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), timeout=30,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def lookup(self, url):
+        """(headers, fresh, digest) of a cached url, or None"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT headers, fresh_until, digest FROM assets WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1] > time.time(), row[2]
+
+    def read(self, url, digest):
+        """The cached body, None when its file is gone"""
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                body = f.read()
+        except OSError:
+            with self._lock:
+                self._connection().execute("DELETE FROM assets WHERE url = ?", (url,))
+                self._connection().commit()
+            return None
+        with self._lock:
+            self._connection().execute("UPDATE assets SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._connection().commit()
+        return body
+
+    def freshness(self, resource_type, headers):
+        """Seconds a response stays fresh, None when it must not be stored"""
+        cache_control = (headers.get("cache-control") or "").lower()
+        if "no-store" in cache_control:
+            return None
+        max_age = _MAX_AGE_PATTERN.search(cache_control)
+        if "no-cache" in cache_control:
+            lifetime = 0
+        elif max_age:
+            lifetime = int(max_age.group(1))
+        elif resource_type == "document":
+            lifetime = 0
+        else:
+            lifetime = self.ttl
+        if lifetime == 0 and not (headers.get("etag") or headers.get("last-modified")):
+            # Nothing to revalidate with, storing it would never pay off
+            return None
+        return lifetime
+
+    def store(self, url, resource_type, headers, body):
+        lifetime = self.freshness(resource_type, headers)
+        if lifetime is None or len(body) > self.max_bytes // 10:
+            with self._lock:
+                self._stats["not_cacheable"] += 1
+            return False
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        kept = {name: headers[name] for name in KEPT_HEADERS if headers.get(name)}
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO assets (url, digest, size, headers, fresh_until, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, len(body), json.dumps(kept), now + lifetime, now),
+            )
+            db.commit()
+            self._stats["stores"] += 1
+            self._evict(db)
+        return True
+
+    def refresh(self, url, resource_type, headers):
+        """Extend an entry after a 304 Not Modified"""
+        lifetime = self.freshness(resource_type, headers) or 0
+        with self._lock:
+            self._connection().execute(
+                "UPDATE assets SET fresh_until = ? WHERE url = ?", (time.time() + lifetime, url)
+            )
+            self._connection().commit()
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+        while total > self.max_bytes:
+            row = db.execute("SELECT url, digest, size FROM assets ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            url, digest, size = row
+            db.execute("DELETE FROM assets WHERE url = ?", (url,))
+            if db.execute("SELECT 1 FROM assets WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+                try:
+                    os.remove(self._object_path(digest))
+                except OSError:
+                    pass
+            total -= size
+            self._stats["evictions"] += 1
+        db.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM assets"
+            ).fetchone()
+        return dict(self._stats, entries=entries, bytes=size, max_bytes=self.max_bytes)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_vendor_stats = {}
+_contexts = {}
+_state_saved = {}
+
+
+def get_asset_cache():
+    """The process-wide AssetCache, None when ASSET_CACHE=0"""
+    global _cache
+    if not ASSET_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AssetCache()
+        return _cache
+
+
+def _count(vendor, name, amount=1):
+    with _stats_lock:
+        counters = _vendor_stats.setdefault(vendor, {
+            "hits": 0, "misses": 0, "revalidated": 0, "bytes_served": 0,
+            "states_loaded": 0, "states_saved": 0,
+            "cold_navigations": 0, "cold_seconds": 0.0, "warm_navigations": 0, "warm_seconds": 0.0,
+        })
+        counters[name] += amount
+
+
+def _is_cacheable(request):
+    if request.method != "GET" or request.resource_type not in CACHEABLE_TYPES:
+        return False
+    if request.resource_type == "document":
+        # Only iframe shells, the top-level pages carry the session
+        try:
+            return request.frame.parent_frame is not None
+        except Exception:
+            return False
+    return True
+
+
+def _revalidation_headers(request, entry):
+    headers = dict(request.headers)
+    if entry is not None:
+        kept = entry[0]
+        if kept.get("etag"):
+            headers["if-none-match"] = kept["etag"]
+        if kept.get("last-modified"):
+            headers["if-modified-since"] = kept["last-modified"]
+    return headers
+
+
+class ContextAssets:
+    """Asset routing and navigation counts of one vendor context"""
+
+    def __init__(self, vendor, cache):
+        self.vendor = vendor
+        self.cache = cache
+        self.hits = 0
+
+    def _served(self, body, revalidated=False):
+        self.hits += 1
+        _count(self.vendor, "hits")
+        _count(self.vendor, "bytes_served", len(body))
+        if revalidated:
+            _count(self.vendor, "revalidated")
+
+    def route(self, route, request):
+        if not _is_cacheable(request):
+            route.fallback()
+            return
+        try:
+            entry = self.cache.lookup(request.url)
+            if entry is not None and entry[1]:
+                body = self.cache.read(request.url, entry[2])
+                if body is not None:
+                    self._served(body)
+                    route.fulfill(status=200, headers=entry[0], body=body)
+                    return
+            response = route.fetch(headers=_revalidation_headers(request, entry))
+            if response.status == 304 and entry is not None:
+                body = self.cache.read(request.url, entry[2])
+                if body is not None:
+                    self.cache.refresh(request.url, request.resource_type, response.headers)
+                    self._served(body, revalidated=True)
+                    route.fulfill(status=200, headers=entry[0], body=body)
+                    return
+                response = route.fetch()
+            body = response.body()
+            _count(self.vendor, "misses")
+            if response.status == 200:
+                self.cache.store(request.url, request.resource_type, response.headers, body)
+            route.fulfill(response=response, body=body)
+        except Exception as e:
+            print(f"{self.vendor}: asset cache skipped {request.url}: {e}")
+            try:
+                route.fallback()
+            except Exception:
+                pass
+
+    async def route_async(self, route, request):
+        if not _is_cacheable(request):
+            await route.fallback()
+            return
+        try:
+            entry = self.cache.lookup(request.url)
+            if entry is not None and entry[1]:
+                body = self.cache.read(request.url, entry[2])
+                if body is not None:
+                    self._served(body)
+                    await route.fulfill(status=200, headers=entry[0], body=body)
+                    return
+            response = await route.fetch(headers=_revalidation_headers(request, entry))
+            if response.status == 304 and entry is not None:
+                body = self.cache.read(request.url, entry[2])
+                if body is not None:
+                    self.cache.refresh(request.url, request.resource_type, response.headers)
+                    self._served(body, revalidated=True)
+                    await route.fulfill(status=200, headers=entry[0], body=body)
+                    return
+                response = await route.fetch()
+            body = await response.body()
+            _count(self.vendor, "misses")
+            if response.status == 200:
+                self.cache.store(request.url, request.resource_type, response.headers, body)
+            await route.fulfill(response=response, body=body)
+        except Exception as e:
+            print(f"{self.vendor}: asset cache skipped {request.url}: {e}")
+            try:
+                await route.fallback()
+            except Exception:
+                pass
+
+
+def storage_state_path(vendor):
+    return os.path.join(STORAGE_STATE_DIR, f"{vendor}.json")
+
+
+def context_options_with_state(vendor, context_options):
+    """context_options plus the vendor's saved storage state, when there is a recent one"""
+    options = dict(context_options or {})
+    if not STORAGE_STATE_ENABLED or vendor is None:
+        return options
+    path = storage_state_path(vendor)
+    try:
+        if time.time() - os.path.getmtime(path) > STORAGE_STATE_MAX_AGE:
+            return options
+    except OSError:
+        return options
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = _shareable_state(json.load(f))
+    except (OSError, ValueError) as e:
+        print(f"{vendor}: could not load storage state: {e}")
+        return options
+    options["storage_state"] = state
+    _count(vendor, "states_loaded")
+    return options
+
+
+def _shareable_state(state):
+    """state without the session cookies, which must not be shared by concurrent contexts"""
+    cookies = [
+        cookie for cookie in state.get("cookies", [])
+        if (cookie.get("expires") or -1) > 0
+        and not cookie.get("name", "").lower().startswith(SESSION_COOKIE_PREFIXES)
+    ]
+    return dict(state, cookies=cookies)
+
+
+def _state_due(vendor):
+    if not STORAGE_STATE_ENABLED:
+        return False
+    with _stats_lock:
+        if time.monotonic() - _state_saved.get(vendor, float("-inf")) < STORAGE_STATE_SAVE_INTERVAL:
+            return False
+        _state_saved[vendor] = time.monotonic()
+        return True
+
+
+def _write_state(vendor, state):
+    os.makedirs(STORAGE_STATE_DIR, exist_ok=True)
+    path = storage_state_path(vendor)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_shareable_state(state), f)
+    os.replace(tmp_path, path)
+    _count(vendor, "states_saved")
+
+
+def install_asset_cache(context, vendor):
+    """Serve a sync context's cacheable assets from disk; register it before other routes"""
+    assets = ContextAssets(vendor, get_asset_cache())
+    if assets.cache is not None:
+        context.route("**/*", assets.route)
+    with _stats_lock:
+        _contexts[context] = assets
+    return assets
+
+
+async def install_asset_cache_async(context, vendor):
+    assets = ContextAssets(vendor, get_asset_cache())
+    if assets.cache is not None:
+        await context.route("**/*", assets.route_async)
+    with _stats_lock:
+        _contexts[context] = assets
+    return assets
+
+
+def release_context(context):
+    """Save the storage state of a vendor context about to close"""
+    with _stats_lock:
+        assets = _contexts.pop(context, None)
+    if assets is None or not _state_due(assets.vendor):
+        return
+    try:
+        _write_state(assets.vendor, context.storage_state())
+    except Exception as e:
+        print(f"{assets.vendor}: could not save storage state: {e}")
+
+
+def discard_context(context):
+    """Forget a context of a lost browser without saving its state"""
+    with _stats_lock:
+        _contexts.pop(context, None)
+
+
+async def release_context_async(context):
+    with _stats_lock:
+        assets = _contexts.pop(context, None)
+    if assets is None or not _state_due(assets.vendor):
+        return
+    try:
+        _write_state(assets.vendor, await context.storage_state())
+    except Exception as e:
+        print(f"{assets.vendor}: could not save storage state: {e}")
+
+
+@contextmanager
+def navigation_timer(page):
+    """Time a search form load on page as cold or warm"""
+    with _stats_lock:
+        assets = _contexts.get(page.context)
+    if assets is None:
+        yield
+        return
+    hits = assets.hits
+    started = time.monotonic()
+    yield
+    kind = "warm" if assets.hits > hits else "cold"
+    _count(assets.vendor, f"{kind}_navigations")
+    _count(assets.vendor, f"{kind}_seconds", time.monotonic() - started)
+
+
+def asset_cache_stats():
+    """Cache size plus per vendor hits, storage state use and cold/warm form load times"""
+    with _stats_lock:
+        vendors = {}
+        for vendor, counters in _vendor_stats.items():
+            vendors[vendor] = {
+                name: value for name, value in counters.items() if not name.endswith("_seconds")
+            }
+            for kind in ("cold", "warm"):
+                count = counters[f"{kind}_navigations"]
+                average = counters[f"{kind}_seconds"] / count if count else None
+                vendors[vendor][f"{kind}_avg_ms"] = round(1000 * average) if count else None
+    cache = get_asset_cache()
+    return {
+        "enabled": ASSET_CACHE_ENABLED,
+        "storage_state": STORAGE_STATE_ENABLED,
+        "cache": cache.stats() if cache is not None else None,
+        "vendors": vendors,
+    }
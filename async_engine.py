@@ -0,0 +1,218 @@
+"""Asyncio search engine running every vendor flow on one event loop.
+
+The sync vendor modules tie a browser to each pool worker thread. This engine
+runs the async Playwright versions of the same flows on a single event loop in
+a background thread, so many searches and vendors can share one browser without
+a thread per search. Callers in other threads (the Flask app, the Tkinter UI)
+submit jobs through submit_search/search, which return concurrent futures.
+
+Enable it for the app and UI with SEARCH_ENGINE=async.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import threading
+import time
+
+from playwright.async_api import async_playwright
+
+import bpmicrosearch
+import dataiosearch
+import systemgeneralsearch
+from browser_pool import BROWSER_CHANNEL, BROWSER_HEADLESS, LAUNCH_ARGS, PAGE_TIMEOUT
+from asset_cache import context_options_with_state, install_asset_cache_async, release_context_async
+from browser_server import browser_ws_endpoint, context_slots
+from request_filter import install_request_filter_async
+from variation_search import SearchCancelled, build_part_variations, search_variations_in_page_async
+
+
+ASYNC_ENGINE_CONCURRENCY = int(os.environ.get("ASYNC_ENGINE_CONCURRENCY", "12"))
+
+
+# vendor -> (open_form, query_part(page, form, part_number, original_part_number), context options, init scripts)
+# The steps are the async twins in each vendor module, next to the sync flow they mirror
+_VENDOR_FLOWS = {
+    "systemgeneral": (
+        systemgeneralsearch._open_search_form_async,
+        lambda page, frame, part_number, original: systemgeneralsearch._query_part_async(page, frame, part_number),
+        None, (),
+    ),
+    "dataio": (
+        dataiosearch._open_search_form_async,
+        lambda page, form, part_number, original: dataiosearch._query_part_async(page, form, part_number),
+        None, (),
+    ),
+    "bpmicro": (
+        bpmicrosearch._open_search_form_async, bpmicrosearch._query_part_async,
+        bpmicrosearch._CONTEXT_OPTIONS, bpmicrosearch._INIT_SCRIPTS,
+    ),
+}
+
+
+class AsyncSearchEngine:
+    """One event loop thread, one browser, many concurrent vendor searches"""
+
+    def __init__(self, concurrency=ASYNC_ENGINE_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = None
+        self._semaphore = None
+        self._slots = context_slots()
+        # Changed on the loop thread and by submitting threads, read by /api/stats
+        self._stats_lock = threading.Lock()
+        self._stats = {"jobs": 0, "running": 0, "launches": 0}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._browser_lock = None
+            self._browser = None
+            self._playwright = None
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="async-search-engine", daemon=True
+            )
+            self._pid = os.getpid()
+            self._thread.start()
+
+    async def _healthy_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            endpoint = browser_ws_endpoint()
+            if endpoint:
+                self._browser = await self._playwright.chromium.connect(endpoint)
+            else:
+                self._browser = await self._playwright.chromium.launch(
+                    channel=BROWSER_CHANNEL, headless=BROWSER_HEADLESS, args=LAUNCH_ARGS
+                )
+            self._count("launches")
+            return self._browser
+
+    async def _search(self, vendor, original_part_number, part_variations=None):
+        open_form, query_part, context_options, init_scripts = _VENDOR_FLOWS[vendor]
+        if part_variations is None:
+            part_variations = build_part_variations(original_part_number, vendor=vendor)
+        browser = await self._healthy_browser()
+        async with self._semaphore:
+            slot = None
+            if self._slots is not None:
+                # Polled on the loop, so a task cancelled while waiting never takes a slot
+                slot = await self._slots.acquire_async()
+            self._count("running")
+            context = None
+            request_filter = None
+            try:
+                context = await browser.new_context(**context_options_with_state(vendor, context_options))
+                for script in init_scripts:
+                    await context.add_init_script(script)
+                # Routes run in reverse order: the filter first, then the asset cache
+                await install_asset_cache_async(context, vendor)
+                request_filter = await install_request_filter_async(context, vendor)
+                page = await context.new_page()
+                page.set_default_timeout(PAGE_TIMEOUT)
+                page.set_default_navigation_timeout(PAGE_TIMEOUT)
+                return await search_variations_in_page_async(
+                    page, part_variations, open_form,
+                    lambda page, form, part_number: query_part(page, form, part_number, original_part_number),
+                )
+            finally:
+                self._count("running", -1)
+                if context is not None:
+                    await release_context_async(context)
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                if request_filter is not None:
+                    request_filter.finish()
+                if slot is not None:
+                    self._slots.release(slot)
+
+    def submit_search(self, vendor, part_number, part_variations=None):
+        """Thread-safe: schedule a variation search and return a concurrent Future"""
+        if vendor not in _VENDOR_FLOWS:
+            raise ValueError(f"Unknown website: {vendor}")
+        self._ensure_started()
+        self._count("jobs")
+        return asyncio.run_coroutine_threadsafe(self._search(vendor, part_number, part_variations), self._loop)
+
+    def search(self, vendor, part_number, timeout=None, cancel_event=None, part_variations=None):
+        """Blocking helper returning (result, part_used) or None.
+
+        Setting cancel_event cancels the task on the loop, which closes its
+        browser context, and raises SearchCancelled here.
+        """
+        future = self.submit_search(vendor, part_number, part_variations)
+        if cancel_event is None:
+            return future.result(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return future.result(0.2)
+            except concurrent.futures.TimeoutError:
+                if cancel_event.is_set():
+                    future.cancel()
+                    raise SearchCancelled(part_number)
+                if deadline is not None and time.monotonic() > deadline:
+                    raise
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, concurrency=self.concurrency)
+
+    def shutdown(self, timeout=10):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            loop = self._loop
+
+        async def _close():
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception:
+                    pass
+            if self._playwright is not None:
+                await self._playwright.stop()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), loop).result(timeout)
+        except Exception as e:
+            print(f"Error stopping async search engine: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_engine = AsyncSearchEngine()
+
+
+def get_search_engine():
+    return _engine
+
+
+def submit_search(vendor, part_number, part_variations=None):
+    """Submit a vendor search to the shared event loop from any thread"""
+    return _engine.submit_search(vendor, part_number, part_variations)
+
+
+def search(vendor, part_number, timeout=None, cancel_event=None, part_variations=None):
+    return _engine.search(vendor, part_number, timeout, cancel_event, part_variations)
+
+
+atexit.register(_engine.shutdown)
@@ -0,0 +1,521 @@
+"""Batch searches of whole BOMs, with per-part results as they complete.
+
+A batch is a pasted list or an uploaded CSV of part numbers. parse_part_list()
+reads the part number column (or the first column), and dedupe_parts() cleans
+the parts and merges spellings that share a part_key(), so each device is
+searched once. The other spellings are kept as aliases.
+
+Every selected vendor has its own worker pool of BATCH_VENDOR_CONCURRENCY
+threads, shared by all batches of the process. Each (part, vendor) search
+waits in its vendor's queue, so a slow vendor never holds back the others,
+and no vendor sees more than that many concurrent searches from batches.
+The searches are the same functions as POST /api/search. They are answered
+from the catalog and the result cache where possible, coalesce with
+identical searches in flight, and use the browser pool. Within one part,
+variations that matched at one vendor are hinted to the others, and
+"first_hit" skips the vendors still queued once one finds the part.
+
+Jobs and their rows live in SQLite (BATCH_JOBS_PATH), so any worker can
+report a batch and a reloaded page picks it up again. A part's row is
+written when its last vendor finishes and gets the next sequence number of
+its batch. Clients page or stream rows after the last sequence they saw. A
+running batch is kept alive by a heartbeat. One whose process died shows as
+"interrupted", and resume() (like resume after cancel()) searches only the
+parts without a row.
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from part_normalize import clean_part_number, part_key
+from variation_search import VariationHints
+
+
+BATCH_JOBS_PATH = os.environ.get(
+    "BATCH_JOBS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_jobs.sqlite3")
+)
+BATCH_VENDOR_CONCURRENCY = int(os.environ.get("BATCH_VENDOR_CONCURRENCY", "2"))
+BATCH_MAX_PARTS = int(os.environ.get("BATCH_MAX_PARTS", "5000"))
+BATCH_HEARTBEAT_INTERVAL = float(os.environ.get("BATCH_HEARTBEAT_INTERVAL", "15"))
+# A running batch without a heartbeat for this long lost its process
+BATCH_STALE_AFTER = float(os.environ.get("BATCH_STALE_AFTER", "90"))
+BATCH_PAGE_SIZE = 500
+
+# Header names of the part number column in an uploaded BOM
+PART_COLUMN_NAMES = {
+    "part number", "part_number", "partnumber", "part no", "part no.", "part", "pn", "mpn",
+    "manufacturer part number", "mfr part number", "mfg part number",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    websites TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    no_cache INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    inputs INTEGER NOT NULL,
+    created REAL NOT NULL,
+    started REAL NOT NULL,
+    resumed_done INTEGER NOT NULL DEFAULT 0,
+    heartbeat REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS batch_rows (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    part_number TEXT NOT NULL,
+    aliases TEXT NOT NULL,
+    seq INTEGER,
+    found INTEGER,
+    cached INTEGER,
+    results TEXT,
+    completed REAL,
+    PRIMARY KEY (job_id, position)
+);
+CREATE INDEX IF NOT EXISTS batch_rows_seq ON batch_rows (job_id, seq);
+"""
+
+# Vendor searches raise on errors, recorded with status 'error'. A search cut
+# short by cancelling the batch is not recorded, so resuming runs it again
+_CANCELLED = object()
+_SKIPPED = {"status": "skipped", "socket_info": None, "part_used": None, "cached": False}
+
+
+def parse_part_list(text):
+    """Part numbers of a pasted list or CSV: the part number column, else the first one"""
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    if not lines:
+        return []
+    # Spreadsheet pastes are tab separated
+    delimiter = next((d for d in ("\t", ",", ";") if d in lines[0]), ",")
+    rows = list(csv.reader(lines, delimiter=delimiter))
+    header = [" ".join(cell.split()).lower() for cell in rows[0]]
+    column = next((i for i, name in enumerate(header) if name in PART_COLUMN_NAMES), None)
+    if column is None:
+        column = 0
+    else:
+        rows = rows[1:]
+    return [row[column] for row in rows if column < len(row)]
+
+
+def dedupe_parts(part_numbers):
+    """[(part number, [other spellings])] in first-seen order, one per part_key()"""
+    unique = {}
+    for part_number in part_numbers:
+        cleaned = clean_part_number(str(part_number))
+        if not cleaned:
+            continue
+        key = part_key(cleaned)
+        if key not in unique:
+            unique[key] = (cleaned, [])
+        elif cleaned != unique[key][0] and cleaned not in unique[key][1]:
+            unique[key][1].append(cleaned)
+    return list(unique.values())
+
+
+def _entry(result, meta):
+    """Compact per-vendor result of one batch row"""
+    if result:
+        socket_info, part_used = result
+        return {
+            "status": "found", "socket_info": socket_info, "part_used": part_used,
+            "cached": meta.get("cached", False) or meta.get("catalog", False),
+        }
+    return {"status": "not_found", "socket_info": None, "part_used": None, "cached": meta.get("cached", False)}
+
+
+class _EitherCancelled:
+    """Looks like a threading.Event to the vendor code: set when the batch or the part is cancelled"""
+
+    def __init__(self, *events):
+        self.events = events
+
+    def is_set(self):
+        return any(event.is_set() for event in self.events)
+
+
+class _Row:
+    def __init__(self, position, part_number):
+        self.position = position
+        self.part_number = part_number
+        self.results = {}
+        self.hints = VariationHints()
+        self.cancel = threading.Event()
+        self.lock = threading.Lock()
+
+
+class _Run:
+    """A batch being searched by this process"""
+
+    def __init__(self, job_id, websites, mode, no_cache, remaining):
+        self.job_id = job_id
+        self.websites = websites
+        self.mode = mode
+        self.no_cache = no_cache
+        self.remaining = remaining
+        # position -> _Row of the parts still being searched
+        self.rows = {}
+        self.cancel = threading.Event()
+        self.lock = threading.Lock()
+
+
+class BatchJobs:
+    """Creates, runs and reports batch searches over the given (key, name, search) vendors"""
+
+    def __init__(self, vendors, path=BATCH_JOBS_PATH, vendor_concurrency=BATCH_VENDOR_CONCURRENCY):
+        self.vendors = {key: (name, search) for key, name, search in vendors}
+        self.path = path
+        self.vendor_concurrency = max(1, vendor_concurrency)
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._executors = {}
+        self._runs = {}
+        self._heartbeat = None
+        self._stats = {"batches": 0, "parts_searched": 0, "vendor_searches": 0, "cached_parts": 0}
+
+    def _connection(self):
+        # A forked worker must not reuse its parent's connection
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def _executor(self, key):
+        with self._lock:
+            if key not in self._executors:
+                self._executors[key] = ThreadPoolExecutor(
+                    max_workers=self.vendor_concurrency, thread_name_prefix=f"batch-{key}"
+                )
+            return self._executors[key]
+
+    # Jobs
+
+    def create(self, part_numbers, websites, mode="all", no_cache=False):
+        """Store a new batch over the deduplicated parts and start it; its id"""
+        parts = dedupe_parts(part_numbers)
+        if not parts:
+            raise ValueError("No part numbers in the batch")
+        if len(parts) > BATCH_MAX_PARTS:
+            raise ValueError(f"A batch takes at most {BATCH_MAX_PARTS} distinct part numbers, got {len(parts)}")
+        websites = [key for key in self.vendors if key in websites]
+        if not websites:
+            raise ValueError("At least one website must be selected")
+        now = time.time()
+        # Unique across processes sharing the database, even within one millisecond
+        job_id = f"batch_{uuid.uuid4().hex}"
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "INSERT INTO batch_jobs (id, status, websites, mode, no_cache, total, inputs, created, started, heartbeat)"
+                " VALUES (?, 'running', ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(websites), mode, int(no_cache), len(parts), len(part_numbers), now, now, now),
+            )
+            db.executemany(
+                "INSERT INTO batch_rows (job_id, position, part_number, aliases) VALUES (?, ?, ?, ?)",
+                [(job_id, position, part, json.dumps(aliases)) for position, (part, aliases) in enumerate(parts)],
+            )
+            db.commit()
+            self._stats["batches"] += 1
+        print(f"Batch {job_id}: {len(parts)} parts ({len(part_numbers) - len(parts)} duplicates) on {', '.join(websites)}")
+        self._start(job_id)
+        return job_id
+
+    def _start(self, job_id):
+        with self._lock:
+            db = self._connection()
+            websites, mode, no_cache = db.execute(
+                "SELECT websites, mode, no_cache FROM batch_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            pending = db.execute(
+                "SELECT position, part_number FROM batch_rows WHERE job_id = ? AND seq IS NULL ORDER BY position",
+                (job_id,),
+            ).fetchall()
+            run = self._runs[job_id] = _Run(job_id, json.loads(websites), mode, bool(no_cache), len(pending))
+        self._ensure_heartbeat()
+        if not pending:
+            self._finish(run)
+            return
+        rows = [_Row(position, part_number) for position, part_number in pending]
+        run.rows = {row.position: row for row in rows}
+        # Parts go through each vendor's queue in BOM order
+        for key in run.websites:
+            executor = self._executor(key)
+            for row in rows:
+                executor.submit(self._search, run, row, key)
+
+    def _search(self, run, row, key):
+        if run.cancel.is_set():
+            return
+        if row.cancel.is_set():
+            entry = dict(_SKIPPED)
+        else:
+            search = self.vendors[key][1]
+            meta = {}
+            try:
+                result = search(
+                    row.part_number, cancel_event=_EitherCancelled(run.cancel, row.cancel),
+                    no_cache=run.no_cache, meta=meta, hints=row.hints,
+                )
+                # A search that returns was answered, even if another vendor matched meanwhile
+                entry = _CANCELLED if run.cancel.is_set() else _entry(result, meta)
+            except Exception as e:
+                # Cut short searches raise (SearchCancelled, or the error of their closed page)
+                if run.cancel.is_set():
+                    entry = _CANCELLED
+                elif row.cancel.is_set():
+                    entry = dict(_SKIPPED)
+                else:
+                    entry = {"status": "error", "socket_info": None, "part_used": None, "cached": False,
+                             "error": str(e)}
+            with self._lock:
+                self._stats["vendor_searches"] += 1
+        if entry is _CANCELLED:
+            return
+        with row.lock:
+            row.results[key] = entry
+            if run.mode == "first_hit" and entry["status"] == "found":
+                row.cancel.set()
+            done = len(row.results) == len(run.websites)
+        if done:
+            self._complete_row(run, row)
+
+    def _complete_row(self, run, row):
+        results = {key: row.results[key] for key in run.websites}
+        found = any(entry["status"] == "found" for entry in results.values())
+        cached = all(entry["cached"] for entry in results.values() if entry["status"] != "skipped")
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "UPDATE batch_rows SET seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM batch_rows WHERE job_id = ?),"
+                " found = ?, cached = ?, results = ?, completed = ? WHERE job_id = ? AND position = ? AND seq IS NULL",
+                (run.job_id, int(found), int(cached), json.dumps(results), now, run.job_id, row.position),
+            )
+            db.execute("UPDATE batch_jobs SET heartbeat = ? WHERE id = ?", (now, run.job_id))
+            db.commit()
+            self._stats["parts_searched"] += 1
+            self._stats["cached_parts"] += int(cached)
+        with run.lock:
+            run.rows.pop(row.position, None)
+            run.remaining -= 1
+            last = run.remaining == 0
+        if last:
+            self._finish(run)
+
+    def _finish(self, run):
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "UPDATE batch_jobs SET status = 'completed', finished = ? WHERE id = ? AND status = 'running'",
+                (time.time(), run.job_id),
+            )
+            db.commit()
+            self._runs.pop(run.job_id, None)
+        print(f"Batch {run.job_id} completed")
+
+    def cancel(self, job_id):
+        """Stop a running batch; parts without a row stay pending for resume()
+
+        A batch run by another worker stops at that worker's next heartbeat.
+        """
+        with self._lock:
+            db = self._connection()
+            cancelled = db.execute(
+                "UPDATE batch_jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            ).rowcount
+            db.commit()
+            run = self._runs.pop(job_id, None)
+        if run is not None:
+            run.cancel.set()
+        if cancelled:
+            print(f"Batch {job_id} cancelled")
+        return bool(cancelled)
+
+    def resume(self, job_id):
+        """Search the pending parts of a cancelled or interrupted batch; False when it is not resumable"""
+        now = time.time()
+        with self._lock:
+            if job_id in self._runs:
+                return False
+            db = self._connection()
+            # Claimed atomically, so only one worker resumes an interrupted batch
+            claimed = db.execute(
+                "UPDATE batch_jobs SET status = 'running', started = ?, heartbeat = ?, finished = NULL,"
+                " resumed_done = (SELECT COUNT(seq) FROM batch_rows WHERE job_id = ?)"
+                " WHERE id = ? AND (status = 'cancelled' OR (status = 'running' AND heartbeat < ?))",
+                (now, now, job_id, job_id, now - BATCH_STALE_AFTER),
+            ).rowcount
+            db.commit()
+        if not claimed:
+            return False
+        print(f"Batch {job_id} resumed")
+        self._start(job_id)
+        return True
+
+    def _ensure_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None and self._heartbeat.is_alive():
+                return
+            self._heartbeat = threading.Thread(target=self._beat, name="batch-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(BATCH_HEARTBEAT_INTERVAL)
+            with self._lock:
+                if not self._runs:
+                    self._heartbeat = None
+                    return
+                db = self._connection()
+                db.executemany(
+                    "UPDATE batch_jobs SET heartbeat = ? WHERE id = ? AND status = 'running'",
+                    [(time.time(), job_id) for job_id in self._runs],
+                )
+                db.commit()
+                # Cancelled through another worker
+                stopped = [
+                    job_id for job_id in self._runs
+                    if db.execute("SELECT status FROM batch_jobs WHERE id = ?", (job_id,)).fetchone()[0] != "running"
+                ]
+                runs = [self._runs.pop(job_id) for job_id in stopped]
+            for run in runs:
+                run.cancel.set()
+                print(f"Batch {run.job_id} cancelled")
+
+    # Reporting
+
+    def status(self, job_id):
+        """Progress, throughput and ETA of a batch, None when unknown"""
+        with self._lock:
+            db = self._connection()
+            job = db.execute(
+                "SELECT status, websites, mode, no_cache, total, inputs, created, started, resumed_done,"
+                " heartbeat, finished FROM batch_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if job is None:
+                return None
+            done, found, cached, last_seq = db.execute(
+                "SELECT COUNT(seq), COALESCE(SUM(found), 0), COALESCE(SUM(cached), 0), COALESCE(MAX(seq), 0)"
+                " FROM batch_rows WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        (status, websites, mode, no_cache, total, inputs, created, started, resumed_done,
+         heartbeat, finished) = job
+        now = time.time()
+        if status == "running" and heartbeat < now - BATCH_STALE_AFTER:
+            status = "interrupted"
+        # Throughput of the current run, so a resumed batch is not diluted by its pause
+        elapsed = (finished or now) - started
+        searched = done - resumed_done
+        rate = searched / elapsed if elapsed > 0 and searched else None
+        remaining = total - done
+        return {
+            "batch_id": job_id,
+            "status": status,
+            "websites": json.loads(websites),
+            "mode": mode,
+            "no_cache": bool(no_cache),
+            "total": total,
+            "inputs": inputs,
+            "duplicates": inputs - total,
+            "completed": done,
+            "found": found,
+            "cached": cached,
+            "progress": round(done / total * 100, 1) if total else 100,
+            "last_seq": last_seq,
+            "created": created,
+            "elapsed_seconds": round(elapsed, 1),
+            "parts_per_minute": round(rate * 60, 1) if rate else None,
+            "eta_seconds": round(remaining / rate) if rate and status == "running" else None,
+        }
+
+    def _select(self, job_id, condition, params, order, limit):
+        with self._lock:
+            db = self._connection()
+            records = db.execute(
+                "SELECT position, part_number, aliases, seq, found, cached, results, completed FROM batch_rows"
+                f" WHERE job_id = ? AND {condition} ORDER BY {order} LIMIT ?",
+                (job_id, *params, limit),
+            ).fetchall()
+        return [
+            {
+                "position": position, "part_number": part_number, "aliases": json.loads(aliases), "seq": seq,
+                "found": bool(found), "cached": bool(cached), "results": json.loads(results), "completed": completed,
+            }
+            for position, part_number, aliases, seq, found, cached, results, completed in records
+        ]
+
+    def rows(self, job_id, after=0, limit=BATCH_PAGE_SIZE):
+        """Completed rows with a sequence number above after, in completion order"""
+        return self._select(job_id, "seq > ?", (after,), "seq", limit)
+
+    def iter_rows(self, job_id, follow=False, poll_interval=0.5):
+        """The completed rows in BOM order, or with follow in completion order until the batch stops"""
+        if not follow:
+            position = -1
+            while True:
+                rows = self._select(job_id, "seq IS NOT NULL AND position > ?", (position,), "position", BATCH_PAGE_SIZE)
+                yield from rows
+                if len(rows) < BATCH_PAGE_SIZE:
+                    return
+                position = rows[-1]["position"]
+        after = 0
+        while True:
+            # Checked before reading, so rows written just before the batch stops are not missed
+            status = self.status(job_id)
+            if status is None:
+                return
+            active = status["status"] == "running"
+            rows = self.rows(job_id, after)
+            yield from rows
+            if rows:
+                after = rows[-1]["seq"]
+            elif not active:
+                return
+            else:
+                time.sleep(poll_interval)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = len(self._runs)
+            stats["queued"] = {key: executor._work_queue.qsize() for key, executor in self._executors.items()}
+        stats["vendor_concurrency"] = self.vendor_concurrency
+        return stats
+
+
+def _csv(values):
+    out = io.StringIO()
+    csv.writer(out).writerow(values)
+    return out.getvalue()
+
+
+def csv_header(websites, vendor_names):
+    """Header line of a batch CSV, three columns per website"""
+    header = ["position", "part_number", "aliases"]
+    for key in websites:
+        name = vendor_names.get(key, key)
+        header += [f"{name} status", f"{name} socket", f"{name} part used"]
+    return _csv(header)
+
+
+def csv_line(row, websites):
+    """One batch row as a CSV line"""
+    values = [row["position"] + 1, row["part_number"], " ".join(row["aliases"])]
+    for key in websites:
+        entry = row["results"].get(key, {})
+        values += [entry.get("status", ""), entry.get("socket_info") or entry.get("error") or "", entry.get("part_used") or ""]
+    return _csv(values)
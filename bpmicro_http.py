@@ -0,0 +1,204 @@
+"""Browserless BPMicro search against the device-search app behind iframe#myIframe.
+
+The BPMicro device search page only embeds a small search app. The app's
+search endpoint answers with the result list (as JSON or as the same
+#search-results HTML the iframe renders), and each result links to a device
+page with a device-parameters-table. This client queries the endpoint and
+reads that table with requests and lxml.
+
+BPMICRO_APP_URL points at the app directly, otherwise it is taken from the
+iframe on the device search page. BPMICRO_SEARCH_ENDPOINT and
+BPMICRO_SEARCH_PARAM name the search request, relative to the app URL.
+Only a response with a result count or a "No results found" message counts
+as an answer; anything else (e.g. the bare app shell when the endpoint is
+wrong) raises DirectSearchFailed, so BPMICRO_BACKEND=auto falls back to
+the browser instead of reporting a miss.
+harvest() searches the shortest variation once and ranks the listed devices.
+"""
+import os
+import re
+import threading
+import time
+from urllib.parse import urljoin
+
+import lxml.html
+
+from extraction import device_parameters
+from http_client import DirectSearchFailed, fetch
+from variation_search import HARVEST_ALTERNATES, SearchCancelled, probe_order, rank_candidates
+
+
+SEARCH_PAGE_URL = os.environ.get("BPMICRO_SEARCH_PAGE_URL", "https://www.bpmmicro.com/device-search/")
+APP_URL = os.environ.get("BPMICRO_APP_URL")
+SEARCH_ENDPOINT = os.environ.get("BPMICRO_SEARCH_ENDPOINT", "search")
+SEARCH_PARAM = os.environ.get("BPMICRO_SEARCH_PARAM", "q")
+MAX_RESULTS = 50000
+DISCOVERY_RETRY = 300
+
+_lock = threading.Lock()
+_discovered = {"url": None, "retry_at": 0.0}
+
+
+def app_url():
+    """URL of the device-search app, configured or read from the iframe"""
+    if APP_URL:
+        return APP_URL
+    with _lock:
+        if _discovered["url"]:
+            return _discovered["url"]
+        if time.monotonic() < _discovered["retry_at"]:
+            raise DirectSearchFailed("BPMicro app URL not found recently, not retrying yet")
+        page = fetch("GET", SEARCH_PAGE_URL)
+        doc = lxml.html.fromstring(page.text, base_url=page.url)
+        doc.make_links_absolute()
+        sources = doc.xpath('//iframe[@id="myIframe"]/@src')
+        if not sources:
+            _discovered["retry_at"] = time.monotonic() + DISCOVERY_RETRY
+            raise DirectSearchFailed(f"no iframe#myIframe on {SEARCH_PAGE_URL}")
+        print(f"Found BPMicro device search app at {sources[0]}")
+        _discovered["url"] = sources[0]
+        return sources[0]
+
+
+def search_variations(part_variations, cancel_event=None):
+    """Try each variation in order and return (device_parameters, part_used) or None
+
+    device_parameters maps the first cell of each device parameters row
+    ("Socket Modules", "Socket Adapter", ...) to the text of the second.
+    """
+    base_url = app_url()
+    for part_number in probe_order(part_variations):
+        if cancel_event is not None and cancel_event.is_set():
+            raise SearchCancelled(part_number)
+        print(f"Searching for part number: {part_number} (direct)")
+        device_urls = _search(base_url, part_number)
+        if not device_urls:
+            print(f"No results found for part number '{part_number}'")
+            continue
+        print(f"Opening first search result: {device_urls[0]}")
+        device_page = fetch("GET", device_urls[0], headers={"Referer": base_url})
+        return parse_device_parameters(device_page.text), part_number
+    return None
+
+
+def harvest(original_part_number, part_variations, cancel_event=None):
+    """Search once for the shortest variation and open the best listed device
+
+    Returns (result, alternates): result is (device_parameters, part_used)
+    or None, as from search_variations(), and alternates lists the other
+    matching devices as {"part_number", "socket_info"} (socket_info is None,
+    their device pages are not opened). When #qty_found reports more devices
+    than are listed it falls back to searching each variation.
+    """
+    shortest = min(part_variations, key=len)
+    base_url = app_url()
+    if cancel_event is not None and cancel_event.is_set():
+        raise SearchCancelled(shortest)
+    print(f"Harvesting candidates for part number: {shortest} (direct)")
+    qty_found, candidates = _search_candidates(base_url, shortest)
+    if qty_found is not None and qty_found > len(candidates):
+        print(f"Only {len(candidates)} of {qty_found} devices listed, searching each variation instead")
+        return search_variations(part_variations, cancel_event), []
+
+    ranked = rank_candidates(original_part_number, part_variations, [name for name, _ in candidates])
+    if not ranked:
+        print("No matching devices for any variation")
+        return None, []
+    best, part_used = ranked[0]
+    print(f"Opening best of {len(candidates)} devices: {candidates[best][0]}")
+    device_page = fetch("GET", candidates[best][1], headers={"Referer": base_url})
+    alternates = [
+        {"part_number": candidates[index][0], "socket_info": None}
+        for index, _ in ranked[1:HARVEST_ALTERNATES + 1]
+    ]
+    return (parse_device_parameters(device_page.text), part_used), alternates
+
+
+def _search(base_url, part_number):
+    return [url for _, url in _search_candidates(base_url, part_number)[1]]
+
+
+def _search_candidates(base_url, part_number):
+    """(qty_found or None, [(part number, absolute device URL)])"""
+    response = fetch(
+        "GET", urljoin(base_url, SEARCH_ENDPOINT), params={SEARCH_PARAM: part_number},
+        headers={"Referer": base_url, "X-Requested-With": "XMLHttpRequest"},
+    )
+    if "json" in response.headers.get("Content-Type", ""):
+        qty_found, candidates = _parse_json_results(response.json())
+    else:
+        qty_found, candidates = parse_search_candidates(response.text)
+    candidates = [(name, urljoin(response.url, url)) for name, url in candidates]
+
+    if qty_found is not None and qty_found > MAX_RESULTS:
+        # The app ignored the query and listed everything
+        raise DirectSearchFailed(f"too many results ({qty_found}) for '{part_number}'")
+    return qty_found, candidates
+
+
+def _parse_json_results(data):
+    # Only a count says the endpoint answered the search; anything else may be a guessed endpoint
+    if not isinstance(data, dict) or data.get("qty_found") is None:
+        raise DirectSearchFailed("BPMicro JSON response has no qty_found")
+    items = data.get("results") or []
+    qty_found = int(data["qty_found"])
+    if qty_found and not items:
+        raise DirectSearchFailed(f"BPMicro JSON response reports {qty_found} found but lists none")
+    candidates = []
+    for item in items:
+        url = (item.get("url") or item.get("href")) if isinstance(item, dict) else None
+        if not url:
+            raise DirectSearchFailed("BPMicro search result without a device URL")
+        name = item.get("part_number") or item.get("part") or item.get("name") or ""
+        candidates.append((name, url))
+    return qty_found, candidates
+
+
+def parse_search_results(html):
+    """(qty_found, device URLs) from the #search-results markup"""
+    qty_found, candidates = parse_search_candidates(html)
+    return qty_found, [url for _, url in candidates]
+
+
+def parse_search_candidates(html):
+    """(qty_found, [(part number, device URL)]) from the #search-results markup
+
+    Raises DirectSearchFailed unless the markup answers the search, with a
+    "No results found" message or an "N found" count: the bare app shell
+    (no query run) must not read as a miss.
+    """
+    doc = lxml.html.fromstring(html)
+    qty_found = None
+    qty = doc.xpath('//div[@id="qty_found"]')
+    if qty:
+        match = re.search(r"(\d+)\s+found", qty[0].text_content())
+        if match:
+            qty_found = int(match.group(1))
+
+    results = doc.xpath('//div[@id="search-results"]')
+    if not results:
+        raise DirectSearchFailed("BPMicro response has no #search-results")
+    if "No results found" in results[0].text_content() or qty_found == 0:
+        return qty_found, []
+    if qty_found is None:
+        raise DirectSearchFailed("BPMicro response has neither a result count nor 'No results found'")
+
+    candidates = []
+    for item in results[0].xpath(".//ul/li"):
+        url = item.get("data-href") or item.get("data-url") or next(iter(item.xpath(".//a/@href")), None)
+        if not url:
+            raise DirectSearchFailed("BPMicro search result without a device link")
+        parts = item.xpath('.//*[contains(concat(" ", normalize-space(@class), " "), " part ")]')
+        name = parts[0].text_content() if parts else item.text_content()
+        candidates.append((" ".join(name.split()), url))
+    if not candidates:
+        raise DirectSearchFailed(f"BPMicro response reports {qty_found} found but lists none")
+    return qty_found, candidates
+
+
+def parse_device_parameters(html):
+    """Rows of the device-parameters-table (any two-cell table rows on product pages)"""
+    parameters = device_parameters(html)
+    if not parameters:
+        raise DirectSearchFailed("BPMicro device page has no parameter rows")
+    return parameters
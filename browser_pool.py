@@ -0,0 +1,465 @@
+"""Process-wide Playwright browser pool shared by the vendor search modules.
+
+Playwright's sync API is bound to the thread that started it, so each pool
+worker is a thread that owns one long-lived browser. Searches are submitted
+as jobs and every job runs in a fresh, isolated browser context that is closed
+again when the job finishes.
+
+Vendors can also register a search form opener. Idle workers then keep warm
+pages parked on that form, and run_on_warm_page hands one to the search so
+it can type a part number straight away. Used pages are discarded, and the
+worker loads their replacements in the background.
+
+When a shared browser server is configured (see browser_server.py), workers
+connect to it instead of launching browsers, reconnect after it restarts, and
+take a global context slot for every context they open.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from playwright.sync_api import sync_playwright
+
+from asset_cache import (
+    context_options_with_state,
+    discard_context,
+    install_asset_cache,
+    navigation_timer,
+    release_context,
+)
+from browser_server import ContextSlotTimeout, browser_ws_endpoint, context_slots
+from request_filter import install_request_filter
+
+
+BROWSER_CHANNEL = os.environ.get("BROWSER_CHANNEL", "msedge")
+BROWSER_HEADLESS = os.environ.get(
+    "BROWSER_HEADLESS", os.environ.get("BPM_HEADLESS", "true")
+).lower() in ("1", "true", "yes")
+BROWSER_POOL_WORKERS = int(os.environ.get("BROWSER_POOL_WORKERS", "3"))
+WARM_PAGES_DEFAULT = int(os.environ.get("WARM_PAGES_DEFAULT", "1"))
+WARM_PAGE_MAX_AGE = float(os.environ.get("WARM_PAGE_MAX_AGE", "600"))
+WARM_REFRESH_INTERVAL = float(os.environ.get("WARM_REFRESH_INTERVAL", "30"))
+PAGE_TIMEOUT = 60000
+BROWSER_CONNECT_ATTEMPTS = int(os.environ.get("BROWSER_CONNECT_ATTEMPTS", "10"))
+
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+]
+
+_STOP = object()
+
+
+class _WarmVendor:
+    """How to park a page on one vendor's search form"""
+
+    def __init__(self, name, open_form, context_options, init_scripts, size):
+        self.name = name
+        self.open_form = open_form
+        self.context_options = context_options
+        self.init_scripts = tuple(init_scripts)
+        self.size = size
+
+
+class _WarmPage:
+    def __init__(self, worker, context, page, form):
+        self.worker = worker
+        self.context = context
+        self.page = page
+        self.form = form
+        self.created = time.monotonic()
+
+    def is_usable(self):
+        return (
+            not self.page.is_closed()
+            and time.monotonic() - self.created < WARM_PAGE_MAX_AGE
+        )
+
+    def close(self):
+        self.worker._close_context(self.context)
+
+
+class _BrowserWorker(threading.Thread):
+    """Worker thread owning one Playwright instance and one browser"""
+
+    def __init__(self, pool, index):
+        super().__init__(name=f"browser-pool-{index}", daemon=True)
+        self.pool = pool
+        self.playwright = None
+        self.browser = None
+        self.warm = {}
+        self.warm_retry_at = {}
+        self.slots = {}
+        self.filters = {}
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    job = self.pool._jobs.get(timeout=self._idle_timeout())
+                except queue.Empty:
+                    self._refresh_one_warm_page()
+                    continue
+                if job is _STOP:
+                    break
+                self._run_job(*job)
+        finally:
+            self._close_warm_pages()
+            self._close_browser()
+            if self.playwright is not None:
+                try:
+                    self.playwright.stop()
+                except Exception as e:
+                    print(f"Error stopping Playwright: {e}")
+
+    def _run_job(self, future, fn, args, kwargs, context_options, init_scripts, vendor=None):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            if vendor is not None:
+                result = self._run_on_warm_page(vendor, fn, args, kwargs)
+            else:
+                context = self._new_context(context_options, init_scripts)
+                try:
+                    result = fn(context, *args, **kwargs)
+                finally:
+                    self._close_context(context)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _new_context(self, context_options, init_scripts, slot_wait=None, vendor=None):
+        browser = self._healthy_browser()
+        slot = None
+        if self.pool.slots is not None:
+            if slot_wait is None:
+                slot = self.pool.slots.acquire()
+            else:
+                slot = self.pool.slots.acquire(slot_wait)
+        if vendor is not None:
+            context_options = context_options_with_state(vendor, context_options)
+        try:
+            context = browser.new_context(**(context_options or {}))
+        except BaseException:
+            if slot is not None:
+                self.pool.slots.release(slot)
+            raise
+        if slot is not None:
+            self.slots[context] = slot
+        for script in init_scripts:
+            try:
+                context.add_init_script(script)
+            except Exception:
+                pass
+        if vendor is not None:
+            try:
+                # Routes run in reverse order: the filter first, then the asset cache
+                install_asset_cache(context, vendor)
+                request_filter = install_request_filter(context, vendor)
+            except Exception as e:
+                print(f"{self.name}: could not route {vendor} requests: {e}")
+                request_filter = None
+            if request_filter is not None:
+                self.filters[context] = request_filter
+        return context
+
+    def _close_context(self, context):
+        release_context(context)
+        try:
+            context.close()
+        except Exception:
+            pass
+        slot = self.slots.pop(context, None)
+        if slot is not None:
+            self.pool.slots.release(slot)
+        request_filter = self.filters.pop(context, None)
+        if request_filter is not None:
+            request_filter.finish()
+
+    def _new_page(self, vendor, slot_wait=None):
+        context = self._new_context(vendor.context_options, vendor.init_scripts, slot_wait, vendor.name)
+        page = context.new_page()
+        page.set_default_timeout(PAGE_TIMEOUT)
+        page.set_default_navigation_timeout(PAGE_TIMEOUT)
+        return _WarmPage(self, context, page, None)
+
+    def _run_on_warm_page(self, vendor, fn, args, kwargs):
+        """Run fn(page, form, ...) on a parked page, or a fresh one on a miss"""
+        self._healthy_browser()
+        warm = None
+        pages = self.warm.get(vendor.name, [])
+        while pages:
+            candidate = pages.pop()
+            if candidate.is_usable():
+                warm = candidate
+                break
+            candidate.close()
+        if warm is not None:
+            self.pool._count_warm(vendor.name, "hits")
+        else:
+            self.pool._count_warm(vendor.name, "misses")
+            warm = self._new_page(vendor)
+        try:
+            return fn(warm.page, warm.form, *args, **kwargs)
+        finally:
+            # Pages are left on results or detail pages, so start over
+            warm.close()
+
+    def _idle_timeout(self):
+        if self.pool._jobs.qsize() == 0 and self._next_warm_vendor() is not None:
+            return 0.01
+        return WARM_REFRESH_INTERVAL
+
+    def _next_warm_vendor(self):
+        now = time.monotonic()
+        for vendor in self.pool._warm_vendors():
+            if self.warm_retry_at.get(vendor.name, 0) > now:
+                continue
+            pages = self.warm.get(vendor.name, [])
+            if len(pages) < vendor.size or any(not p.is_usable() for p in pages):
+                return vendor
+        return None
+
+    def _refresh_one_warm_page(self):
+        """Replace one stale or missing warm page while the worker is idle"""
+        vendor = self._next_warm_vendor()
+        if vendor is None:
+            return
+        pages = self.warm.setdefault(vendor.name, [])
+        for page in [p for p in pages if not p.is_usable()]:
+            pages.remove(page)
+            page.close()
+            self.pool._count_warm(vendor.name, "refreshes")
+        if len(pages) >= vendor.size:
+            return
+        warm = None
+        try:
+            # Warm pages never wait for a shared context slot
+            warm = self._new_page(vendor, slot_wait=0)
+            with navigation_timer(warm.page):
+                warm.form = vendor.open_form(warm.page)
+        except ContextSlotTimeout:
+            self.warm_retry_at[vendor.name] = time.monotonic() + WARM_REFRESH_INTERVAL
+            return
+        except Exception as e:
+            print(f"{self.name}: could not warm a {vendor.name} page: {e}")
+            if warm is not None:
+                warm.close()
+            self.pool._count_warm(vendor.name, "failures")
+            # Back off so an unreachable vendor does not spin the worker
+            self.warm_retry_at[vendor.name] = time.monotonic() + WARM_REFRESH_INTERVAL
+            return
+        pages.insert(0, warm)
+
+    def _close_warm_pages(self):
+        for pages in self.warm.values():
+            for page in pages:
+                page.close()
+        self.warm = {}
+
+    def _healthy_browser(self):
+        """Return a connected browser, launching or relaunching it if needed"""
+        if self.browser is not None and self.browser.is_connected():
+            return self.browser
+        if self.browser is not None:
+            print(f"{self.name}: browser is no longer connected, relaunching...")
+            self._drop_warm_pages()
+            self._close_browser()
+            self.pool._count("relaunches")
+        if self.playwright is None:
+            self.playwright = sync_playwright().start()
+        endpoint = browser_ws_endpoint()
+        if endpoint:
+            self.browser = self._connect(endpoint)
+            return self.browser
+        print(f"{self.name}: launching browser...")
+        self.browser = self.playwright.chromium.launch(
+            channel=self.pool.channel,
+            headless=self.pool.headless,
+            args=LAUNCH_ARGS,
+        )
+        self.pool._count("launches")
+        return self.browser
+
+    def _connect(self, endpoint):
+        """Connect to the shared browser server, retrying while it (re)starts"""
+        delay = 0.5
+        for attempt in range(1, BROWSER_CONNECT_ATTEMPTS + 1):
+            try:
+                print(f"{self.name}: connecting to browser server {endpoint}...")
+                browser = self.playwright.chromium.connect(endpoint)
+                self.pool._count("connects")
+                return browser
+            except Exception as e:
+                if attempt == BROWSER_CONNECT_ATTEMPTS:
+                    raise
+                print(f"{self.name}: browser server not reachable ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 10)
+
+    def _drop_warm_pages(self):
+        """Forget warm pages of a dead browser, freeing their slots and per-context state"""
+        for pages in self.warm.values():
+            for page in pages:
+                discard_context(page.context)
+                slot = self.slots.pop(page.context, None)
+                if slot is not None:
+                    self.pool.slots.release(slot)
+                request_filter = self.filters.pop(page.context, None)
+                if request_filter is not None:
+                    request_filter.finish()
+        self.warm = {}
+
+    def _close_browser(self):
+        if self.browser is None:
+            return
+        try:
+            self.browser.close()
+        except Exception:
+            pass
+        self.browser = None
+
+
+class BrowserPool:
+    """Lazily started pool of browsers that lives as long as the process"""
+
+    def __init__(self, workers=BROWSER_POOL_WORKERS, channel=BROWSER_CHANNEL, headless=BROWSER_HEADLESS):
+        self.size = max(1, workers)
+        self.channel = channel
+        self.headless = headless
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stats = {"jobs": 0, "launches": 0, "relaunches": 0, "connects": 0}
+        self._vendors = {}
+        self._warm_stats = {}
+        self.slots = context_slots()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + amount
+
+    def _count_warm(self, vendor, key):
+        with self._lock:
+            counts = self._warm_stats.setdefault(
+                vendor, {"hits": 0, "misses": 0, "refreshes": 0, "failures": 0}
+            )
+            counts[key] += 1
+
+    def _warm_vendors(self):
+        with self._lock:
+            return [v for v in self._vendors.values() if v.size > 0]
+
+    def register_vendor(self, name, open_form, context_options=None, init_scripts=(), size=None):
+        """Register how to park pages on a vendor's search form"""
+        if size is None:
+            size = int(os.environ.get(f"WARM_PAGES_{name.upper()}", WARM_PAGES_DEFAULT))
+        with self._lock:
+            self._vendors[name] = _WarmVendor(name, open_form, context_options, init_scripts, size)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid() and self._workers:
+                return
+            # Threads do not survive a fork, so a forked worker starts its own
+            self._jobs = queue.Queue()
+            self._workers = [_BrowserWorker(self, i) for i in range(self.size)]
+            self._pid = os.getpid()
+            for worker in self._workers:
+                worker.start()
+
+    def submit(self, fn, *args, context_options=None, init_scripts=(), **kwargs):
+        """Schedule fn(context, *args, **kwargs) on a pool browser and return a Future"""
+        self._ensure_started()
+        self._count("jobs")
+        future = Future()
+        self._jobs.put((future, fn, args, kwargs, context_options, tuple(init_scripts)))
+        return future
+
+    def submit_warm(self, vendor, fn, *args, **kwargs):
+        """Schedule fn(page, form, *args, **kwargs) on a warm page of a registered vendor"""
+        with self._lock:
+            warm_vendor = self._vendors[vendor]
+        self._ensure_started()
+        self._count("jobs")
+        future = Future()
+        self._jobs.put((future, fn, args, kwargs, None, (), warm_vendor))
+        return future
+
+    def run(self, fn, *args, context_options=None, init_scripts=(), **kwargs):
+        """Run fn(context, *args, **kwargs) in a fresh context and return its result"""
+        return self.submit(
+            fn, *args, context_options=context_options, init_scripts=init_scripts, **kwargs
+        ).result()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["warm_pages"] = {
+                name: dict(counts, pool_size=self._vendors[name].size)
+                for name, counts in self._warm_stats.items()
+            }
+        stats["browser_server"] = browser_ws_endpoint()
+        if self.slots is not None:
+            stats["context_slots"] = {"limit": self.slots.limit, "in_use": self.slots.in_use()}
+        stats["workers"] = len(self._workers) if self._pid == os.getpid() else 0
+        stats["queued"] = self._jobs.qsize()
+        return stats
+
+    def shutdown(self, timeout=10):
+        """Stop all workers and close their browsers"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            workers, self._workers = self._workers, []
+            for _ in workers:
+                self._jobs.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0, deadline - time.monotonic()))
+
+
+_pool = BrowserPool()
+
+
+def get_browser_pool():
+    """Return the process-wide browser pool"""
+    return _pool
+
+
+def run_in_context(fn, *args, context_options=None, init_scripts=(), **kwargs):
+    """Run fn(context, *args, **kwargs) on the process-wide browser pool"""
+    return _pool.run(fn, *args, context_options=context_options, init_scripts=init_scripts, **kwargs)
+
+
+def register_warm_vendor(name, open_form, context_options=None, init_scripts=(), size=None):
+    """Keep pages parked on this vendor's search form (WARM_PAGES_<NAME> per worker)"""
+    _pool.register_vendor(name, open_form, context_options, init_scripts, size)
+
+
+def run_on_warm_page(vendor, fn, *args, **kwargs):
+    """Run fn(page, form, *args, **kwargs) on a warm page of a registered vendor.
+
+    form is whatever the vendor's open_form returned, or None when no warm
+    page was available and the caller has to open the form itself.
+    """
+    return _pool.submit_warm(vendor, fn, *args, **kwargs).result()
+
+
+def browser_pool_stats():
+    """Counters for launches, jobs and warm-page hits/misses"""
+    return _pool.stats()
+
+
+def shutdown_browser_pool(timeout=10):
+    """Close every pooled browser, used on worker exit"""
+    _pool.shutdown(timeout)
+
+
+atexit.register(shutdown_browser_pool)
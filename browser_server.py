@@ -0,0 +1,208 @@
+"""Shared Playwright browser server for multi-worker deployments.
+
+With BROWSER_SERVER_MODE=1, one long-running browser server is started,
+either by the gunicorn on_starting hook in gunicorn.conf.py or by running
+this module as a sidecar. Every worker's browser pool connects to it over
+BROWSER_WS_ENDPOINT instead of launching its own browsers, so Chromium
+memory no longer grows with the worker count.
+
+Python Playwright has no launch_server(), so the server is the driver's
+`playwright launch-server` command, kept alive by a supervisor thread.
+BROWSER_MAX_CONTEXTS caps the contexts open on the server across all
+workers, using one lock file per slot.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows desktop builds never run in server mode
+    fcntl = None
+
+
+BROWSER_SERVER_MODE = os.environ.get("BROWSER_SERVER_MODE", "").lower() in ("1", "true", "yes")
+BROWSER_SERVER_HOST = os.environ.get("BROWSER_SERVER_HOST", "127.0.0.1")
+BROWSER_SERVER_PORT = int(os.environ.get("BROWSER_SERVER_PORT", "9323"))
+BROWSER_SERVER_WS_PATH = os.environ.get("BROWSER_SERVER_WS_PATH", "device-search")
+BROWSER_MAX_CONTEXTS = int(os.environ.get("BROWSER_MAX_CONTEXTS", "6"))
+BROWSER_CONTEXT_WAIT = float(os.environ.get("BROWSER_CONTEXT_WAIT", "120"))
+BROWSER_SLOT_DIR = os.environ.get(
+    "BROWSER_SLOT_DIR", os.path.join(tempfile.gettempdir(), "device-search-context-slots")
+)
+
+
+def browser_ws_endpoint():
+    """Endpoint the browser pool should connect to, or None to launch locally"""
+    endpoint = os.environ.get("BROWSER_WS_ENDPOINT")
+    if endpoint:
+        return endpoint
+    if BROWSER_SERVER_MODE:
+        return f"ws://{BROWSER_SERVER_HOST}:{BROWSER_SERVER_PORT}/{BROWSER_SERVER_WS_PATH}"
+    return None
+
+
+class ContextSlotTimeout(Exception):
+    """Raised when no browser context slot frees up in time"""
+
+
+class ContextSlots:
+    """Cross-process cap on open browser contexts, one flock'd file per slot"""
+
+    def __init__(self, limit=BROWSER_MAX_CONTEXTS, directory=BROWSER_SLOT_DIR):
+        self.limit = max(1, limit)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _try_slot(self, index):
+        handle = open(os.path.join(self.directory, f"slot-{index}.lock"), "a")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def _free_slot(self):
+        for index in range(self.limit):
+            handle = self._try_slot(index)
+            if handle is not None:
+                return handle
+        return None
+
+    def acquire(self, timeout=BROWSER_CONTEXT_WAIT):
+        """Take a free slot, waiting up to timeout seconds (0 means don't wait)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            handle = self._free_slot()
+            if handle is not None:
+                return handle
+            if time.monotonic() >= deadline:
+                raise ContextSlotTimeout(f"all {self.limit} browser context slots are busy")
+            time.sleep(0.1)
+
+    async def acquire_async(self, timeout=BROWSER_CONTEXT_WAIT):
+        """acquire() on the event loop: a task cancelled while waiting never ends up holding a slot"""
+        deadline = time.monotonic() + timeout
+        while True:
+            handle = self._free_slot()
+            if handle is not None:
+                return handle
+            if time.monotonic() >= deadline:
+                raise ContextSlotTimeout(f"all {self.limit} browser context slots are busy")
+            await asyncio.sleep(0.1)
+
+    def release(self, handle):
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            handle.close()
+
+    def in_use(self):
+        busy = 0
+        for index in range(self.limit):
+            handle = self._try_slot(index)
+            if handle is None:
+                busy += 1
+            else:
+                self.release(handle)
+        return busy
+
+
+def context_slots():
+    """Global context cap when connected to a shared server, else None"""
+    if browser_ws_endpoint() is None or fcntl is None:
+        return None
+    return ContextSlots()
+
+
+class BrowserServer:
+    """Runs `playwright launch-server` and restarts it if it exits"""
+
+    def __init__(self, port=BROWSER_SERVER_PORT, ws_path=BROWSER_SERVER_WS_PATH):
+        self.port = port
+        self.ws_path = ws_path
+        self.process = None
+        self._stopping = threading.Event()
+        self._thread = None
+        self._config_path = None
+
+    @property
+    def ws_endpoint(self):
+        return f"ws://{BROWSER_SERVER_HOST}:{self.port}/{self.ws_path}"
+
+    def _write_config(self):
+        # Import lazily so the gunicorn master does not need the whole pool
+        from browser_pool import BROWSER_CHANNEL, BROWSER_HEADLESS, LAUNCH_ARGS
+
+        config = {
+            "channel": BROWSER_CHANNEL,
+            "headless": BROWSER_HEADLESS,
+            "args": LAUNCH_ARGS,
+            "port": self.port,
+            "host": BROWSER_SERVER_HOST,
+            "wsPath": self.ws_path,
+        }
+        fd, self._config_path = tempfile.mkstemp(prefix="browser-server-", suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(config, f)
+
+    def _spawn(self):
+        print(f"Starting browser server on {self.ws_endpoint}...")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "playwright", "launch-server",
+             "--browser", "chromium", "--config", self._config_path],
+        )
+
+    def _supervise(self):
+        while not self._stopping.is_set():
+            if self.process.poll() is not None:
+                print(f"Browser server exited with code {self.process.returncode}, restarting...")
+                time.sleep(1)
+                if not self._stopping.is_set():
+                    self._spawn()
+            self._stopping.wait(1)
+
+    def start(self):
+        self._write_config()
+        self._spawn()
+        self._thread = threading.Thread(target=self._supervise, name="browser-server", daemon=True)
+        self._thread.start()
+        return self.ws_endpoint
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._config_path:
+            try:
+                os.remove(self._config_path)
+            except OSError:
+                pass
+
+
+def main():
+    """Sidecar entry point: python browser_server.py"""
+    server = BrowserServer()
+    endpoint = server.start()
+    print(f"Workers should set BROWSER_WS_ENDPOINT={endpoint}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""Offline catalog of vendor devices with local prefix lookup and typeahead.
+
+Vendor device lists are kept in a small SQLite file (CATALOG_PATH). Rows get
+there from imported dumps, from the result cache, or from an opt-in crawl
+that runs the normal vendor searches over a list of part numbers:
+
+    python catalog.py import dataio_devices.csv --vendor dataio
+    python catalog.py import-cache
+    python catalog.py crawl parts.txt --vendor bpmicro
+    python catalog.py stats
+
+In memory, each website's part numbers are held as one sorted list with a
+dict of exact keys. Bisecting the sorted list walks it like a flattened
+prefix trie. lookup() answers what a live variation search would find, and
+suggest() powers /api/suggest. Both take microseconds, so live scraping is
+only needed for parts the catalog does not know. Only imported device
+lists are trusted for truncated variations; crawled and cached rows answer
+exact part numbers.
+"""
+import argparse
+import bisect
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from result_cache import cache_key, get_result_cache
+from variation_search import build_part_variations
+
+
+CATALOG_ENABLED = os.environ.get("CATALOG", "1").lower() not in ("0", "false", "no")
+CATALOG_PATH = os.environ.get(
+    "CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.sqlite3")
+)
+CATALOG_RELOAD_INTERVAL = float(os.environ.get("CATALOG_RELOAD_INTERVAL", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    vendor TEXT NOT NULL,
+    part TEXT NOT NULL,
+    part_number TEXT NOT NULL,
+    socket TEXT NOT NULL,
+    source TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (vendor, part)
+);
+"""
+
+
+class PrefixIndex:
+    """Immutable in-memory index of one catalog snapshot"""
+
+    def __init__(self, rows):
+        # vendor -> {part key: (part number, socket)}
+        self.exact = {}
+        # Websites with an imported device list, whose absence of a part means
+        # the vendor does not know it either
+        self.complete = set()
+        for vendor, part, part_number, socket, source in rows:
+            self.exact.setdefault(vendor, {})[part] = (part_number, socket)
+            if source == "import":
+                self.complete.add(vendor)
+        self.keys = {vendor: sorted(entries) for vendor, entries in self.exact.items()}
+        self.all_keys = sorted({part for entries in self.exact.values() for part in entries})
+
+    def _first_with_prefix(self, keys, prefix):
+        index = bisect.bisect_left(keys, prefix)
+        if index < len(keys) and keys[index].startswith(prefix):
+            return keys[index]
+        return None
+
+    def lookup(self, vendor, part_variations):
+        """(socket, part_used) for the first variation the catalog can answer, or None
+
+        With an imported device list a variation is answered by its exact
+        entry, else by the first known part it is a prefix of, which is what
+        the vendor search would list. Crawled and cached rows only cover the
+        parts someone searched, so they only answer the full part number.
+        """
+        exact = self.exact.get(vendor)
+        if not exact:
+            return None
+        if vendor not in self.complete:
+            key = cache_key(part_variations[0]) if part_variations else ""
+            return (exact[key][1], part_variations[0]) if key in exact else None
+        for part_number in part_variations:
+            key = cache_key(part_number)
+            if not key:
+                continue
+            match = key if key in exact else self._first_with_prefix(self.keys[vendor], key)
+            if match is not None:
+                return exact[match][1], part_number
+        return None
+
+    def suggest(self, prefix, limit=10, vendors=None):
+        """Known part numbers starting with prefix, with the socket per website"""
+        prefix = cache_key(prefix)
+        if not prefix:
+            return []
+        suggestions = []
+        index = bisect.bisect_left(self.all_keys, prefix)
+        while index < len(self.all_keys) and len(suggestions) < limit:
+            key = self.all_keys[index]
+            if not key.startswith(prefix):
+                break
+            index += 1
+            sockets = {
+                vendor: entries[key][1] for vendor, entries in self.exact.items()
+                if key in entries and (vendors is None or vendor in vendors)
+            }
+            if sockets:
+                part_number = next(iter(self.exact[vendor][key][0] for vendor in sockets))
+                suggestions.append({"part_number": part_number, "sockets": sockets})
+        return suggestions
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.exact.values())
+
+
+class Catalog:
+    """SQLite-backed catalog with a lazily reloaded PrefixIndex"""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = None
+        self._loaded_mtime = None
+        self._checked = 0.0
+        self._stats = {"lookups": 0, "hits": 0, "suggests": 0, "reloads": 0}
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.executescript(_SCHEMA)
+        return db
+
+    def index(self):
+        """Current PrefixIndex, reloaded when the file changed"""
+        now = time.monotonic()
+        if self._index is not None and now - self._checked < CATALOG_RELOAD_INTERVAL:
+            return self._index
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if self._index is None or mtime != self._loaded_mtime:
+                rows = []
+                if mtime is not None:
+                    with self._connect() as db:
+                        rows = db.execute("SELECT vendor, part, part_number, socket, source FROM devices").fetchall()
+                self._index = PrefixIndex(rows)
+                self._loaded_mtime = mtime
+                self._stats["reloads"] += 1
+        return self._index
+
+    def lookup(self, vendor, original_part_number):
+        self._stats["lookups"] += 1
+        result = self.index().lookup(vendor, build_part_variations(original_part_number, vendor=vendor))
+        if result:
+            self._stats["hits"] += 1
+        return result
+
+    def suggest(self, prefix, limit=10, vendors=None):
+        self._stats["suggests"] += 1
+        return self.index().suggest(prefix, limit, vendors)
+
+    def add(self, rows, source):
+        """Insert or replace [(vendor, part number, socket)], returning the count"""
+        now = time.time()
+        records = [
+            (vendor, cache_key(part_number), part_number.strip(), socket.strip(), source, now)
+            for vendor, part_number, socket in rows
+            if part_number and part_number.strip() and socket and socket.strip()
+        ]
+        with self._connect() as db:
+            db.executemany("INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?, ?)", records)
+        # Pick the new rows up on the next lookup
+        self._checked = 0.0
+        return len(records)
+
+    def stats(self):
+        index = self.index()
+        return dict(
+            self._stats,
+            entries=len(index),
+            vendors={vendor: len(entries) for vendor, entries in index.exact.items()},
+            complete=sorted(index.complete),
+            path=self.path,
+        )
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """The process-wide catalog, or None when CATALOG=0"""
+    global _catalog
+    if not CATALOG_ENABLED:
+        return None
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = Catalog()
+        return _catalog
+
+
+def catalog_lookup(vendor, original_part_number):
+    catalog = get_catalog()
+    return catalog.lookup(vendor, original_part_number) if catalog is not None else None
+
+
+def catalog_stats():
+    catalog = get_catalog()
+    return catalog.stats() if catalog is not None else {"enabled": False}
+
+
+def read_dump(path, vendor=None):
+    """[(vendor, part number, socket)] from a CSV (with a header) or JSON lines dump"""
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".json")):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        for record in records:
+            record_vendor = vendor or record.get("vendor") or record.get("website")
+            if not record_vendor:
+                raise ValueError(f"{path}: no vendor column, pass --vendor")
+            socket = record.get("socket") or record.get("socket_info") or record.get("adapter")
+            rows.append((record_vendor.lower(), record.get("part_number") or record.get("part"), socket))
+    return rows
+
+
+def import_result_cache(catalog):
+    cache = get_result_cache()
+    if cache is None:
+        return 0
+    return catalog.add(
+        [(vendor, part, result) for vendor, part, result in cache.found_entries() if isinstance(result, str)],
+        "cache",
+    )
+
+
+def crawl(catalog, vendor, part_numbers, search):
+    """Run search(part, cancel_event=None) for each part and catalog what it finds"""
+    added = 0
+    for part_number in part_numbers:
+        try:
+            result = search(part_number, cancel_event=None)
+        except Exception as e:
+            print(f"Crawling {vendor} '{part_number}' failed: {e}")
+            continue
+        if result:
+            socket, part_used = result
+            added += catalog.add([(vendor, part_used, socket)], "crawl")
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the offline vendor device catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="import a CSV or JSON lines device dump")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--vendor", help="website the dump belongs to, if it has no vendor column")
+    commands.add_parser("import-cache", help="catalog every found result in the result cache")
+    crawl_parser = commands.add_parser("crawl", help="search a list of parts live and catalog the results")
+    crawl_parser.add_argument("path", help="text file with one part number per line")
+    crawl_parser.add_argument("--vendor", required=True, choices=["systemgeneral", "dataio", "bpmicro"])
+    commands.add_parser("stats")
+    suggest_parser = commands.add_parser("suggest")
+    suggest_parser.add_argument("prefix")
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    if args.command == "import":
+        print(f"Imported {catalog.add(read_dump(args.path, args.vendor), 'import')} devices")
+    elif args.command == "import-cache":
+        print(f"Imported {import_result_cache(catalog)} devices from the result cache")
+    elif args.command == "crawl":
+        from web_search_functions import live_search
+
+        with open(args.path, encoding="utf-8") as f:
+            part_numbers = [line.strip() for line in f if line.strip()]
+        search = lambda part_number, cancel_event=None: live_search(args.vendor, part_number, cancel_event)
+        print(f"Catalogued {crawl(catalog, args.vendor, part_numbers, search)} devices")
+    elif args.command == "stats":
+        print(json.dumps(catalog.stats(), indent=2))
+    elif args.command == "suggest":
+        print(json.dumps(catalog.suggest(args.prefix), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Browserless DataIO search replaying the Device-Search WebForms postback.
+
+The Device-Search page is an ASP.NET (DNN) form. The SEARCH button posts it
+back with __VIEWSTATE/__EVENTVALIDATION, and the first result links to the
+device page holding the "Standard Adapter". A requests session reproduces
+that flow without the browser and without its fixed sleeps.
+DATAIO_SEARCH_URL overrides the search page (e.g. for fake_vendor_server.py).
+harvest() instead searches the shortest variation once and opens the best
+ranked result.
+"""
+import os
+import re
+from urllib.parse import urljoin
+
+import lxml.html
+
+from extraction import standard_adapter
+from http_client import DirectSearchFailed, fetch, parse_form
+from variation_search import HARVEST_ALTERNATES, SearchCancelled, probe_order, rank_candidates
+
+
+SEARCH_URL = os.environ.get("DATAIO_SEARCH_URL", "https://dataio.com/Support/Device-Search")
+SEARCH_PLACEHOLDER = "Part #, Adapter or Manfacturer"
+NO_RESULTS_TEXT = "No search results found."
+
+_POSTBACK_PATTERN = re.compile(r"__doPostBack\(\s*'([^']*)'\s*,\s*'([^']*)'\s*\)")
+_RESULT_COUNT_PATTERN = re.compile(r"\((\d+)\)")
+
+
+def search_variations(part_variations, cancel_event=None):
+    """Try each variation in order and return (standard_adapter, part_used) or None"""
+    page = fetch("GET", SEARCH_URL)
+    html, url = page.text, page.url
+
+    for part_number in probe_order(part_variations):
+        if cancel_event is not None and cancel_event.is_set():
+            raise SearchCancelled(part_number)
+        print(f"Searching for part number: {part_number} (direct)")
+        results = _post_search(html, url, part_number)
+        # Later variations post back from the latest page state, like the browser
+        html, url = results.text, results.url
+
+        device_page = _open_first_result(html, url)
+        if device_page is None:
+            print("No results found for this part number")
+            continue
+        adapter = standard_adapter(device_page.text)
+        if not adapter:
+            # The search listed this device, so a page without an adapter is unreadable, not a miss
+            raise DirectSearchFailed(f"no Standard Adapter on the device page for '{part_number}'")
+        print(f"Found result for part number '{part_number}': {adapter}")
+        return adapter, part_number
+    return None
+
+
+def harvest(original_part_number, part_variations, cancel_event=None):
+    """Search once for the shortest variation and open the best result
+
+    Returns (result, alternates): result is (standard_adapter, part_used) or
+    None, as from search_variations(), and alternates lists the other
+    matching devices as {"part_number", "socket_info"} (socket_info is None,
+    their device pages are not opened). When the list is shorter than the
+    reported count it falls back to searching each variation.
+    """
+    shortest = min(part_variations, key=len)
+    page = fetch("GET", SEARCH_URL)
+    if cancel_event is not None and cancel_event.is_set():
+        raise SearchCancelled(shortest)
+    print(f"Harvesting candidates for part number: {shortest} (direct)")
+    results = _post_search(page.text, page.url, shortest)
+    html, url = results.text, results.url
+
+    links, total = _result_links(html, url)
+    if total is not None and total > len(links):
+        print(f"Only {len(links)} of {total} results listed, searching each variation instead")
+        return search_variations(part_variations, cancel_event), []
+    names = [" ".join(link.text_content().split()) for link in links]
+    ranked = rank_candidates(original_part_number, part_variations, names)
+
+    # Like the variation loop, give up after as many device pages as variations
+    opened = ranked[:len(part_variations)]
+    for index, part_used in opened:
+        if cancel_event is not None and cancel_event.is_set():
+            raise SearchCancelled(part_used)
+        adapter = standard_adapter(_open_result(html, url, links[index]).text)
+        if adapter:
+            print(f"Found result for part number '{part_used}': {adapter}")
+            alternates = [
+                {"part_number": names[other], "socket_info": None}
+                for other, _ in ranked if other != index
+            ]
+            return (adapter, part_used), alternates[:HARVEST_ALTERNATES]
+        print(f"No Standard Adapter on the page of '{names[index]}'")
+    if opened:
+        raise DirectSearchFailed(f"no Standard Adapter on the device pages of {len(opened)} matching results")
+    print("No matching results for any variation")
+    return None, []
+
+
+def _search_controls(doc):
+    inputs = doc.xpath(f'//input[@placeholder="{SEARCH_PLACEHOLDER}"]')
+    buttons = doc.xpath('//input[@type="button" and @value="SEARCH"] | //input[@type="submit" and @value="SEARCH"]')
+    if not inputs or not inputs[0].get("name") or not buttons:
+        raise DirectSearchFailed("DataIO search input or SEARCH button not found")
+    return inputs[0], buttons[0]
+
+
+def _post_search(html, url, part_number):
+    doc = lxml.html.fromstring(html, base_url=url)
+    search_input, button = _search_controls(doc)
+    action, method, fields = parse_form(html, url, search_input.get("name"))
+    if "__VIEWSTATE" not in fields:
+        raise DirectSearchFailed("DataIO form has no __VIEWSTATE")
+
+    fields[search_input.get("name")] = part_number
+    postback = _POSTBACK_PATTERN.search(button.get("onclick") or "")
+    if postback:
+        fields["__EVENTTARGET"], fields["__EVENTARGUMENT"] = postback.groups()
+    elif button.get("name"):
+        fields[button.get("name")] = button.get("value")
+    return fetch(method, action, data=fields, headers={"Referer": url})
+
+
+def _result_links(html, url):
+    """(result links, reported result count or None), no links when nothing matched"""
+    doc = lxml.html.fromstring(html, base_url=url)
+    links = doc.xpath(
+        '//a[contains(@id, "dnn_ctr6237_View_lvDeviceSearchResults_ctrl")'
+        ' and contains(@id, "lnkDeviceSearchResultDevice")]'
+    )
+    messages = doc.xpath('//div[@id="dnn_ctr6237_View_pnlSearchResults"]//h3')
+    if not links:
+        if messages and NO_RESULTS_TEXT in messages[0].text_content():
+            return [], 0
+        raise DirectSearchFailed("DataIO response has neither result links nor a 'no results' message")
+    match = _RESULT_COUNT_PATTERN.search(messages[0].text_content()) if messages else None
+    return links, int(match.group(1)) if match else None
+
+
+def _open_first_result(html, url):
+    """Device page of the first result, None when the search found nothing"""
+    links, _ = _result_links(html, url)
+    if not links:
+        return None
+    print("Results found! Opening first result:", links[0].text_content().strip())
+    return _open_result(html, url, links[0])
+
+
+def _open_result(html, url, link):
+    href = link.get("href") or ""
+    postback = _POSTBACK_PATTERN.search(href)
+    if not postback:
+        return fetch("GET", urljoin(url, href), headers={"Referer": url})
+
+    action, method, fields = parse_form(html, url, "__VIEWSTATE")
+    fields["__EVENTTARGET"], fields["__EVENTARGUMENT"] = postback.groups()
+    return fetch(method, action, data=fields, headers={"Referer": url})
@@ -1,208 +1,255 @@
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-import time
-
-
-def search_part_number_in_dataio(original_part_number):
-    """Search with variations - try up to 4 times by removing characters from the end"""
-    part_variations = [original_part_number]
-    
-    # Generate variations by removing one character at a time
-    current_part = original_part_number
-    for i in range(3):  # Try 3 more times (total 4 attempts)
-        if len(current_part) > 1:  # Make sure we don't end up with empty string
-            current_part = current_part[:-1]  # Remove last character
-            part_variations.append(current_part)
-    
+from browser_pool import register_warm_vendor, run_on_warm_page
+from http_client import DirectSearchFailed, record
+from variation_search import (
+    SearchFailed,
+    SearchFormUnusable,
+    build_part_variations,
+    fresh,
+    harvested_variations,
+    mark_stale,
+    mark_stale_async,
+    search_variations_in_page,
+    search_variations_in_parallel,
+    use_harvest,
+    use_parallel_variations,
+)
+from wait_engine import (
+    expect_navigation,
+    expect_navigation_async,
+    expect_response,
+    expect_response_async,
+    settle,
+    settle_async,
+    wait_for,
+    wait_for_async,
+)
+from extraction import standard_adapter
+import os
+import dataio_http
+
+
+VENDOR = "dataio"
+SEARCH_URL = "https://dataio.com/Support/Device-Search"
+SEARCH_INPUT_SELECTOR = 'input[placeholder="Part #, Adapter or Manfacturer"]'
+RESULT_LINK_SELECTOR = 'a[id*="dnn_ctr6237_View_lvDeviceSearchResults_ctrl"][id*="lnkDeviceSearchResultDevice"]'
+NO_RESULTS_SELECTOR = "div#dnn_ctr6237_View_pnlSearchResults h3"
+NO_RESULTS_TEXT = "No search results found."
+
+# 'auto' replays the WebForms postback first and falls back to the browser,
+# 'http' never opens a browser, 'browser' never uses the direct requests
+BACKEND = os.environ.get("DATAIO_BACKEND", "auto").lower()
+
+
+def search_part_number_in_dataio(original_part_number, parallel=None, cancel_event=None, browser_search=None,
+                                 part_variations=None, harvest=None, meta=None):
+    """Search ranked part number variations (part_grammar.py), at most MAX_PROBES of them
+
+    browser_search(original_part_number, part_variations), when given,
+    replaces the pooled browser fallback (the async engine passes its own).
+    part_variations overrides the variations to try, e.g. without the ones
+    the result cache already knows to miss. With harvest (default HARVEST)
+    the direct backend searches once and meta['alternates'] gets the other
+    candidates it listed.
+    """
+    if part_variations is None:
+        part_variations = build_part_variations(original_part_number, vendor=VENDOR)
+
     print(f"Will try these part number variations: {part_variations}")
-    
-    for i, part_number in enumerate(part_variations):
-        print(f"\n--- Attempt {i+1}: Trying part number '{part_number}' ---")
-        
-        result = _search_single_part_dataio(part_number)
-        if result:
-            print(f"SUCCESS! Found result for part number '{part_number}': {result}")
-            return (result, part_number)
+
+    if BACKEND != "browser":
+        try:
+            if use_harvest(harvest):
+                result, alternates = dataio_http.harvest(original_part_number, part_variations, cancel_event)
+                if meta is not None:
+                    meta["alternates"] = alternates
+                    meta["probed"] = harvested_variations(result, part_variations)
+            else:
+                result = dataio_http.search_variations(part_variations, cancel_event)
+        except DirectSearchFailed as e:
+            if BACKEND == "http":
+                raise
+            print(f"Direct DataIO search failed ({e}), falling back to the browser")
+            record(VENDOR, "fallback")
         else:
-            print(f"No results found for part number '{part_number}'")
-    
+            record(VENDOR, "direct")
+            if result:
+                return result
+            print(f"No results found for any variation of part number '{original_part_number}' after trying {len(part_variations)} variations")
+            return None
+
+    if browser_search is not None:
+        return browser_search(original_part_number, part_variations)
+
+    if use_parallel_variations(parallel):
+        result = search_variations_in_parallel(
+            VENDOR, part_variations, _search_variations_on_page, cancel_event=cancel_event
+        )
+    else:
+        result = run_on_warm_page(
+            VENDOR, _search_variations_on_page, part_variations, cancel_event=cancel_event
+        )
+    if result:
+        return result
+
     # If we get here, no results were found for any variation
     print(f"No results found for any variation of part number '{original_part_number}' after trying {len(part_variations)} variations")
     return None
 
 def _search_single_part_dataio(part_number):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(channel="msedge", headless=True)
-        page = browser.new_page()
-        
-        page.set_default_timeout(60000)
-        page.set_default_navigation_timeout(60000)
-        
-        try:
-            print(f"Searching for part number: {part_number}")
-
-
-            print("Navigating to website...")
-            page.goto("https://dataio.com/Support/Device-Search", wait_until="domcontentloaded")
-            print("Page loaded successfully")
-            
-            
-            try:
-
-                print("Waiting for search input...")
-                search_input = page.wait_for_selector('input[placeholder="Part #, Adapter or Manfacturer"]', timeout=30000)
-                print("Search input found!")
-                print("Filling search input...")
-                search_input.fill(part_number)
-                print("Search input filled!")
-                time.sleep(2)
-            except Exception as e:
-                print(f"Error waiting for search input: {e}")
-
-            try:
-                print("Waiting for search button...")
-                search_button = page.wait_for_selector('input[type="button"][value="SEARCH"]', timeout=30000)
-                print("Search button found!")
-                print("Clicking search button...")
-                search_button.click()
-
-                time.sleep(2)
-
-                # First check if there are result links
-                print("Checking for result links...")
-                first_link = page.locator('a[id*="dnn_ctr6237_View_lvDeviceSearchResults_ctrl"][id*="lnkDeviceSearchResultDevice"]')
-                
-                if first_link.count() > 0:
-                    print("Results found! Clicking first result:", first_link.first.inner_text())
-                    first_link.first.click()
-                else:
-                    # Only check for "no results" message if no links are found
-                    print("No result links found, checking for 'no results' message...")
-                    try:
-                        message = page.locator("div#dnn_ctr6237_View_pnlSearchResults h3")
-                        if message.count() > 0:
-                            message_text = message.inner_text()
-                            print("Message is:", message_text)
-                            if "No search results found." in message_text:
-                                print("No results, stopping.")
-                                return None
-                    except Exception as e:
-                        print(f"Error checking for no results message: {e}")
-                    
-                    print("No result links found and no clear 'no results' message")
-                    return None
-
-                                
-                # Wait for navigation to results page
-                print("Waiting for navigation to results page...")
-                try:
-                    # Wait for the page to navigate to a new URL
-                    page.wait_for_url("**", timeout=15000)
-                    print(f"Navigated to: {page.url}")
-                    
-                    # Wait for the new page to load
-                    page.wait_for_load_state("domcontentloaded", timeout=15000)
-                    print("Results page loaded successfully")
-                    
-                    # Give extra time for results to fully load
-                    time.sleep(3)
-                    
-                    print("Waiting for results table...")
-                    page.wait_for_selector('div[class="row"]', timeout=15000)
-                    print("Results table found!")
-
-                    time.sleep(1)
-
-                    print("Extracting results...")
-                    # Look for Standard Adapter information and the socket number below it!
-                    try:
-                        # Strategy: Find "Standard Adapter" and look for the actual socket number in the adjacent column
-                        adapter_elements = page.locator('text="Standard Adapter"')
-                        if adapter_elements.count() > 0:
-                            print("Found 'Standard Adapter' text on page")
-                            
-                            # Get the parent container that holds both label and value
-                            parent_container = adapter_elements.first.locator('xpath=ancestor::div[contains(@class, "row") or contains(@class, "container")]')
-                            
-                            if parent_container.count() > 0:
-                                print("Found parent container")
-                                
-                                # Look specifically for the socket number in the value column
-                                # Try different approaches to find the actual socket number
-                                socket_selectors = [
-                                    'div[id*="dataPartNumber"]',  # Most specific - the actual data field
-                                    'div[class*="col"]:has-text("Socket"):not(:has-text("Standard Adapter"))',  # Column with socket info
-                                    'div[class*="col-sm-5"]',  # Common value column class
-                                    'div[class*="col"]:nth-child(2)',  # Second column (value column)
-                                ]
-                                
-                                results = None
-                                for selector in socket_selectors:
-                                    socket_elements = parent_container.locator(selector)
-                                    if socket_elements.count() > 0:
-                                        for i in range(socket_elements.count()):
-                                            text = socket_elements.nth(i).text_content().strip()
-                                            # Look for text that looks like a socket number (contains letters/numbers but not "Standard Adapter")
-                                            if (text and 
-                                                text != "Standard Adapter" and 
-                                                "Standard Adapter" not in text and
-                                                text != "Sockets" and
-                                                len(text) > 0):
-                                                results = text
-                                                print(f"Found socket number with selector '{selector}': {results}")
-                                                break
-                                        if results:
-                                            break
-                                
-                                # If still no results, try a broader search in the entire page for socket numbers
-                                if not results:
-                                    print("Trying broader search for socket numbers...")
-                                    # Look for elements that might contain socket numbers near "Standard Adapter"
-                                    all_elements = page.locator('div[id*="dataPartNumber"], span, p')
-                                    for i in range(min(all_elements.count(), 20)):  # Limit to first 20 elements
-                                        text = all_elements.nth(i).text_content().strip()
-                                        # Look for text that could be a socket number (alphanumeric, not common words)
-                                        if (text and 
-                                            text not in ["Standard Adapter", "Sockets", "Socket", "Adapter"] and
-                                            len(text) > 1 and len(text) < 50):  # Reasonable length for socket number
-                                            results = text
-                                            print(f"Found potential socket number: {results}")
-                                            break
-                            else:
-                                print("Could not find parent container for Standard Adapter")
-                                return None
-                        else:
-                            print("'Standard Adapter' text not found")
-                            return None
-                    
-                    except Exception as e:
-                        print(f"Error extracting socket info: {e}")
-                        return None
-                    
-                    print("Results extracted!")
-
-                    if results:
-                        print(f"Found result for part number '{part_number}': {results}")
-                        return results
-                    else:
-                        print(f"No results found for part number '{part_number}'")
-                        return None
-
-                    
-                except Exception as e:
-                    print(f"Error during navigation: {e}")
-                    return None
-                
-            except Exception as e:
-                print(f"Error waiting for search button: {e}")
-                return None
+    result = run_on_warm_page(VENDOR, _search_variations_on_page, [part_number])
+    return result[0] if result else None
+
+
+def _search_variations_on_page(page, form, part_variations, cancel_event=None):
+    return search_variations_in_page(
+        page, part_variations, _open_search_form, _query_part, form=form, cancel_event=cancel_event
+    )
+
+
+def _open_search_form(page):
+    print("Navigating to website...")
+    page.goto(SEARCH_URL, wait_until="domcontentloaded")
+    print("Page loaded successfully")
 
-        except Exception as e:
-            print(f"Error searching for part number '{part_number}': {e}")
-        finally:
-            print("Closing browser...")
-            browser.close()
-        
-        
+    print("Waiting for search input...")
+    wait_for(page.locator(SEARCH_INPUT_SELECTOR).first, VENDOR, "form")
+    print("Search input found!")
+    return page
 
 
+def _query_part(page, form, part_number):
+    print(f"Searching for part number: {part_number}")
+
+    search_input = page.locator(SEARCH_INPUT_SELECTOR)
+    search_button = page.locator('input[type="button"][value="SEARCH"]')
+    if search_input.count() == 0 or search_button.count() == 0:
+        raise SearchFormUnusable("search input or SEARCH button not found")
+
+    # Tag the previous variation's results so we only read fresh ones
+    mark_stale(page.locator(f"{RESULT_LINK_SELECTOR}, {NO_RESULTS_SELECTOR}"))
+
+    print("Filling search input...")
+    search_input.first.fill(part_number)
+    print("Search input filled!")
+
+    # The SEARCH button posts the form back; wait for that response instead of a fixed 2s pause
+    print("Clicking search button...")
+    try:
+        with expect_response(page, _is_postback, VENDOR, replaced=2):
+            search_button.first.click()
+    except Exception:
+        print("No search postback response seen")
+
+    try:
+        wait_for(page.locator(fresh(f"{RESULT_LINK_SELECTOR}, {NO_RESULTS_SELECTOR}")).first, VENDOR, "results")
+    except Exception:
+        print("No fresh results or message appeared after searching")
+
+    # First check if there are result links
+    print("Checking for result links...")
+    first_link = page.locator(fresh(RESULT_LINK_SELECTOR))
+
+    if first_link.count() > 0:
+        print("Results found! Clicking first result:", first_link.first.inner_text())
+        try:
+            with expect_navigation(page, VENDOR):
+                first_link.first.click()
+        except Exception:
+            print("No navigation seen after clicking the first result")
+    else:
+        # Only check for "no results" message if no links are found
+        print("No result links found, checking for 'no results' message...")
+        message = page.locator(fresh(NO_RESULTS_SELECTOR))
+        if message.count() > 0:
+            message_text = message.first.inner_text()
+            print("Message is:", message_text)
+            if NO_RESULTS_TEXT in message_text:
+                print("No results, stopping.")
+                return None
+        raise SearchFailed("no result links and no 'No search results found.' message")
+
+    return _read_device_page(page, part_number)
+
+
+def _is_postback(response):
+    """The response to the WebForms postback of the search form"""
+    return response.request.method == "POST" and response.request.resource_type in ("document", "xhr", "fetch")
+
+
+def _read_device_page(page, part_number):
+    # The click already waited for the navigation to DOMContentLoaded
+    print(f"Navigated to: {page.url}")
+    try:
+        print("Waiting for results table...")
+        wait_for(page.locator('div[class="row"]').first, VENDOR, "navigation", replaced=3)
+        print("Results table found!")
+        settle(page.locator("body"), VENDOR, replaced=1)
+
+        print("Extracting results...")
+        results = standard_adapter(page.content())
+    except Exception as e:
+        raise SearchFailed(f"device page for '{part_number}' could not be read: {e}") from e
+
+    # The search listed this device, so a page without an adapter is unreadable, not a miss
+    if not results:
+        raise SearchFailed(f"no Standard Adapter on the device page for '{part_number}'")
+    print(f"Found result for part number '{part_number}': {results}")
+    return results
+
+
+# Async twins of the steps above, run by async_engine.py
+
+async def _open_search_form_async(page):
+    await page.goto(SEARCH_URL, wait_until="domcontentloaded")
+    await wait_for_async(page.locator(SEARCH_INPUT_SELECTOR).first, VENDOR, "form")
+    return page
+
+
+async def _query_part_async(page, form, part_number):
+    search_input = page.locator(SEARCH_INPUT_SELECTOR)
+    search_button = page.locator('input[type="button"][value="SEARCH"]')
+    if await search_input.count() == 0 or await search_button.count() == 0:
+        raise SearchFormUnusable("search input or SEARCH button not found")
+
+    await mark_stale_async(page.locator(f"{RESULT_LINK_SELECTOR}, {NO_RESULTS_SELECTOR}"))
+    await search_input.first.fill(part_number)
+    try:
+        async with expect_response_async(page, _is_postback, VENDOR, replaced=2):
+            await search_button.first.click()
+    except Exception:
+        print("No search postback response seen")
+    try:
+        await wait_for_async(
+            page.locator(fresh(f"{RESULT_LINK_SELECTOR}, {NO_RESULTS_SELECTOR}")).first, VENDOR, "results"
+        )
+    except Exception:
+        print("No fresh results or message appeared after searching")
+
+    first_link = page.locator(fresh(RESULT_LINK_SELECTOR))
+    if await first_link.count() == 0:
+        message = page.locator(fresh(NO_RESULTS_SELECTOR))
+        if await message.count() > 0 and NO_RESULTS_TEXT in (await message.first.inner_text()):
+            print("No results, stopping.")
+            return None
+        raise SearchFailed("no result links and no 'No search results found.' message")
+    try:
+        async with expect_navigation_async(page, VENDOR):
+            await first_link.first.click()
+    except Exception:
+        print("No navigation seen after clicking the first result")
+    return await _read_device_page_async(page, part_number)
+
+
+async def _read_device_page_async(page, part_number):
+    try:
+        await wait_for_async(page.locator('div[class="row"]').first, VENDOR, "navigation", replaced=3)
+        await settle_async(page.locator("body"), VENDOR, replaced=1)
+        results = standard_adapter(await page.content())
+    except Exception as e:
+        raise SearchFailed(f"device page for '{part_number}' could not be read: {e}") from e
+    if not results:
+        raise SearchFailed(f"no Standard Adapter on the device page for '{part_number}'")
+    return results
+
+
+register_warm_vendor(VENDOR, _open_search_form)
@@ -0,0 +1,313 @@
+"""Vendor extraction rules, run with lxml on one HTML snapshot per page or frame.
+
+The browser flows take a single snapshot (page.content(), or the outer/inner
+HTML of the frame part they need) and hand it to these functions instead of
+querying the live page element by element. The direct HTTP backends feed
+them the fetched HTML, so both paths read vendor pages the same way. Every
+rule is a plain function of an HTML string and can be checked against a
+saved page:
+
+    python extraction.py device_socket fixtures/bpmicro/devices/70231.html AT28C256-15PU
+"""
+import inspect
+import re
+import sys
+
+import lxml.html
+
+from part_normalize import same_part
+
+
+# Set by variation_search.mark_stale() on results of the previous variation
+STALE_ATTRIBUTE = "data-ds-stale"
+SOCKET_PATTERN = re.compile(r"(SM\d+[A-Z]*|ASM\d+[A-Z]*|FVE\d+[A-Z]*)", re.IGNORECASE)
+_SOCKET_HINT = re.compile(r"SM\d+|ASM\d+|FVE\d+", re.IGNORECASE)
+_RECORD_COUNT_PATTERN = re.compile(r"Records\s+\d+\s*-\s*\d+\s+of\s+(\d+)")
+_IGNORED_TEXT = ["Standard Adapter", "Sockets", "Socket", "Adapter"]
+_BANNER_TEXT = [
+    'server started',
+    'database loaded',
+    'best-efforts',
+    'prices, and, specifications',
+    'you, may, search, for, an, adapter',
+    'bpm, microsystems, device, search',
+    'adapter:asm',
+    'adapter:fx4asm',
+]
+
+
+def parse(html):
+    """lxml document of an HTML snapshot (empty snapshots parse as an empty body)"""
+    return lxml.html.fromstring(html if html and html.strip() else "<html></html>")
+
+
+def text(element, separator="", strip=True):
+    """Same as BeautifulSoup's get_text(separator, strip=strip)"""
+    if not strip:
+        return separator.join(element.itertext())
+    return separator.join(piece.strip() for piece in element.itertext() if piece.strip())
+
+
+def has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# Shared post-processing
+
+def is_banner_text(value):
+    """BPMicro status banners that show up where a socket should be"""
+    if not value:
+        return False
+    value = value.lower()
+    return any(banner in value for banner in _BANNER_TEXT)
+
+
+def filter_socket_text(socket_text, original_part_number):
+    """Remove original part number from socket text and clean up the result"""
+    if not socket_text or not original_part_number:
+        return socket_text
+    parts = [part.strip() for part in re.split(r'[,;\s]+', socket_text)]
+    filtered_parts = [part for part in parts if part and not same_part(part, original_part_number)]
+    # Return the original if nothing is left after filtering
+    return ', '.join(filtered_parts) or socket_text
+
+
+def clean_socket(socket_text, original_part_number):
+    return filter_socket_text(" ".join(socket_text.split()), original_part_number)
+
+
+# System General (Caspio result table)
+
+def result_rows(html):
+    """([(part number, SKB name)], total records or None) of the first fresh result table
+
+    None when the page has neither a result table nor a "No records found" message.
+    """
+    doc = parse(html)
+    messages = doc.xpath(f'//p[{has_class("cbResultSetRecordMessage")}][not(@{STALE_ATTRIBUTE})]')
+    tables = doc.xpath(f'//table[{has_class("cbResultSetTable")}][not(@{STALE_ATTRIBUTE})]')
+    if not tables:
+        if messages and "No records found" in messages[0].text_content():
+            return [], 0
+        return None
+
+    labels = [" ".join(th.text_content().split()) for th in tables[0].xpath(".//th")]
+    part_column = labels.index("Part Number") if "Part Number" in labels else 1
+    rows = []
+    for row in tables[0].xpath("./tbody/tr[td]") or tables[0].xpath("./tr[td]"):
+        cells = row.xpath("./td")
+        if len(cells) < 5:
+            continue
+        part_number = cells[part_column].text_content().strip() if part_column < len(cells) else ""
+        # The SKB Name is the 5th column
+        rows.append((part_number, cells[4].text_content().strip()))
+    total = None
+    if messages:
+        match = _RECORD_COUNT_PATTERN.search(messages[0].text_content())
+        if match:
+            total = int(match.group(1))
+    return rows, total
+
+
+def skb_name(html):
+    """SKB Name of the first result row, None when nothing matched"""
+    parsed = result_rows(html)
+    if not parsed or not parsed[0]:
+        print("No result rows found in parsed content")
+        return None
+    name = parsed[0][0][1]
+    if not name:
+        print("SKB Name not found in the first result.")
+        return None
+    print(f"SKB Name of first result: {name}")
+    return name
+
+
+# DataIO (device page)
+
+def standard_adapter(html):
+    """The socket listed next to "Standard Adapter" on a DataIO device page"""
+    doc = parse(html)
+    labels = [
+        el for el in doc.iter()
+        if isinstance(el.tag, str) and " ".join(el.text_content().split()) == "Standard Adapter"
+        and not any(" ".join(child.text_content().split()) == "Standard Adapter" for child in el.iterdescendants())
+    ]
+    if not labels:
+        print("'Standard Adapter' text not found")
+        return None
+
+    # Outermost row/container holding both the label and its value
+    containers = [
+        div for div in labels[0].iterancestors("div")
+        if any("row" in c or "container" in c for c in (div.get("class") or "").split())
+    ]
+    if not containers:
+        print("Could not find parent container for Standard Adapter")
+        return None
+    parent_container = containers[-1]
+
+    socket_xpaths = [
+        './/div[contains(@id, "dataPartNumber")]',
+        './/div[contains(@class, "col")]',
+        './/div[contains(@class, "col-sm-5")]',
+        './/div[contains(@class, "col")][count(preceding-sibling::*) = 1]',
+    ]
+    for xpath in socket_xpaths:
+        for element in parent_container.xpath(xpath):
+            value = text(element)
+            if xpath == socket_xpaths[1] and "Socket" not in value:
+                continue
+            if value and "Standard Adapter" not in value and value != "Sockets":
+                print(f"Found socket number: {value}")
+                return value
+
+    # If still no results, try a broader search in the entire page for socket numbers
+    print("Trying broader search for socket numbers...")
+    for element in doc.xpath('//div[contains(@id, "dataPartNumber")] | //span | //p')[:20]:
+        value = text(element)
+        if value and value not in _IGNORED_TEXT and 1 < len(value) < 50:
+            print(f"Found potential socket number: {value}")
+            return value
+    return None
+
+
+# BPMicro (device details in the iframe, product pages, direct client rows)
+
+def device_socket(html, original_part_number=None):
+    """Socket of a device opened in the BPMicro search iframe
+
+    Tried in order: the device-parameters-table Socket Modules row, a socket
+    number in h1.entry-title, the Socket Adapter then Socket Modules rows,
+    elements whose text looks like a socket number, and [data-table]s.
+    """
+    doc = parse(html)
+
+    for row in doc.xpath(f'//table[{has_class("device-parameters-table")}]//tr'):
+        cells = row.xpath(".//td")
+        if len(cells) >= 2 and text(cells[0]).lower() == 'socket modules':
+            value_text = text(cells[1], " ")
+            if value_text:
+                print(f"Found Socket Modules: {value_text}")
+                return clean_socket(value_text, original_part_number)
+
+    entry_title = doc.xpath(f'//h1[{has_class("entry-title")}]')
+    if entry_title:
+        socket_match = SOCKET_PATTERN.search(entry_title[0].text_content())
+        if socket_match:
+            print(f"Found socket in title: {socket_match.group(1)}")
+            return filter_socket_text(socket_match.group(1).strip(), original_part_number)
+
+    for label in ("Socket Adapter", "Socket Modules"):
+        for row in doc.iter("tr"):
+            if label not in row.text_content():
+                continue
+            cells = row.xpath(".//td")
+            if len(cells) >= 2:
+                socket_text = text(cells[1], "\n")
+                if is_banner_text(socket_text):
+                    print(f"Banner-like content detected in {label} cell; skipping.")
+                    return "No Socket information found"
+                if socket_text and len(socket_text) > 3:
+                    print(f"Found {label.lower()}: {socket_text}")
+                    return clean_socket(socket_text, original_part_number)
+            break
+
+    pattern_elements = []
+    for piece in doc.xpath("//text()"):
+        if _SOCKET_HINT.search(piece):
+            parent = piece.getparent()
+            pattern_elements.append(parent.getparent() if piece.is_tail else parent)
+    for element in pattern_elements[:3]:
+        if element is None:
+            continue
+        element_text = text(element, " ")
+        if len(element_text) > 3:
+            return clean_socket(element_text, original_part_number)
+
+    for table in doc.xpath("//*[@data-table]"):
+        table_text = text(table, " ", strip=False)
+        if "Socket" in table_text:
+            socket_matches = SOCKET_PATTERN.findall(table_text)
+            if socket_matches:
+                return " ".join(", ".join(socket_matches).split())
+
+    print("No Socket information found with any method")
+    return "No Socket information found"
+
+
+def product_page_socket(html, original_part_number=None):
+    """The exact Socket Modules/Adapter row of a main-site BPMicro product page"""
+    doc = parse(html)
+    if is_banner_text(text(doc, "\n", strip=False)):
+        print("Detected banner text on main page; skipping.")
+        return "No socket information found on product page"
+    for label in ("Socket Modules", "Socket Adapter"):
+        for row in doc.iter("tr"):
+            if label not in row.text_content():
+                continue
+            cells = row.xpath(".//td")
+            if len(cells) >= 2:
+                socket_text = text(cells[1], "\n")
+                if is_banner_text(socket_text):
+                    print(f"Banner-like content detected in {label} cell; skipping.")
+                    return "No Socket information found"
+                return clean_socket(socket_text, original_part_number)
+            break
+    print("No exact socket rows on main page")
+    return "No socket information found on product page"
+
+
+def device_parameters(html):
+    """{label: value} of the device-parameters-table (any two-cell table rows on product pages)"""
+    doc = parse(html)
+    rows = doc.xpath(f'//table[{has_class("device-parameters-table")}]//tr') or doc.xpath("//table//tr")
+    parameters = {}
+    for row in rows:
+        cells = row.xpath("./td")
+        if len(cells) >= 2:
+            label = " ".join(cells[0].text_content().split())
+            # Keep line breaks between values, like the browser's inner_text()
+            parameters.setdefault(label, text(cells[1], "\n"))
+    return parameters
+
+
+def socket_from_parameters(parameters, original_part_number=None):
+    """Socket Modules, else Socket Adapter, from device_parameters()"""
+    by_label = {label.lower(): value for label, value in parameters.items()}
+    for label in ("Socket Modules", "Socket Adapter"):
+        socket_text = by_label.get(label.lower())
+        if not socket_text:
+            continue
+        if is_banner_text(socket_text):
+            print(f"Banner-like content detected in {label} cell; skipping.")
+            return "No Socket information found"
+        print(f"Found {label.lower()}: {socket_text}")
+        return clean_socket(socket_text, original_part_number)
+    print("No Socket information found in device parameters")
+    return "No Socket information found"
+
+
+RULES = {
+    "skb_name": skb_name,
+    "standard_adapter": standard_adapter,
+    "device_socket": device_socket,
+    "product_page_socket": product_page_socket,
+}
+
+
+def run_rule(name, html, original_part_number=None):
+    """Run rule name on html, passing original_part_number only to rules that take one"""
+    rule = RULES[name]
+    if original_part_number is not None and len(inspect.signature(rule).parameters) > 1:
+        return rule(html, original_part_number)
+    return rule(html)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in RULES:
+        print(f"usage: python extraction.py {{{','.join(RULES)}}} page.html [original part number]")
+        sys.exit(2)
+    with open(sys.argv[2], encoding="utf-8") as f:
+        snapshot = f.read()
+    print(repr(run_rule(sys.argv[1], snapshot, *sys.argv[3:4])))
@@ -0,0 +1,241 @@
+"""Offline stand-in for the vendor sites, serving recorded responses from fixtures/.
+
+    python fake_vendor_server.py --port 8765
+
+prints the environment variables that point the direct backends at it, e.g.
+
+    SYSTEM_GENERAL_CASPIO_URL=http://127.0.0.1:8765/dp/4c7a000b2e9f41d5a1c3 python app.py
+
+Searches return the recorded result page named after the submitted part
+number (fixtures/<vendor>/results/<PART>.html) and the recorded "no records"
+page otherwise, so part number variations behave like on the real sites.
+
+    python fake_vendor_server.py --bench AT28C256-15PU W25Q128JV [--harvest]
+
+times the direct backends against the stand-in instead of serving, with
+--harvest timing their single-query harvest instead of the variation loop.
+"""
+import argparse
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CASPIO_APP_KEY = "4c7a000b2e9f41d5a1c3"
+DATAIO_SEARCH_TARGET = "dnn$ctr6237$View$btnSearch"
+DATAIO_SEARCH_FIELD = "dnn$ctr6237$View$txtSearch"
+
+
+def _fixture_path(*parts):
+    return os.path.join(FIXTURES_DIR, *parts)
+
+
+def _result_fixture(vendor, part_number):
+    """Recorded result page for part_number, or None when the site has no match"""
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", part_number.strip().upper())
+    path = _fixture_path(vendor, "results", f"{name}.html")
+    return path if name and os.path.exists(path) else None
+
+
+class FakeVendorHandler(BaseHTTPRequestHandler):
+    # (method, path pattern, handler method name)
+    routes = [
+        ("GET", r"/systemgeneral/device-search", "caspio_page"),
+        ("GET", r"/dp/(?P<app_key>\w+)", "caspio_form"),
+        ("POST", r"/dp/(?P<app_key>\w+)", "caspio_search"),
+        ("GET", r"/Support/Device-Search", "dataio_form"),
+        ("POST", r"/Support/Device-Search", "dataio_search"),
+        ("GET", r"/Support/Device-Search/Device-Details/(?P<device_id>\d+)", "dataio_device"),
+        ("GET", r"/device-search/", "bpmicro_page"),
+        ("GET", r"/bpm-app/", "bpmicro_app"),
+        ("GET", r"/bpm-app/search", "bpmicro_search"),
+        ("GET", r"/bpm-app/device/(?P<device_id>\d+)", "bpmicro_device"),
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                self.params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if method == "POST":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    body = self.rfile.read(length).decode("utf-8", "replace")
+                    self.params.update({key: values[-1] for key, values in parse_qs(body).items()})
+                getattr(self, handler)(**match.groupdict())
+                return
+        self.send_error(404)
+
+    def _send_fixture(self, path, status=200):
+        with open(path, encoding="utf-8") as f:
+            body = f.read().replace("{{BASE_URL}}", self.base_url).replace("{{APP_KEY}}", CASPIO_APP_KEY)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # System General: device search page embedding a Caspio DataPage
+
+    def caspio_page(self):
+        self._send_fixture(_fixture_path("systemgeneral", "device_search.html"))
+
+    def caspio_form(self, app_key):
+        if app_key != CASPIO_APP_KEY:
+            self.send_error(404)
+            return
+        self._send_fixture(_fixture_path("systemgeneral", "caspio_form.html"))
+
+    def caspio_search(self, app_key):
+        # Like Caspio, reject submissions that lost the form's hidden state
+        if app_key != CASPIO_APP_KEY or self.params.get("AppKey") != CASPIO_APP_KEY \
+                or not self.params.get("cbUniqueFormId"):
+            self.send_error(400, "Invalid DataPage submission")
+            return
+        path = _result_fixture("systemgeneral", self.params.get("Value2_1", ""))
+        self._send_fixture(path or _fixture_path("systemgeneral", "caspio_no_records.html"))
+
+    # DataIO: DNN WebForms search with a postback and a device details page
+
+    def dataio_form(self):
+        self._send_fixture(_fixture_path("dataio", "device_search.html"))
+
+    def dataio_search(self):
+        # Like ASP.NET, reject postbacks without the page state or from another control
+        if not self.params.get("__VIEWSTATE") or not self.params.get("__EVENTVALIDATION") \
+                or self.params.get("__EVENTTARGET") != DATAIO_SEARCH_TARGET:
+            self.send_error(500, "Invalid postback or callback argument")
+            return
+        path = _result_fixture("dataio", self.params.get(DATAIO_SEARCH_FIELD, ""))
+        self._send_fixture(path or _fixture_path("dataio", "no_results.html"))
+
+    def dataio_device(self, device_id):
+        path = _fixture_path("dataio", "devices", f"{device_id}.html")
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        self._send_fixture(path)
+
+    # BPMicro: device search page embedding the search app in iframe#myIframe
+
+    def bpmicro_page(self):
+        self._send_fixture(_fixture_path("bpmicro", "device_search.html"))
+
+    def bpmicro_app(self):
+        self._send_fixture(_fixture_path("bpmicro", "app.html"))
+
+    def bpmicro_search(self):
+        path = _result_fixture("bpmicro", self.params.get("q", ""))
+        self._send_fixture(path or _fixture_path("bpmicro", "no_results.html"))
+
+    def bpmicro_device(self, device_id):
+        path = _fixture_path("bpmicro", "devices", f"{device_id}.html")
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        self._send_fixture(path)
+
+
+def serve(host="127.0.0.1", port=0, verbose=False):
+    """Start the stand-in on a background thread and return the server"""
+    server = ThreadingHTTPServer((host, port), FakeVendorHandler)
+    server.verbose = verbose
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-vendor-server", daemon=True).start()
+    return server
+
+
+def backend_environment(server):
+    """Environment variables pointing the direct backends at server"""
+    host, port = server.server_address[:2]
+    base_url = f"http://{host}:{port}"
+    return {
+        "SYSTEM_GENERAL_CASPIO_URL": f"{base_url}/dp/{CASPIO_APP_KEY}",
+        "DATAIO_SEARCH_URL": f"{base_url}/Support/Device-Search",
+        "BPMICRO_APP_URL": f"{base_url}/bpm-app/",
+    }
+
+
+def benchmark(part_numbers, rounds=5, harvest=False):
+    """Time each direct backend's variation search against a local stand-in"""
+    server = serve()
+    os.environ.update(backend_environment(server))
+    # Imported late so the backends read the environment set above
+    import bpmicro_http
+    import dataio_http
+    import systemgeneral_http
+    from variation_search import build_part_variations
+
+    backends = {
+        "systemgeneral": lambda part_number, variations: systemgeneral_http.search_variations(variations, None),
+        "dataio": lambda part_number, variations: dataio_http.search_variations(variations),
+        "bpmicro": lambda part_number, variations: bpmicro_http.search_variations(variations),
+    }
+    if harvest:
+        backends = {
+            "systemgeneral": lambda part_number, variations: systemgeneral_http.harvest(part_number, variations, None),
+            "dataio": dataio_http.harvest,
+            "bpmicro": bpmicro_http.harvest,
+        }
+    try:
+        for part_number in part_numbers:
+            for vendor, search in backends.items():
+                variations = build_part_variations(part_number, vendor=vendor)
+                timings = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    result = search(part_number, variations)
+                    timings.append(time.perf_counter() - start)
+                print(f"{vendor:>14} {part_number}: best {min(timings) * 1000:.1f} ms, "
+                      f"mean {sum(timings) / len(timings) * 1000:.1f} ms -> {result!r}")
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bench", nargs="+", metavar="PART", help="time the direct backends and exit")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--harvest", action="store_true", help="benchmark the single-query harvest")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench, args.rounds, args.harvest)
+        return
+
+    server = serve(args.host, args.port, verbose=True)
+    print(f"Fake vendor server on http://{args.host}:{server.server_address[1]}")
+    for name, value in backend_environment(server).items():
+        print(f"  {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Gunicorn hooks: optional shared browser server and pool shutdown.
+
+Set BROWSER_SERVER_MODE=1 to have the master start one Playwright browser
+server that every worker connects to (see browser_server.py).
+"""
+import os
+
+import browser_server
+
+_server = None
+
+
+def on_starting(server):
+    global _server
+    if not browser_server.BROWSER_SERVER_MODE or os.environ.get("BROWSER_WS_ENDPOINT"):
+        return
+    _server = browser_server.BrowserServer()
+    # Workers are forked from the master and inherit the endpoint
+    os.environ["BROWSER_WS_ENDPOINT"] = _server.start()
+    server.log.info("Shared browser server at %s", os.environ["BROWSER_WS_ENDPOINT"])
+
+
+def worker_exit(server, worker):
+    from browser_pool import shutdown_browser_pool
+
+    shutdown_browser_pool()
+
+
+def on_exit(server):
+    if _server is not None:
+        _server.stop()
@@ -0,0 +1,83 @@
+"""Pooled keep-alive HTTP sessions for the browserless vendor backends.
+
+The direct backends (systemgeneral_http.py, ...) talk to the vendor sites
+with plain requests instead of a browser. Each thread keeps one Session so
+connections stay alive across variations and searches. When a direct
+backend cannot answer it raises DirectSearchFailed and the vendor module
+falls back to its Playwright path.
+"""
+import os
+import threading
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "15"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class DirectSearchFailed(Exception):
+    """The direct HTTP backend could not answer, use the browser instead"""
+
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def get_session():
+    """This thread's keep-alive session"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        _local.session = session
+    return session
+
+
+def fetch(method, url, **kwargs):
+    """Request url on this thread's session, raising DirectSearchFailed on any failure"""
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    try:
+        response = get_session().request(method, url, **kwargs)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise DirectSearchFailed(f"{method} {url} failed: {e}")
+    return response
+
+
+def parse_form(html, base_url, field_name):
+    """Find the form containing field_name and return (action, method, fields)
+
+    fields holds every value the browser would submit, hidden state included,
+    except submit buttons, which the caller adds for the button it "clicks".
+    """
+    doc = lxml.html.fromstring(html, base_url=base_url)
+    for form in doc.forms:
+        if field_name in form.inputs.keys():
+            action = form.action or base_url
+            return action, (form.method or "GET").upper(), dict(form.form_values())
+    raise DirectSearchFailed(f"no form with a {field_name} field at {base_url}")
+
+
+def record(vendor, outcome):
+    """Count a direct backend outcome ('direct', 'fallback', ...) for /api/stats"""
+    with _stats_lock:
+        counters = _stats.setdefault(vendor, {})
+        counters[outcome] = counters.get(outcome, 0) + 1
+
+
+def direct_backend_stats():
+    with _stats_lock:
+        return {vendor: dict(counters) for vendor, counters in _stats.items()}
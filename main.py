@@ -4,18 +4,22 @@ import time
 from systemgeneralsearch import search_part_number_in_system_general_limited
 from dataiosearch import search_part_number_in_dataio
 from bpmicrosearch import search_part_number_in_bpmicro
+from result_cache import cached_search
+from part_normalize import clean_part_number
 
 
 def choose_search_function(website, part_number):
     """Choose and execute the appropriate search function based on website selection"""
     if website == "systemgeneral":
-        return search_part_number_in_system_general_limited(part_number)
+        search = search_part_number_in_system_general_limited
     elif website == "dataio":
-        return search_part_number_in_dataio(part_number)
+        search = search_part_number_in_dataio
     elif website == "BPMicro":
-        return search_part_number_in_bpmicro(part_number)
+        search = search_part_number_in_bpmicro
     else:
         raise ValueError(f"Unknown website: {website}")
+    # Same cache as the web app, keyed by the lowercase website name
+    return cached_search(website.lower(), part_number, search)
 
 def save_result_to_file(part_number, skb_name, filename="search_results.txt"):
     """Save the search result to a text file"""
@@ -33,7 +37,7 @@ def save_result_to_file(part_number, skb_name, filename="search_results.txt"):
 
 if __name__ == "__main__":
     # Get part number from user input
-    part_number = input("Enter the part number to search for: ").strip()
+    part_number = clean_part_number(input("Enter the part number to search for: "))
     
     if not part_number:
         print("No part number provided. Exiting.")
@@ -0,0 +1,110 @@
+"""Ranked part-number variations from ordering-code grammar.
+
+A vendor search for a full ordering code often misses because the vendor
+lists the device without its packaging, temperature or option suffix. The
+variations tried are, in order:
+
+1. the part number as typed (cleaned by part_normalize.clean_part_number)
+2. the part number without embedded spaces
+3. the part number without a packaging suffix (-TR, /R7, #PBF, ...)
+4. the stems a manufacturer rule derives from its ordering code, most
+   specific first, e.g. GD32F330CBT6 -> GD32F330CBT -> GD32F330CB -> GD32F330
+5. the old fallback, dropping trailing characters one at a time (and any
+   separator left at the end), shorter than every stem above
+
+Spellings with the same part_key() are one device and are tried once, as
+the packaging-free spelling. The list is cut at the probe limit of the
+vendor (MAX_PROBES_<VENDOR>, else MAX_PROBES, default 4).
+
+Manufacturer rules are PartRule(name, pattern, keep). pattern must match
+the whole upper-cased part number and split it into the fields of the
+ordering code. Each entry of keep is a number of leading fields that make a
+useful stem; the first keeps the package code, since vendors often list a
+device per package, and the family stems come after it. More rules can be
+added with register_rule().
+"""
+import os
+import re
+from collections import namedtuple
+
+from part_normalize import clean_part_number, compact_part_number, part_key, strip_packaging
+
+
+MAX_PROBES_DEFAULT = int(os.environ.get("MAX_PROBES", "4"))
+# Not left dangling at the end of a truncated part number
+TRAILING_SEPARATORS = "-/._# "
+
+PartRule = namedtuple("PartRule", "name pattern keep")
+
+PART_RULES = []
+
+
+def register_rule(name, pattern, keep):
+    """Add a manufacturer rule; later rules only apply when earlier ones did not match"""
+    PART_RULES.append(PartRule(name, re.compile(pattern), tuple(keep)))
+
+
+# GD32F330CBT6: family, pin count, flash size, package, temperature range
+register_rule("GigaDevice GD32", r"(GD32[A-Z]\d{3})([A-Z])([0-9A-Z])([A-Z])([0-9])", keep=(4, 3, 1))
+# STM32F103C8T6(TR): family, pin count, flash size, package, temperature range, options
+register_rule("ST STM32", r"(STM32[A-Z]\d{3})([A-Z])([0-9A-Z])([A-Z])([0-9])([A-Z]*)", keep=(5, 4, 3, 1))
+# AT28C256-15PU: device, speed grade, package, temperature grade
+register_rule("Microchip (Atmel) AT", r"(AT\d{2}[A-Z]+\d+[A-Z]?)(-\d+)([A-Z]{1,2})([A-Z])", keep=(3, 2, 1))
+# W25Q128JVSIQ: device and generation, package, temperature range, options
+register_rule("Winbond W25", r"(W25[A-Z]\d+[A-Z]{2})(SS|S|Z|E|T|X|B|F|Y|P|W)([IJ])([A-Z0-9]*)", keep=(2, 1))
+# MX25L12835FM2I-10G: device, package, temperature range, speed and options
+register_rule("Macronix MX", r"(MX\d{2}[A-Z]+\d+[A-Z])(M[0-9]|Z[0-9]|X[A-Z]|[A-Z])([IC])(-\d+[A-Z]*)?", keep=(2, 1))
+
+
+def max_probes(vendor=None):
+    """Probe limit for vendor (MAX_PROBES_<VENDOR>, else MAX_PROBES)"""
+    if vendor:
+        value = os.environ.get(f"MAX_PROBES_{vendor.upper()}")
+        if value:
+            return max(1, int(value))
+    return max(1, MAX_PROBES_DEFAULT)
+
+
+def rule_stems(part_number):
+    """(rule name, stems) of the first manufacturer rule matching part_number"""
+    for rule in PART_RULES:
+        match = rule.pattern.fullmatch(part_number)
+        if match:
+            fields = match.groups(default="")
+            return rule.name, ["".join(fields[:count]) for count in rule.keep]
+    return None, []
+
+
+def generate_variations(original_part_number, limit=MAX_PROBES_DEFAULT):
+    """Ranked part numbers to search for original_part_number, at most limit"""
+    variations = []
+    # part_key -> index in variations: spellings of one device share a cache row
+    seen = {}
+
+    def add(part_number, replace=False):
+        key = part_key(part_number)
+        if not part_number:
+            return
+        if key not in seen:
+            seen[key] = len(variations)
+            variations.append(part_number)
+        elif replace:
+            variations[seen[key]] = part_number
+
+    add(clean_part_number(original_part_number))
+    compact = compact_part_number(original_part_number)
+    add(compact)
+    base = strip_packaging(compact)
+    # Vendors list the device without its packaging suffix, search for that spelling
+    add(base, replace=base != compact)
+    for stem in rule_stems(base)[1]:
+        add(stem)
+
+    # Dropping trailing characters, as before any rule existed, below the shortest stem
+    shortest = min(len(part_number) for part_number in variations) if variations else 0
+    current_part = base
+    while len(variations) < limit and len(current_part) > 1:
+        current_part = current_part[:-1].rstrip(TRAILING_SEPARATORS)
+        if len(current_part) < shortest:
+            add(current_part)
+    return variations[:limit]
@@ -0,0 +1,60 @@
+"""Canonical part-number keys shared by the caches, coalescing and matching.
+
+The same device arrives as "gd32f330cbt6", "GD32F330CBT6 ", "GD32F330CBT6-TR"
+or with a pasted non-breaking or zero-width space. clean_part_number() is
+what the vendors are sent: NFKC-normalized, control and format characters
+removed, whitespace collapsed and trimmed. part_key() is what equal devices
+share: the cleaned part number upper-cased without whitespace, and by default
+without a packaging suffix. With PART_KEY_STRIP_SEPARATORS=1 dashes, slashes,
+dots and underscores are dropped from the key too. The result cache, the
+catalog and the coalescing of in-flight searches all key on part_key(), so
+equivalent inputs share one scrape.
+"""
+import os
+import re
+import unicodedata
+
+
+PART_KEY_STRIP_PACKAGING = os.environ.get("PART_KEY_STRIP_PACKAGING", "1").lower() not in ("0", "false", "no")
+PART_KEY_STRIP_SEPARATORS = os.environ.get("PART_KEY_STRIP_SEPARATORS", "").lower() in ("1", "true", "yes")
+
+_WHITESPACE = re.compile(r"\s+")
+_SEPARATORS = re.compile(r"[-/._]")
+# Tape and reel, lead-free and distributor suffixes that name the same device
+PACKAGING_SUFFIX = re.compile(r"(?:[-/#+](?:TR|T|R7|R13|REEL|TRPBF|PBF|ND)|#|\+|TR)$")
+
+
+def clean_part_number(part_number):
+    """The part number as typed, minus Unicode noise and surrounding whitespace"""
+    text = unicodedata.normalize("NFKC", part_number or "")
+    text = _WHITESPACE.sub(" ", text)
+    text = "".join(char for char in text if not unicodedata.category(char).startswith("C"))
+    return text.strip()
+
+
+def compact_part_number(part_number):
+    """Cleaned, upper-cased and without any whitespace"""
+    return _WHITESPACE.sub("", clean_part_number(part_number)).upper()
+
+
+def strip_packaging(part_number):
+    """part_number without a trailing packaging suffix (-TR, /R7, #PBF, ...)"""
+    return PACKAGING_SUFFIX.sub("", part_number) or part_number
+
+
+def part_key(part_number, strip_packaging_suffix=None, strip_separators=None):
+    """Canonical key: equal for spellings of the same device"""
+    if strip_packaging_suffix is None:
+        strip_packaging_suffix = PART_KEY_STRIP_PACKAGING
+    if strip_separators is None:
+        strip_separators = PART_KEY_STRIP_SEPARATORS
+    key = compact_part_number(part_number)
+    if strip_packaging_suffix:
+        key = strip_packaging(key)
+    if strip_separators:
+        key = _SEPARATORS.sub("", key) or key
+    return key
+
+
+def same_part(a, b):
+    return part_key(a) == part_key(b)
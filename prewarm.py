@@ -0,0 +1,150 @@
+"""Off-peak re-scraping of the most requested part numbers.
+
+result_cache.py counts every search per (website, part). With PREWARM=1 a
+background scheduler wakes up every PREWARM_INTERVAL seconds during the
+PREWARM_HOURS window (local time, e.g. "1-6" or "22-5"). It then refreshes
+the PREWARM_TOP_N most requested parts whose cached answer is missing or
+goes stale within PREWARM_AHEAD seconds, so peak-hour lookups hit warm
+entries. Refreshes use the normal vendor search functions, at most
+PREWARM_CONCURRENCY at a time, to leave room for interactive searches.
+Only one process per host runs the scheduler (a lock file elects it).
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from result_cache import get_result_cache, refresh
+from variation_search import build_part_variations
+
+try:
+    import fcntl
+except ImportError:  # Windows desktop builds run a single process anyway
+    fcntl = None
+
+
+PREWARM_ENABLED = os.environ.get("PREWARM", "").lower() in ("1", "true", "yes")
+PREWARM_HOURS = os.environ.get("PREWARM_HOURS", "1-6")
+PREWARM_TOP_N = int(os.environ.get("PREWARM_TOP_N", "50"))
+PREWARM_CONCURRENCY = int(os.environ.get("PREWARM_CONCURRENCY", "1"))
+PREWARM_INTERVAL = float(os.environ.get("PREWARM_INTERVAL", "900"))
+PREWARM_AHEAD = float(os.environ.get("PREWARM_AHEAD", str(12 * 3600)))
+PREWARM_LOCK_PATH = os.environ.get(
+    "PREWARM_LOCK_PATH", os.path.join(tempfile.gettempdir(), "device-search-prewarm.lock")
+)
+
+
+def in_prewarm_window(hours=PREWARM_HOURS, now=None):
+    """Whether the local hour is inside "start-end" (end exclusive, may wrap midnight)"""
+    start, end = (int(hour) for hour in hours.split("-"))
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class PrewarmScheduler(threading.Thread):
+    """Refreshes hot parts off-peak through searches[vendor](part, cancel_event=None)"""
+
+    def __init__(self, searches, top_n=PREWARM_TOP_N, concurrency=PREWARM_CONCURRENCY,
+                 interval=PREWARM_INTERVAL, ahead=PREWARM_AHEAD, hours=PREWARM_HOURS):
+        super().__init__(name="prewarm", daemon=True)
+        self.searches = searches
+        self.top_n = top_n
+        self.concurrency = max(1, concurrency)
+        self.interval = interval
+        self.ahead = ahead
+        self.hours = hours
+        self._stopping = threading.Event()
+        self._lock_handle = None
+        self._stats = {
+            "passes": 0, "refreshed": 0, "found": 0, "skipped_fresh": 0,
+            "last_pass": None, "running": False, "leader": False,
+        }
+
+    def _is_leader(self):
+        if fcntl is None or self._lock_handle is not None:
+            return True
+        handle = open(PREWARM_LOCK_PATH, "a")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        # Held for the life of the process
+        self._lock_handle = handle
+        return True
+
+    def run(self):
+        while not self._stopping.wait(self.interval):
+            if not in_prewarm_window(self.hours):
+                continue
+            self._stats["leader"] = self._is_leader()
+            if self._stats["leader"]:
+                try:
+                    self.run_pass()
+                except Exception as e:
+                    print(f"Prewarm pass failed: {e}")
+
+    def due_parts(self):
+        """Hot (vendor, part) pairs whose cached answer is missing or about to go stale"""
+        cache = get_result_cache()
+        if cache is None:
+            return []
+        due = []
+        for vendor, part_number in cache.hot_parts(self.top_n):
+            if vendor not in self.searches:
+                continue
+            hit, _, expires = cache.lookup(vendor, build_part_variations(part_number, vendor=vendor), count=False)
+            if hit and expires - time.time() > self.ahead:
+                self._stats["skipped_fresh"] += 1
+                continue
+            due.append((vendor, part_number))
+        return due
+
+    def run_pass(self):
+        due = self.due_parts()
+        print(f"Prewarming {len(due)} hot part numbers...")
+        self._stats["running"] = True
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="prewarm") as executor:
+                futures = [
+                    executor.submit(refresh, vendor, part_number, self.searches[vendor])
+                    for vendor, part_number in due
+                ]
+                for future in futures:
+                    if self._stopping.is_set():
+                        break
+                    if future.result():
+                        self._stats["found"] += 1
+                    self._stats["refreshed"] += 1
+        finally:
+            self._stats["running"] = False
+            self._stats["passes"] += 1
+            self._stats["last_pass"] = datetime.now().isoformat()
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self):
+        return dict(self._stats, enabled=True, hours=self.hours, top_n=self.top_n, concurrency=self.concurrency)
+
+
+_scheduler = None
+
+
+def start_prewarm_scheduler(searches):
+    """Start the scheduler once per process when PREWARM=1, returning it (or None)"""
+    global _scheduler
+    if not PREWARM_ENABLED or get_result_cache() is None:
+        return None
+    if _scheduler is None:
+        _scheduler = PrewarmScheduler(searches)
+        _scheduler.start()
+    return _scheduler
+
+
+def prewarm_stats():
+    return _scheduler.stats() if _scheduler is not None else {"enabled": False}
@@ -0,0 +1,232 @@
+"""Per-vendor request filtering for the browser contexts of the scrapers.
+
+The vendor pages are full marketing pages, but the flows only read the
+System General Caspio iframe, the DataIO form and device page and the
+BPMicro search iframe. Every browser context of a vendor routes its requests
+through a RequestFilter, which aborts:
+
+- resource types the extraction never reads (images, media, fonts, ...)
+- requests to third-party hosts, i.e. neither the host of the requesting
+  frame (so an embedded Caspio or BPMicro app keeps its own scripts) nor a
+  host on the vendor's allowlist
+
+Documents are never blocked, so navigations and iframes still load.
+
+REQUEST_FILTER=0 turns filtering off. REQUEST_BLOCK_TYPES_<VENDOR> (comma
+separated resource types) replaces a vendor's blocked types,
+REQUEST_ALLOW_HOSTS_<VENDOR> adds hosts to its allowlist and
+REQUEST_BLOCK_THIRD_PARTY=0 lets every host through. Blocked requests,
+loaded bytes and an estimate of the bytes saved are reported per search
+as 'request_filter' in /api/stats, next to how often the search form
+failed to load under the profile (wait_engine.py reports its form waits
+here), so a profile that blocks something the form needs shows up.
+"""
+import os
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+
+REQUEST_FILTER = os.environ.get("REQUEST_FILTER", "1").lower() not in ("0", "false", "no")
+REQUEST_BLOCK_THIRD_PARTY = os.environ.get("REQUEST_BLOCK_THIRD_PARTY", "1").lower() not in ("0", "false", "no")
+
+# Typical transfer size of a blocked request, to estimate the bytes saved
+ESTIMATED_SIZES = {
+    "image": 40000,
+    "media": 500000,
+    "font": 60000,
+    "stylesheet": 30000,
+    "script": 50000,
+}
+ESTIMATED_SIZE_DEFAULT = 10000
+
+RequestProfile = namedtuple("RequestProfile", "block_types allow_hosts")
+
+_MEDIA_TYPES = ("image", "media", "font", "texttrack", "manifest")
+
+# Public library CDNs the vendor pages and their iframe apps may take jQuery
+# and the like from; analytics and ad hosts stay blocked
+_LIBRARY_CDNS = ("ajax.googleapis.com", "ajax.aspnetcdn.com", "code.jquery.com", "cdnjs.cloudflare.com",
+                 "cdn.jsdelivr.net", "unpkg.com")
+
+PROFILES = {
+    # The Wix page builds the Caspio iframe with its own scripts (parastorage/wixstatic,
+    # embeds on filesusr/usrfiles); the table is read as HTML
+    "systemgeneral": RequestProfile(
+        _MEDIA_TYPES + ("stylesheet",),
+        ("systemgenerallimited.com", "parastorage.com", "wixstatic.com", "wix.com", "wixsite.com",
+         "filesusr.com", "usrfiles.com", "caspio.com") + _LIBRARY_CDNS,
+    ),
+    # DNN serves its WebForms scripts itself, but skins may load jQuery and MS Ajax from CDNs
+    "dataio": RequestProfile(_MEDIA_TYPES + ("stylesheet",), ("dataio.com",) + _LIBRARY_CDNS),
+    # The search app shows and hides its result list with CSS, so stylesheets stay
+    "bpmicro": RequestProfile(_MEDIA_TYPES, ("bpmmicro.com",) + _LIBRARY_CDNS),
+}
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _env_list(name):
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    return tuple(item.strip().lower() for item in value.split(",") if item.strip())
+
+
+def vendor_profile(vendor):
+    """The vendor's RequestProfile with the environment overrides applied, None when unfiltered"""
+    if not REQUEST_FILTER or vendor not in PROFILES:
+        return None
+    profile = PROFILES[vendor]
+    block_types = _env_list(f"REQUEST_BLOCK_TYPES_{vendor.upper()}")
+    extra_hosts = _env_list(f"REQUEST_ALLOW_HOSTS_{vendor.upper()}") or ()
+    return RequestProfile(
+        frozenset(profile.block_types if block_types is None else block_types),
+        tuple(profile.allow_hosts) + extra_hosts,
+    )
+
+
+def _host(url):
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def _on_host(host, allowed):
+    return host == allowed or host.endswith("." + allowed)
+
+
+class RequestFilter:
+    """Decides and counts the requests of one browser context"""
+
+    def __init__(self, vendor, profile):
+        self.vendor = vendor
+        self.profile = profile
+        self.allowed = 0
+        self.blocked = {}
+        self.bytes_loaded = 0
+        self.bytes_saved = 0
+
+    def should_block(self, request):
+        resource_type = request.resource_type
+        if resource_type == "document":
+            return False
+        if resource_type in self.profile.block_types:
+            return True
+        if not REQUEST_BLOCK_THIRD_PARTY:
+            return False
+        host = _host(request.url)
+        if not host or any(_on_host(host, allowed) for allowed in self.profile.allow_hosts):
+            return False
+        try:
+            frame_host = _host(request.frame.url)
+        except Exception:
+            frame_host = ""
+        return host != frame_host
+
+    def _count(self, request):
+        if self.should_block(request):
+            resource_type = request.resource_type
+            self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+            self.bytes_saved += ESTIMATED_SIZES.get(resource_type, ESTIMATED_SIZE_DEFAULT)
+            return True
+        self.allowed += 1
+        return False
+
+    # Allowed requests fall back to routes registered earlier (asset_cache.py)
+    def route(self, route, request):
+        if self._count(request):
+            route.abort()
+        else:
+            route.fallback()
+
+    async def route_async(self, route, request):
+        if self._count(request):
+            await route.abort()
+        else:
+            await route.fallback()
+
+    def on_response(self, response):
+        try:
+            self.bytes_loaded += int(response.headers.get("content-length") or 0)
+        except (TypeError, ValueError):
+            pass
+
+    def finish(self):
+        """Fold this context's counts into the vendor totals"""
+        blocked = sum(self.blocked.values())
+        if blocked:
+            print(f"{self.vendor}: blocked {blocked} requests (~{self.bytes_saved // 1024} KB saved)")
+        with _stats_lock:
+            totals = _totals(self.vendor)
+            totals["searches"] += 1
+            totals["requests_allowed"] += self.allowed
+            totals["requests_blocked"] += blocked
+            totals["bytes_loaded"] += self.bytes_loaded
+            totals["estimated_bytes_saved"] += self.bytes_saved
+            for resource_type, count in self.blocked.items():
+                totals["blocked_types"][resource_type] = totals["blocked_types"].get(resource_type, 0) + count
+
+
+def _totals(vendor):
+    # Callers hold _stats_lock
+    return _stats.setdefault(vendor, {
+        "searches": 0, "requests_allowed": 0, "requests_blocked": 0,
+        "bytes_loaded": 0, "estimated_bytes_saved": 0, "blocked_types": {},
+        "form_waits": 0, "form_failures": 0,
+    })
+
+
+def record_form_wait(vendor, failed):
+    """Count a search form wait of a filtered vendor, warning when it failed"""
+    if vendor_profile(vendor) is None:
+        return
+    with _stats_lock:
+        totals = _totals(vendor)
+        totals["form_waits"] += 1
+        totals["form_failures"] += bool(failed)
+        failures, waits = totals["form_failures"], totals["form_waits"]
+    if failed:
+        print(f"{vendor}: search form did not load with request filtering on ({failures} of {waits} form waits); "
+              f"if this keeps happening, check REQUEST_ALLOW_HOSTS_{vendor.upper()} or try REQUEST_FILTER=0")
+
+
+def install_request_filter(context, vendor):
+    """Route a sync Playwright context through the vendor's profile; the RequestFilter or None"""
+    profile = vendor_profile(vendor)
+    if profile is None:
+        return None
+    request_filter = RequestFilter(vendor, profile)
+    context.route("**/*", request_filter.route)
+    context.on("response", request_filter.on_response)
+    return request_filter
+
+
+async def install_request_filter_async(context, vendor):
+    profile = vendor_profile(vendor)
+    if profile is None:
+        return None
+    request_filter = RequestFilter(vendor, profile)
+    await context.route("**/*", request_filter.route_async)
+    context.on("response", request_filter.on_response)
+    return request_filter
+
+
+def request_filter_stats():
+    """Per vendor totals plus the per-search averages"""
+    with _stats_lock:
+        stats = {}
+        for vendor, totals in _stats.items():
+            searches = totals["searches"] or 1
+            stats[vendor] = dict(
+                totals,
+                blocked_types=dict(totals["blocked_types"]),
+                blocked_per_search=round(totals["requests_blocked"] / searches, 1),
+                estimated_bytes_saved_per_search=totals["estimated_bytes_saved"] // searches,
+                form_failure_rate=(
+                    round(totals["form_failures"] / totals["form_waits"], 3) if totals["form_waits"] else None
+                ),
+            )
+        return {"enabled": REQUEST_FILTER, "vendors": stats}
@@ -0,0 +1,491 @@
+"""Persistent cache of vendor lookups, keyed by (vendor, part variation).
+
+Every variation a search tries is remembered: the one that matched as found
+(RESULT_CACHE_FOUND_TTL, default 30 days) and the ones before it as not
+found (RESULT_CACHE_NOT_FOUND_TTL, default 1 day). A later search is
+answered from the cache when its variations are known up to the first
+match, or all known to miss. A variation only counts as a miss when the
+vendor said so ("No records found" and the like); errors, timeouts and
+cancelled searches raise before anything is stored. The SQLite file (RESULT_CACHE_PATH) is shared by every
+process and evicts least recently used entries beyond RESULT_CACHE_MAX_ENTRIES.
+RESULT_CACHE=0 turns the cache off.
+
+Live searches for the same (website, part) share one scrape (single_flight.py).
+Expired entries are still served for RESULT_CACHE_STALE_TTL more seconds,
+marked stale, while a background search refreshes them. Every request is
+also counted per part so prewarm.py can re-scrape the most requested parts.
+
+The same entries act as a per-vendor index of variations known to hit or
+miss. A live search skips variations still known to miss (sibling parts
+share their shorter prefixes) and stops at a known hit, and the scrapes
+this saves are counted as scrapes_avoided. Each entry records whether the
+vendor answered it definitively; misses stored before that flag existed
+are probed again. A found entry also keeps the part number the vendor
+matched, reported as part_used.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from part_normalize import compact_part_number, part_key
+from single_flight import SingleFlight
+from variation_search import HintedVariations, build_part_variations
+
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE", "1").lower() not in ("0", "false", "no")
+RESULT_CACHE_PATH = os.environ.get(
+    "RESULT_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.sqlite3")
+)
+RESULT_CACHE_FOUND_TTL = float(os.environ.get("RESULT_CACHE_FOUND_TTL", str(30 * 24 * 3600)))
+RESULT_CACHE_NOT_FOUND_TTL = float(os.environ.get("RESULT_CACHE_NOT_FOUND_TTL", str(24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "50000"))
+RESULT_CACHE_STALE_TTL = float(os.environ.get("RESULT_CACHE_STALE_TTL", str(3 * 24 * 3600)))
+RESULT_CACHE_REFRESH_WORKERS = int(os.environ.get("RESULT_CACHE_REFRESH_WORKERS", "2"))
+REQUEST_HALF_LIFE = float(os.environ.get("REQUEST_HALF_LIFE", str(7 * 24 * 3600)))
+
+# Request scores grow as 2 ** ((t - epoch) / half life), so ordering by the
+# summed score ranks parts by exponentially decayed request frequency
+_SCORE_EPOCH = 1704067200.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookups (
+    vendor TEXT NOT NULL,
+    part TEXT NOT NULL,
+    found INTEGER NOT NULL,
+    result TEXT,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    last_used REAL NOT NULL,
+    definitive INTEGER NOT NULL DEFAULT 0,
+    part_used TEXT,
+    PRIMARY KEY (vendor, part)
+);
+CREATE INDEX IF NOT EXISTS lookups_last_used ON lookups (last_used);
+CREATE TABLE IF NOT EXISTS part_requests (
+    vendor TEXT NOT NULL,
+    part TEXT NOT NULL,
+    score REAL NOT NULL,
+    requests INTEGER NOT NULL,
+    last_requested REAL NOT NULL,
+    PRIMARY KEY (vendor, part)
+);
+CREATE INDEX IF NOT EXISTS part_requests_score ON part_requests (score);
+"""
+
+
+def cache_key(part_number):
+    return part_key(part_number)
+
+
+class ResultCache:
+    """SQLite-backed (vendor, part variation) -> found/not found store"""
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 found_ttl=RESULT_CACHE_FOUND_TTL, not_found_ttl=RESULT_CACHE_NOT_FOUND_TTL,
+                 stale_ttl=RESULT_CACHE_STALE_TTL):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.found_ttl = found_ttl
+        self.not_found_ttl = not_found_ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._stats = {
+            "hits": 0, "negative_hits": 0, "stale_hits": 0, "misses": 0, "bypassed": 0,
+            "stores": 0, "evictions": 0, "refreshes": 0, "refresh_failures": 0,
+            "scrapes_avoided": 0,
+        }
+
+    def _connection(self):
+        # A forked worker must not reuse its parent's connection
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(lookups)")]
+            if "definitive" not in columns:
+                # Misses stored before the flag existed may hide swallowed errors
+                try:
+                    self._db.execute("ALTER TABLE lookups ADD COLUMN definitive INTEGER NOT NULL DEFAULT 0")
+                    self._db.commit()
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+            if "part_used" not in columns:
+                # Found entries stored before it report their variation's spelling
+                try:
+                    self._db.execute("ALTER TABLE lookups ADD COLUMN part_used TEXT")
+                    self._db.commit()
+                except sqlite3.OperationalError:
+                    pass
+            self._pid = os.getpid()
+        return self._db
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, vendor, part_number):
+        """(found, result, expires, definitive, part_used) for one variation, or None when unknown
+
+        definitive is set when the vendor answered the search itself, e.g.
+        "No records found", rather than the entry predating that flag.
+        part_used is the part number the vendor matched for a found entry
+        (None before that column existed).
+        Entries past expires are still returned during the stale window.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            row = db.execute(
+                "SELECT found, result, expires, definitive, part_used FROM lookups "
+                "WHERE vendor = ? AND part = ? AND expires > ?",
+                (vendor, cache_key(part_number), now - self.stale_ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE lookups SET last_used = ? WHERE vendor = ? AND part = ?",
+                (now, vendor, cache_key(part_number)),
+            )
+            db.commit()
+        found, result, expires, definitive, part_used = row
+        result = json.loads(result) if result is not None else None
+        return bool(found), result, expires, bool(definitive), part_used
+
+    def lookup(self, vendor, part_variations, count=True):
+        """(True, result, expires) when the cache can answer for these variations, else (False, None, None)
+
+        result is (socket_info, part_used) for the first variation cached as
+        found, provided every variation before it is cached as not found,
+        and None when all of them are cached as not found. Only definitive
+        misses count as not found. expires is when the oldest entry the
+        answer relies on went or goes stale.
+        """
+        oldest = None
+        for part_number in part_variations:
+            entry = self.get(vendor, part_number)
+            if entry is None or not (entry[0] or entry[3]):
+                if count:
+                    self._count("misses")
+                return False, None, None
+            found, result, expires, _, part_used = entry
+            oldest = expires if oldest is None else min(oldest, expires)
+            if found:
+                answer = (result, part_used or part_number)
+                break
+        else:
+            answer = None
+        if count:
+            self._count("hits" if answer else "negative_hits")
+            if oldest <= time.time():
+                self._count("stale_hits")
+        return True, answer, oldest
+
+    def plan(self, vendor, part_variations):
+        """(variations to probe, known hit, variations known to miss) from fresh entries
+
+        Variations with a definitive not-found answer are skipped, and the
+        first variation cached as found ends the list: its (socket_info,
+        part_used) is the answer if every variation before it misses. Stale,
+        unknown and non-definitive variations are probed, so expired entries
+        are checked again.
+        """
+        now = time.time()
+        to_probe = []
+        known_misses = []
+        for part_number in part_variations:
+            entry = self.get(vendor, part_number)
+            if entry is None or entry[2] <= now:
+                to_probe.append(part_number)
+            elif entry[0]:
+                return to_probe, (entry[1], entry[4] or part_number), known_misses
+            elif entry[3]:
+                known_misses.append(part_number)
+            else:
+                to_probe.append(part_number)
+        return to_probe, None, known_misses
+
+    def record_request(self, vendor, part_number):
+        """Count a search for part_number, for prewarming the most requested parts"""
+        now = time.time()
+        weight = 2 ** ((now - _SCORE_EPOCH) / REQUEST_HALF_LIFE)
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "INSERT INTO part_requests VALUES (?, ?, ?, 1, ?) ON CONFLICT (vendor, part) DO UPDATE SET "
+                "score = score + excluded.score, requests = requests + 1, last_requested = excluded.last_requested",
+                (vendor, cache_key(part_number), weight, now),
+            )
+            excess = db.execute("SELECT COUNT(*) FROM part_requests").fetchone()[0] - self.max_entries
+            if excess > 0:
+                db.execute(
+                    "DELETE FROM part_requests WHERE rowid IN "
+                    "(SELECT rowid FROM part_requests ORDER BY score LIMIT ?)",
+                    (excess,),
+                )
+            db.commit()
+
+    def hot_parts(self, limit):
+        """[(vendor, part)] most requested recently, most requested first"""
+        with self._lock:
+            db = self._connection()
+            return db.execute(
+                "SELECT vendor, part FROM part_requests ORDER BY score DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def store(self, vendor, part_variations, result):
+        """Remember a finished search: variations up to the match, or all as misses
+
+        A search only finishes when the vendor answered every variation it
+        tried (failures raise), so the rows are stored as definitive. Pass
+        only the variations the vendor was asked about: a harvest searches
+        once, so the others get no row.
+        """
+        now = time.time()
+        rows = []
+        for part_number in part_variations:
+            if result and cache_key(part_number) == cache_key(result[1]):
+                rows.append((
+                    vendor, cache_key(part_number), 1, json.dumps(result[0]), now, now + self.found_ttl, now, 1,
+                    result[1],
+                ))
+                break
+            rows.append((vendor, cache_key(part_number), 0, None, now, now + self.not_found_ttl, now, 1, None))
+        else:
+            if result:
+                # Matched on a part we did not ask for, nothing reliable to store
+                return
+        with self._lock:
+            db = self._connection()
+            db.executemany("INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._count("stores", len(rows))
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db, now):
+        evicted = db.execute("DELETE FROM lookups WHERE expires <= ?", (now - self.stale_ttl,)).rowcount
+        excess = db.execute("SELECT COUNT(*) FROM lookups").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted += db.execute(
+                "DELETE FROM lookups WHERE rowid IN (SELECT rowid FROM lookups ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self._count("evictions", evicted)
+
+    def found_entries(self):
+        """[(vendor, part, result)] for every found entry, stale ones included"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT vendor, part, result FROM lookups WHERE found = 1"
+            ).fetchall()
+        return [(vendor, part, json.loads(result)) for vendor, part, result in rows]
+
+    def clear(self):
+        with self._lock:
+            db = self._connection()
+            db.execute("DELETE FROM lookups")
+            db.commit()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._lock:
+            db = self._connection()
+            stats["entries"], stats["found_entries"] = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(found), 0) FROM lookups"
+            ).fetchone()
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 3) if lookups else None
+        stats["path"] = self.path
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """The process-wide cache, or None when RESULT_CACHE=0"""
+    global _cache
+    if not RESULT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+# In-flight live searches, keyed by (website, part_key)
+_flights = SingleFlight()
+
+
+def _search_and_store(vendor, original_part_number, search, cancel_event=None, meta=None, skip_known=True,
+                      hints=None):
+    """Live search shared with identical in-flight searches, stored when it finishes
+
+    With skip_known, variations the cache knows to miss are not scraped
+    again and a known hit on a shorter variation is used without scraping
+    it. Only the variations actually probed are stored, so known entries
+    keep their expiry. hints (variation_search.VariationHints) lets the
+    search try variations that matched at other vendors early.
+    """
+    def run(shared_cancel):
+        part_variations = build_part_variations(original_part_number, vendor=vendor)
+        cache = get_result_cache()
+        to_probe, known_hit, known_misses = part_variations, None, []
+        if cache is not None and skip_known:
+            to_probe, known_hit, known_misses = cache.plan(vendor, part_variations)
+            if known_misses or known_hit:
+                print(f"Skipping known misses {known_misses} for {vendor}, probing {to_probe}")
+
+        if hints is not None:
+            to_probe = HintedVariations(to_probe, hints)
+
+        result = None
+        search_meta = {}
+        if to_probe:
+            result = search(
+                original_part_number, cancel_event=shared_cancel, part_variations=to_probe, meta=search_meta
+            )
+        extras = {"alternates": search_meta.get("alternates", []), "probes_saved": 0, "hinted_by": None}
+        if hints is not None and result:
+            extras["probes_saved"] = to_probe.probes_saved(result[1])
+            if extras["probes_saved"]:
+                extras["hinted_by"] = to_probe.hinted_by
+        if cache is not None:
+            # Store in the order the variations were actually tried; a harvest reports
+            # the few it actually sent to the vendor
+            probed = search_meta.get("probed") or getattr(to_probe, "probed", None) or to_probe
+            cache.store(vendor, probed, result)
+            # Known misses ranked before the answer would have been scraped
+            stop = len(part_variations)
+            if result and result[1] in part_variations:
+                stop = part_variations.index(result[1])
+            avoided = sum(1 for part_number in known_misses if part_variations.index(part_number) < stop)
+            if not result and known_hit:
+                avoided += 1
+            if avoided:
+                cache._count("scrapes_avoided", avoided)
+        if not result and known_hit:
+            print(f"Using known hit for {vendor} '{known_hit[1]}': {known_hit[0]}")
+            return known_hit, extras
+        return result, extras
+
+    result, extras = _flights.run((vendor, cache_key(original_part_number)), run, cancel_event, meta)
+    if meta is not None:
+        meta.update(extras)
+    return _in_callers_spelling(vendor, original_part_number, result)
+
+
+def _in_callers_spelling(vendor, original_part_number, result):
+    """result with part_used as the caller typed it, when it only differs in case or spacing
+
+    A cached or coalesced answer may come from a request that typed the part
+    differently. Any other difference (a packaging suffix, a shorter stem)
+    is what the vendor matched and is reported as is.
+    """
+    if result:
+        for part_number in build_part_variations(original_part_number, vendor=vendor):
+            if compact_part_number(part_number) == compact_part_number(result[1]):
+                return result[0], part_number
+    return result
+
+
+def cached_search(vendor, original_part_number, search, no_cache=False, meta=None, cancel_event=None,
+                  hints=None):
+    """Run search(original_part_number, cancel_event=..., part_variations=..., meta=...) through the cache
+
+    no_cache skips the lookup and the known misses, but still stores the
+    fresh result. A stale answer is returned at once and refreshed in the
+    background. When given, meta is filled with 'cached' (whether the cache
+    answered), 'stale', 'coalesced' (whether another request's scrape was
+    shared), 'alternates' (other candidates a harvesting search listed, not
+    cached) and 'probes_saved'/'hinted_by' (probes skipped thanks to a hint).
+    """
+    cache = get_result_cache()
+    if meta is not None:
+        meta["cached"] = False
+        meta["stale"] = False
+        meta["coalesced"] = False
+        meta["alternates"] = []
+        meta["probes_saved"] = 0
+        meta["hinted_by"] = None
+
+    if cache is not None:
+        cache.record_request(vendor, original_part_number)
+        if no_cache:
+            cache._count("bypassed")
+        else:
+            hit, result, expires = cache.lookup(vendor, build_part_variations(original_part_number, vendor=vendor))
+            if hit:
+                stale = expires <= time.time()
+                print(f"Cache hit for {vendor} '{original_part_number}'{' (stale)' if stale else ''}: {result}")
+                if meta is not None:
+                    meta["cached"] = True
+                    meta["stale"] = stale
+                if stale:
+                    refresh_in_background(vendor, original_part_number, search)
+                return _in_callers_spelling(vendor, original_part_number, result)
+
+    # Exceptions (errors, cancellation) propagate before anything is stored
+    return _search_and_store(
+        vendor, original_part_number, search, cancel_event, meta, skip_known=not no_cache, hints=hints
+    )
+
+
+def refresh(vendor, original_part_number, search):
+    """Search live and store the result, returning it (None on failure too)"""
+    cache = get_result_cache()
+    try:
+        result = _search_and_store(vendor, original_part_number, search, skip_known=False)
+    except Exception as e:
+        print(f"Refreshing {vendor} '{original_part_number}' failed: {e}")
+        if cache is not None:
+            cache._count("refresh_failures")
+        return None
+    if cache is not None:
+        cache._count("refreshes")
+    return result
+
+
+_refresh_lock = threading.Lock()
+_refreshing = set()
+_refresh_executor = None
+
+
+def refresh_in_background(vendor, original_part_number, search):
+    """Queue one refresh per (vendor, part), returning False if one is already queued"""
+    global _refresh_executor
+    key = (vendor, cache_key(original_part_number))
+    with _refresh_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=max(1, RESULT_CACHE_REFRESH_WORKERS), thread_name_prefix="cache-refresh"
+            )
+
+    def run():
+        try:
+            refresh(vendor, original_part_number, search)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    _refresh_executor.submit(run)
+    return True
+
+
+def single_flight_stats():
+    return _flights.stats()
+
+
+def result_cache_stats():
+    cache = get_result_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,98 @@
+"""Coalescing of identical in-flight searches.
+
+When several requests search the same part on the same website at once,
+only the first runs the scrape. The others attach to it and receive the
+same result or exception. The shared scrape only counts as cancelled once
+every attached request has cancelled, so one user choosing "first hit"
+does not cut short another user's search.
+"""
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from variation_search import SearchCancelled
+
+
+class _SharedCancel:
+    """Looks like a threading.Event to the vendor code: set once all callers cancelled"""
+
+    def __init__(self):
+        self.events = []
+
+    def is_set(self):
+        return bool(self.events) and all(event is not None and event.is_set() for event in self.events)
+
+
+class _Flight:
+    def __init__(self):
+        self.future = Future()
+        self.cancel = _SharedCancel()
+        self.started = time.monotonic()
+
+
+class SingleFlight:
+    """Runs fn(cancel_event) once per key at a time and shares its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = {"flights": 0, "coalesced": 0, "max_attached": 0}
+
+    def run(self, key, fn, cancel_event=None, meta=None):
+        """fn's result for key, running it only if no identical call is in flight
+
+        When given, meta['coalesced'] tells whether this call attached to
+        another caller's scrape.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self._stats["flights"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+                flight.cancel.events.append(cancel_event)
+                self._stats["max_attached"] = max(self._stats["max_attached"], len(flight.cancel.events))
+            if meta is not None:
+                meta["coalesced"] = not leader
+
+            if leader:
+                return self._lead(key, flight, fn)
+            try:
+                return self._follow(flight, cancel_event, key)
+            except SearchCancelled:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise
+                # Everyone else gave up just as we attached, run it ourselves
+                continue
+
+    def _lead(self, key, flight, fn):
+        try:
+            result = fn(flight.cancel)
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _follow(self, flight, cancel_event, key):
+        print(f"Attaching to the search already running for {key}")
+        while True:
+            try:
+                return flight.future.result(timeout=0.2)
+            except TimeoutError:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise SearchCancelled(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._flights)
+            stats["attached"] = sum(len(flight.cancel.events) for flight in self._flights.values())
+        return stats
@@ -0,0 +1,269 @@
+// Batch (BOM) search: rows appear as each part completes, and the batch
+// is picked up again after a page reload
+const BATCH_STORAGE_KEY = 'batchId';
+const VENDOR_NAMES = {
+    systemgeneral: 'System General',
+    dataio: 'DataIO',
+    bpmicro: 'BPMicro'
+};
+
+let batchId = null;
+let batchInterval = null;
+let batchAfter = 0;
+let batchWebsites = [];
+let batchPolling = false;
+
+const batchPartsInput = document.getElementById('batchParts');
+const batchFileInput = document.getElementById('batchFile');
+const batchStartBtn = document.getElementById('batchStartBtn');
+const batchCancelBtn = document.getElementById('batchCancelBtn');
+const batchResumeBtn = document.getElementById('batchResumeBtn');
+const batchProgressContainer = document.getElementById('batchProgressContainer');
+const batchProgressFill = document.getElementById('batchProgressFill');
+const batchProgressText = document.getElementById('batchProgressText');
+const batchDownloads = document.getElementById('batchDownloads');
+const batchTableContainer = document.getElementById('batchTableContainer');
+const batchTable = document.getElementById('batchTable');
+
+document.addEventListener('DOMContentLoaded', function() {
+    batchStartBtn.addEventListener('click', startBatch);
+    batchCancelBtn.addEventListener('click', () => batchAction('cancel'));
+    batchResumeBtn.addEventListener('click', () => batchAction('resume'));
+
+    const savedId = localStorage.getItem(BATCH_STORAGE_KEY);
+    if (savedId) {
+        attachBatch(savedId);
+    }
+});
+
+function startBatch() {
+    const websites = getSelectedWebsites();
+    if (websites.length === 0) {
+        showBatchMessage('Please select at least one website');
+        return;
+    }
+
+    let request;
+    const file = batchFileInput.files[0];
+    if (file) {
+        const form = new FormData();
+        form.append('file', file);
+        form.append('websites', websites.join(','));
+        form.append('mode', getSearchMode());
+        form.append('no_cache', noCacheCb.checked ? '1' : '0');
+        request = fetch('/api/batch', {method: 'POST', body: form});
+    } else {
+        const text = batchPartsInput.value.trim();
+        if (!text) {
+            showBatchMessage('Please paste part numbers or choose a BOM file');
+            return;
+        }
+        request = fetch('/api/batch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                text: text,
+                websites: websites,
+                mode: getSearchMode(),
+                no_cache: noCacheCb.checked
+            })
+        });
+    }
+
+    batchStartBtn.disabled = true;
+    request
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) {
+            throw new Error(data.error);
+        }
+        attachBatch(data.batch_id);
+    })
+    .catch(error => {
+        showBatchMessage('Failed to start batch: ' + error.message);
+        batchStartBtn.disabled = false;
+    });
+}
+
+function attachBatch(id) {
+    batchId = id;
+    batchAfter = 0;
+    localStorage.setItem(BATCH_STORAGE_KEY, id);
+    batchTable.querySelector('thead').innerHTML = '';
+    batchTable.querySelector('tbody').innerHTML = '';
+    batchProgressContainer.style.display = 'block';
+    batchTableContainer.style.display = 'block';
+    batchDownloads.innerHTML = `
+        <a href="/api/batch/${id}/results.csv">Download CSV</a>
+        <a href="/api/batch/${id}/results.jsonl">Download JSON lines</a>
+    `;
+    startBatchPolling();
+}
+
+function startBatchPolling() {
+    if (batchInterval) {
+        clearInterval(batchInterval);
+    }
+    batchInterval = setInterval(checkBatchStatus, 1000);
+    checkBatchStatus();
+}
+
+function stopBatchPolling() {
+    clearInterval(batchInterval);
+    batchInterval = null;
+}
+
+function checkBatchStatus() {
+    // A slow response must not be overtaken by the next poll
+    if (!batchId || batchPolling) return;
+    batchPolling = true;
+
+    fetch(`/api/batch/${batchId}?after=${batchAfter}`)
+    .then(response => {
+        if (response.status === 404) {
+            localStorage.removeItem(BATCH_STORAGE_KEY);
+            throw new Error('Batch not found');
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (batchTable.querySelector('thead').children.length === 0) {
+            buildBatchHeader(data.websites);
+        }
+        (data.rows || []).forEach(addBatchRow);
+        if (data.rows && data.rows.length > 0) {
+            batchAfter = data.rows[data.rows.length - 1].seq;
+        }
+        updateBatchProgress(data);
+
+        // Keep paging until every completed row is shown
+        const caughtUp = batchAfter >= data.last_seq;
+        if (data.status !== 'running' && caughtUp) {
+            stopBatchPolling();
+        }
+    })
+    .catch(error => {
+        console.error('Error checking batch status:', error);
+        stopBatchPolling();
+        showBatchMessage(error.message);
+    })
+    .finally(() => {
+        batchPolling = false;
+    });
+}
+
+function buildBatchHeader(websites) {
+    batchWebsites = websites;
+    const row = document.createElement('tr');
+    ['#', 'Part Number'].concat(websites.map(key => VENDOR_NAMES[key] || key)).forEach(label => {
+        const th = document.createElement('th');
+        th.textContent = label;
+        row.appendChild(th);
+    });
+    batchTable.querySelector('thead').appendChild(row);
+}
+
+function addBatchRow(row) {
+    const tr = document.createElement('tr');
+    tr.dataset.position = row.position;
+    tr.className = row.found ? 'found' : 'not-found';
+
+    const position = document.createElement('td');
+    position.textContent = row.position + 1;
+    tr.appendChild(position);
+
+    const part = document.createElement('td');
+    part.textContent = row.part_number;
+    if (row.aliases.length > 0) {
+        part.title = 'Also listed as: ' + row.aliases.join(', ');
+    }
+    tr.appendChild(part);
+
+    batchWebsites.forEach(key => {
+        const entry = row.results[key] || {};
+        const td = document.createElement('td');
+        td.className = 'batch-cell ' + (entry.status || '').replace('_', '-');
+        if (entry.status === 'found') {
+            td.textContent = entry.socket_info;
+            if (entry.part_used && entry.part_used !== row.part_number) {
+                td.title = 'Matched as ' + entry.part_used;
+            }
+        } else if (entry.status === 'error') {
+            td.textContent = 'Error';
+            td.title = entry.error || '';
+        } else {
+            td.textContent = getStatusText(entry.status);
+        }
+        if (entry.cached) {
+            td.textContent += ' ⚡';
+        }
+        tr.appendChild(td);
+    });
+
+    // Rows complete out of order; keep the table in BOM order
+    const tbody = batchTable.querySelector('tbody');
+    const next = Array.from(tbody.children).find(other => Number(other.dataset.position) > row.position);
+    tbody.insertBefore(tr, next || null);
+}
+
+function updateBatchProgress(data) {
+    batchProgressFill.style.width = data.progress + '%';
+
+    let text = `${data.completed} of ${data.total} parts`;
+    if (data.duplicates > 0) {
+        text += ` (${data.duplicates} duplicates merged)`;
+    }
+    text += ` · ${data.found} found · ${data.cached} from cache`;
+    if (data.parts_per_minute) {
+        text += ` · ${data.parts_per_minute} parts/min`;
+    }
+    if (data.eta_seconds !== null && data.eta_seconds !== undefined) {
+        text += ` · about ${formatDuration(data.eta_seconds)} left`;
+    }
+    if (data.status !== 'running') {
+        text = `Batch ${data.status}: ` + text;
+    }
+    batchProgressText.textContent = text;
+
+    batchStartBtn.disabled = data.status === 'running';
+    batchCancelBtn.style.display = data.status === 'running' ? 'inline-block' : 'none';
+    batchResumeBtn.style.display = ['cancelled', 'interrupted'].includes(data.status) ? 'inline-block' : 'none';
+}
+
+function formatDuration(seconds) {
+    if (seconds < 60) return `${seconds}s`;
+    const minutes = Math.round(seconds / 60);
+    if (minutes < 60) return `${minutes} min`;
+    return `${Math.floor(minutes / 60)} h ${minutes % 60} min`;
+}
+
+function batchAction(action) {
+    if (!batchId) return;
+    fetch(`/api/batch/${batchId}/${action}`, {method: 'POST'})
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) {
+            throw new Error(data.error);
+        }
+        updateBatchProgress(data);
+        if (action === 'resume') {
+            startBatchPolling();
+        }
+    })
+    .catch(error => {
+        showBatchMessage(`Failed to ${action} batch: ` + error.message);
+    });
+}
+
+function showBatchMessage(message) {
+    batchProgressContainer.style.display = 'block';
+    batchProgressText.textContent = message;
+}
+
+window.addEventListener('beforeunload', function() {
+    if (batchInterval) {
+        clearInterval(batchInterval);
+    }
+});
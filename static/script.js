@@ -15,6 +15,7 @@ const resultsContainer = document.getElementById('resultsContainer');
 const systemGeneralCb = document.getElementById('systemgeneral');
 const dataioCb = document.getElementById('dataio');
 const bpmicroCb = document.getElementById('bpmicro');
+const noCacheCb = document.getElementById('noCache');
 
 // Event listeners
 document.addEventListener('DOMContentLoaded', function() {
@@ -34,9 +35,45 @@ document.addEventListener('DOMContentLoaded', function() {
         if (value.length > 255) {
             this.value = value.substring(0, 255);
         }
+        scheduleSuggestions(this.value.trim());
     });
 });
 
+// Typeahead from the local catalog
+let suggestTimer = null;
+let lastSuggestPrefix = '';
+
+function scheduleSuggestions(prefix) {
+    clearTimeout(suggestTimer);
+    if (prefix.length < 2 || prefix === lastSuggestPrefix) {
+        return;
+    }
+    suggestTimer = setTimeout(() => fetchSuggestions(prefix), 150);
+}
+
+async function fetchSuggestions(prefix) {
+    lastSuggestPrefix = prefix;
+    try {
+        const response = await fetch(`/api/suggest?q=${encodeURIComponent(prefix)}&limit=10`);
+        if (!response.ok) {
+            return;
+        }
+        const data = await response.json();
+        const list = document.getElementById('partSuggestions');
+        list.innerHTML = '';
+        data.suggestions.forEach(suggestion => {
+            const option = document.createElement('option');
+            option.value = suggestion.part_number;
+            option.label = Object.entries(suggestion.sockets)
+                .map(([website, socket]) => `${website}: ${socket}`)
+                .join(' | ');
+            list.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Suggestion error:', error);
+    }
+}
+
 function startSearch() {
     const partNumber = partNumberInput.value.trim();
     
@@ -66,7 +103,9 @@ function startSearch() {
         },
         body: JSON.stringify({
             part_number: partNumber,
-            websites: selectedWebsites
+            websites: selectedWebsites,
+            mode: getSearchMode(),
+            no_cache: noCacheCb.checked
         })
     })
     .then(response => response.json())
@@ -93,6 +132,11 @@ function getSelectedWebsites() {
     return websites;
 }
 
+function getSearchMode() {
+    const selected = document.querySelector('input[name="searchMode"]:checked');
+    return selected ? selected.value : 'all';
+}
+
 function startStatusPolling() {
     if (searchInterval) {
         clearInterval(searchInterval);
@@ -116,6 +160,11 @@ function checkSearchStatus() {
     .then(data => {
         updateProgress(data.progress || 0, data.current_search || 'Searching...');
         
+        if (data.status === 'running' && (data.results || []).length > 0) {
+            // Show each website's result as soon as it finishes
+            displayResults(data);
+        }
+        
         if (data.status === 'completed') {
             clearInterval(searchInterval);
             searchInterval = null;
@@ -162,11 +211,12 @@ function resetSearchButton() {
 function displayResults(data) {
     const results = data.results || [];
     const summary = data.summary || {};
+    const completed = data.status === 'completed';
     
     let html = '';
     
     // Add summary
-    if (results.length > 0) {
+    if (completed && results.length > 0) {
         html += `
             <div class="search-summary">
                 <h3>🎯 Search Complete!</h3>
@@ -206,7 +256,7 @@ function displayResults(data) {
     // Show final message if no results
     if (results.length === 0) {
         html = '<div class="no-results">No search was performed.</div>';
-    } else if (summary.found_count === 0) {
+    } else if (completed && summary.found_count === 0) {
         html += `
             <div class="result-item not-found">
                 <div class="result-header">
@@ -228,6 +278,7 @@ function getStatusText(status) {
         case 'found': return 'Found';
         case 'not_found': return 'Not Found';
         case 'error': return 'Error';
+        case 'skipped': return 'Skipped';
         default: return 'Unknown';
     }
 }
@@ -237,6 +288,7 @@ function getStatusIcon(status) {
         case 'found': return '✅';
         case 'not_found': return '❌';
         case 'error': return '⚠️';
+        case 'skipped': return '⏭️';
         default: return '❓';
     }
 }
@@ -244,14 +296,31 @@ function getStatusIcon(status) {
 function getResultDetails(result) {
     let details = `<strong>Part Number Used:</strong> ${result.part_used}<br>`;
     
+    if (result.catalog) {
+        details += '<span class="cached-text">📚 Answered from the local catalog</span><br>';
+    } else if (result.cached && result.stale) {
+        details += '<span class="cached-text">⚡ Answered from cache (being refreshed in the background)</span><br>';
+    } else if (result.cached) {
+        details += '<span class="cached-text">⚡ Answered from cache</span><br>';
+    }
+    
     if (result.status === 'found') {
         details += `<strong>Socket/Adapter Info:</strong> ${result.socket_info}<br>`;
         
         if (result.modified) {
             details += `<span class="warning-text">⚠️ Original part number modified (removed ${result.chars_removed} characters)</span>`;
         }
+        
+        if (result.alternates && result.alternates.length > 0) {
+            const alternates = result.alternates
+                .map(alternate => alternate.socket_info ? `${alternate.part_number} (${alternate.socket_info})` : alternate.part_number)
+                .join(', ');
+            details += `<br><span class="alternates-text"><strong>Other matches:</strong> ${alternates}</span>`;
+        }
     } else if (result.status === 'error') {
         details += `<span class="error-text">Error: ${result.error || 'Unknown error occurred'}</span>`;
+    } else if (result.status === 'skipped') {
+        details += '<span class="skipped-text">Skipped – another website already found a match</span>';
     } else {
         details += '<span class="error-text">No matching device found</span>';
     }
@@ -0,0 +1,157 @@
+"""Browserless System General search against its Caspio DataPage.
+
+The device search page only embeds a Caspio DataPage. The DataPage is a
+plain HTML form, so instead of driving a browser we load the form once,
+resubmit it for each part number variation and read the SKB Name from the
+result table. SYSTEM_GENERAL_CASPIO_URL points at the DataPage directly,
+otherwise it is discovered from the embed code on the device search page.
+harvest() instead submits the shortest variation once and ranks every row
+of the result table.
+"""
+import os
+import re
+import threading
+import time
+
+import lxml.html
+
+from extraction import result_rows
+from http_client import DirectSearchFailed, fetch, parse_form
+from variation_search import HARVEST_ALTERNATES, SearchCancelled, probe_order, rank_candidates
+
+
+CASPIO_URL = os.environ.get("SYSTEM_GENERAL_CASPIO_URL")
+SEARCH_FIELD = "Value2_1"
+SEARCH_BUTTON = "searchID"
+DISCOVERY_RETRY = 300
+
+_DATAPAGE_PATTERN = re.compile(r"(https?://[\w.-]+(?::\d+)?/dp/[0-9A-Za-z]+)")
+
+_lock = threading.Lock()
+_discovered = {"url": None, "retry_at": 0.0}
+
+
+def caspio_url(page_url):
+    """The DataPage URL, configured or found in the device search page"""
+    if CASPIO_URL:
+        return CASPIO_URL
+    with _lock:
+        if _discovered["url"]:
+            return _discovered["url"]
+        if time.monotonic() < _discovered["retry_at"]:
+            raise DirectSearchFailed("Caspio DataPage URL not found recently, not retrying yet")
+        try:
+            url = _discover_caspio_url(page_url)
+        except DirectSearchFailed:
+            _discovered["retry_at"] = time.monotonic() + DISCOVERY_RETRY
+            raise
+        print(f"Found Caspio DataPage at {url}")
+        _discovered["url"] = url
+        return url
+
+
+def _discover_caspio_url(page_url):
+    html = fetch("GET", page_url).text
+    match = _DATAPAGE_PATTERN.search(html)
+    if match:
+        return match.group(1)
+    # Site builders often wrap the embed code in one more iframe
+    doc = lxml.html.fromstring(html, base_url=page_url)
+    doc.make_links_absolute()
+    for src in doc.xpath("//iframe/@src"):
+        try:
+            match = _DATAPAGE_PATTERN.search(fetch("GET", src).text)
+        except DirectSearchFailed:
+            continue
+        if match:
+            return match.group(1)
+    raise DirectSearchFailed(f"no Caspio DataPage embedded in {page_url}")
+
+
+def search_variations(part_variations, page_url, cancel_event=None):
+    """Try each variation in order and return (skb_name, part_used) or None"""
+    form_url = caspio_url(page_url)
+    form_page = fetch("GET", form_url)
+    action, method, fields = parse_form(form_page.text, form_page.url, SEARCH_FIELD)
+
+    for part_number in probe_order(part_variations):
+        if cancel_event is not None and cancel_event.is_set():
+            raise SearchCancelled(part_number)
+        print(f"Searching for part number: {part_number} (direct)")
+        skb_name = _query_part(action, method, fields, part_number, form_page.url)
+        if skb_name:
+            print(f"SKB Name of first result: {skb_name}")
+            return skb_name, part_number
+        print("No results found for this part number")
+    return None
+
+
+def harvest(original_part_number, part_variations, page_url, cancel_event=None):
+    """Search once for the shortest variation and pick the best row locally
+
+    Returns (result, alternates): result is (skb_name, part_used) or None,
+    as from search_variations(), and alternates lists the other matching
+    rows as {"part_number", "socket_info"}. A paged result set falls back to
+    searching each variation.
+    """
+    shortest = min(part_variations, key=len)
+    form_url = caspio_url(page_url)
+    form_page = fetch("GET", form_url)
+    action, method, fields = parse_form(form_page.text, form_page.url, SEARCH_FIELD)
+    if cancel_event is not None and cancel_event.is_set():
+        raise SearchCancelled(shortest)
+
+    print(f"Harvesting candidates for part number: {shortest} (direct)")
+    rows, total = parse_result_rows(_submit(action, method, fields, shortest, form_page.url))
+    if total is not None and total > len(rows):
+        print(f"Only {len(rows)} of {total} records listed, searching each variation instead")
+        return search_variations(part_variations, page_url, cancel_event), []
+
+    matching = rank_candidates(original_part_number, part_variations, [row[0] for row in rows])
+    ranked = [(index, part_used) for index, part_used in matching if rows[index][1]]
+    if not matching:
+        print("No matching rows for any variation")
+        return None, []
+    if not ranked:
+        raise DirectSearchFailed("no matching row has an SKB Name")
+    best, part_used = ranked[0]
+    print(f"Best of {len(rows)} rows: {rows[best][0]} -> {rows[best][1]}")
+    alternates = [
+        {"part_number": rows[index][0], "socket_info": rows[index][1]}
+        for index, _ in ranked[1:HARVEST_ALTERNATES + 1]
+    ]
+    return (rows[best][1], part_used), alternates
+
+
+def _submit(action, method, fields, part_number, referer):
+    data = dict(fields)
+    data[SEARCH_FIELD] = part_number
+    data[SEARCH_BUTTON] = "Search"
+    headers = {"Referer": referer}
+    if method == "GET":
+        response = fetch("GET", action, params=data, headers=headers)
+    else:
+        response = fetch("POST", action, data=data, headers=headers)
+    return response.text
+
+
+def _query_part(action, method, fields, part_number, referer):
+    return parse_results(_submit(action, method, fields, part_number, referer))
+
+
+def parse_results(html):
+    """SKB Name (5th column) of the first result row, None on 'No records found'"""
+    rows, _ = parse_result_rows(html)
+    if not rows:
+        return None
+    if not rows[0][1]:
+        raise DirectSearchFailed(f"result row {rows[0][0]} has no SKB Name")
+    return rows[0][1]
+
+
+def parse_result_rows(html):
+    """([(part number, SKB name)] of the result rows, total records or None)"""
+    parsed = result_rows(html)
+    if parsed is None:
+        raise DirectSearchFailed("Caspio response has neither a result table nor 'No records found'")
+    return parsed
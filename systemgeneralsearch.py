@@ -1,174 +1,212 @@
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-import time
-
-
-def search_part_number_in_system_general_limited(original_part_number):
-    """Search with variations - try up to 4 times by removing characters from the end"""
-    part_variations = [original_part_number]
-    
-    # Generate variations by removing one character at a time
-    current_part = original_part_number
-    for i in range(3):  # Try 3 more times (total 4 attempts)
-        if len(current_part) > 1:  # Make sure we don't end up with empty string
-            current_part = current_part[:-1]  # Remove last character
-            part_variations.append(current_part)
-    
+from browser_pool import register_warm_vendor, run_on_warm_page
+from http_client import DirectSearchFailed, record
+from variation_search import (
+    SearchFailed,
+    SearchFormUnusable,
+    build_part_variations,
+    fresh,
+    harvested_variations,
+    mark_stale,
+    mark_stale_async,
+    search_variations_in_page,
+    search_variations_in_parallel,
+    use_harvest,
+    use_parallel_variations,
+)
+from wait_engine import settle, settle_async, wait_for, wait_for_async
+from extraction import skb_name
+import os
+import systemgeneral_http
+
+
+VENDOR = "systemgeneral"
+SEARCH_URL = "https://www.systemgenerallimited.com/device-search"
+RESULT_SELECTOR = 'table.cbResultSetTable, p.cbResultSetRecordMessage'
+NO_RECORDS_TEXT = "No records found"
+
+# 'auto' tries the direct Caspio request first and falls back to the browser,
+# 'http' never opens a browser, 'browser' never uses the direct request
+BACKEND = os.environ.get("SYSTEM_GENERAL_BACKEND", "auto").lower()
+
+
+def search_part_number_in_system_general_limited(original_part_number, parallel=None, cancel_event=None,
+                                                 browser_search=None, part_variations=None, harvest=None,
+                                                 meta=None):
+    """Search ranked part number variations (part_grammar.py), at most MAX_PROBES of them
+
+    browser_search(original_part_number, part_variations), when given,
+    replaces the pooled browser fallback (the async engine passes its own).
+    part_variations overrides the variations to try, e.g. without the ones
+    the result cache already knows to miss. With harvest (default HARVEST)
+    the direct backend searches once and meta['alternates'] gets the other
+    candidates it listed.
+    """
+    if part_variations is None:
+        part_variations = build_part_variations(original_part_number, vendor=VENDOR)
+
     print(f"Will try these part number variations: {part_variations}")
-    
-    for i, part_number in enumerate(part_variations):
-        print(f"\n--- Attempt {i+1}: Trying part number '{part_number}' ---")
-        
-        result = _search_single_part_system_general(part_number)
-        if result:
-            print(f"SUCCESS! Found result for part number '{part_number}': {result}")
-            return (result, part_number)
+
+    if BACKEND != "browser":
+        try:
+            if use_harvest(harvest):
+                result, alternates = systemgeneral_http.harvest(
+                    original_part_number, part_variations, SEARCH_URL, cancel_event
+                )
+                if meta is not None:
+                    meta["alternates"] = alternates
+                    meta["probed"] = harvested_variations(result, part_variations)
+            else:
+                result = systemgeneral_http.search_variations(part_variations, SEARCH_URL, cancel_event)
+        except DirectSearchFailed as e:
+            if BACKEND == "http":
+                raise
+            print(f"Direct Caspio search failed ({e}), falling back to the browser")
+            record(VENDOR, "fallback")
         else:
-            print(f"No results found for part number '{part_number}'")
-    
+            record(VENDOR, "direct")
+            if result:
+                return result
+            print(f"No results found for any variation of part number '{original_part_number}' after trying {len(part_variations)} variations")
+            return None
+
+    if browser_search is not None:
+        return browser_search(original_part_number, part_variations)
+
+    if use_parallel_variations(parallel):
+        result = search_variations_in_parallel(
+            VENDOR, part_variations, _search_variations_on_page, cancel_event=cancel_event
+        )
+    else:
+        result = run_on_warm_page(
+            VENDOR, _search_variations_on_page, part_variations, cancel_event=cancel_event
+        )
+    if result:
+        return result
+
     # If we get here, no results were found for any variation
     print(f"No results found for any variation of part number '{original_part_number}' after trying {len(part_variations)} variations")
     return None
 
 def _search_single_part_system_general(part_number):
     """Internal function to search for a single part number without variations"""
-    with sync_playwright() as p:
-        # Launch browser with longer timeout and visible for debugging
-        browser = p.chromium.launch(channel="msedge", headless=True)
-        page = browser.new_page()
-        
-        # Set longer timeouts
-        page.set_default_timeout(60000)  # 60 seconds
-        page.set_default_navigation_timeout(60000)
-        
-        try:
-            print(f"Searching for part number: {part_number}")
-            
-            # Navigate to the device search page
-            print("Navigating to website...")
-            page.goto("https://www.systemgenerallimited.com/device-search", wait_until="domcontentloaded")
-            print("Page loaded successfully")
-            
-            # Wait for iframe to load (using the specific class from the HTML)
-            print("Waiting for iframe to load...")
-            iframe = page.wait_for_selector('iframe.Z8YsjS', timeout=30000)
-            print("Iframe found!")
-            
-            # Switch to iframe context
-            print("Switching to iframe...")
-            # Get the frame object directly
-            frame = page.frame_locator('iframe.Z8YsjS').first
-            print("Switched to iframe context")
-            
-            # Wait for the search section inside iframe
-            print("Waiting for search section in iframe...")
-            frame.locator('section[data-cb-name="cbTable"]').wait_for(timeout=30000)
-            print("Search section found in iframe!")
-            
-            # Debug: Check if elements exist in iframe!
-            print("Debug: Checking if elements exist in iframe...")
-            try:
-                input_element = frame.locator('input[name="Value2_1"]')
-                if input_element.count() > 0:
-                    print("Debug: Found Value2_1 input in iframe")
-                else:
-                    print("Debug: Value2_1 input NOT found in iframe")
-            except Exception as e:
-                print(f"Debug: Error checking input: {e}")
-                
-            try:
-                button_element = frame.locator('input[name="searchID"]')
-                if button_element.count() > 0:
-                    print("Debug: Found searchID button in iframe")
-                else:
-                    print("Debug: searchID button NOT found in iframe")
-            except Exception as e:
-                print(f"Debug: Error checking button: {e}")
-            
-            # Fill the part number input field in iframe
-            print("Filling part number...")
-            frame.locator('input[name="Value2_1"]').fill(part_number)
-            
-            # Click the search button in iframe (use first one to avoid strict mode violation)
-            print("Clicking search button...")
-            frame.locator('input[name="searchID"]').first.click()
-            
-            # Wait for either results table or "No records found" message
-            print("Waiting for results...")
-            try:
-                # First try to wait for results table
-                frame.locator('table.cbResultSetTable').wait_for(timeout=10000)
-                print("Results table found!")
-                has_results = True
-            except:
-                # If no table, check for "No records found" message
-                print("No results table found, checking for 'No records found' message...")
-                try:
-                    frame.locator('p.cbResultSetRecordMessage').wait_for(timeout=5000)
-                    no_records_text = frame.locator('p.cbResultSetRecordMessage').text_content()
-                    if "No records found" in no_records_text:
-                        print("'No records found' message detected")
-                        has_results = False
-                    else:
-                        print(f"Found message: {no_records_text}")
-                        has_results = True
-                except:
-                    print("Neither results table nor 'No records found' message found")
-                    has_results = False
-            
-            # Give minimal time for results to load if we have results
-            if has_results:
-                time.sleep(1)
-            
-            # Print the page title
-            print(f"Page title: {page.title()}")
-            
-            # If no results found, return None immediately
-            if not has_results:
-                print("No results found for this part number")
-                return None
-            
-            # Get the iframe content for parsing
-            print("Getting iframe content...")
-            # Get the actual frame object for content
-            frame_element = page.locator('iframe.Z8YsjS').element_handle()
-            frame_obj = frame_element.content_frame()
-            page_content = frame_obj.content()
-            
-            # Parse the page content with BeautifulSoup
-            soup = BeautifulSoup(page_content, "html.parser")
-            
-            # Find the first table row in the tbody (excluding the header)
-            table = soup.find("table", {"class": "cbResultSetTable"})
-            skb_name = None
-            
-            if table:
-                print("Found results table")
-                tbody = table.find("tbody")
-                if tbody:
-                    rows = tbody.find_all("tr")
-                    print(f"Found {len(rows)} result rows")
-                    if rows:
-                        first_row = rows[0]
-                        # The SKB Name is the 5th <td> (index 4)
-                        tds = first_row.find_all("td")
-                        print(f"Found {len(tds)} columns in first row")
-                        if len(tds) >= 5:
-                            skb_name = tds[4].get_text(strip=True)
-            else:
-                print("No results table found in parsed content")
-            
-            if skb_name:
-                print(f"SKB Name of first result: {skb_name}")
-                return skb_name
-            else:
-                print("SKB Name not found in the first result.")
-                return None
-                
-        except Exception as e:
-            print(f"Error occurred: {e}")
-            print(f"Error type: {type(e).__name__}")
+    result = run_on_warm_page(VENDOR, _search_variations_on_page, [part_number])
+    return result[0] if result else None
+
+
+def _search_variations_on_page(page, form, part_variations, cancel_event=None):
+    """Run every variation on one pooled page, parked on the form when warm"""
+    return search_variations_in_page(
+        page, part_variations, _open_search_form, _query_part, form=form, cancel_event=cancel_event
+    )
+
+
+def _open_search_form(page):
+    """Navigate to the device search page and return the Caspio iframe"""
+    # Navigate to the device search page
+    print("Navigating to website...")
+    page.goto(SEARCH_URL, wait_until="domcontentloaded")
+    print("Page loaded successfully")
+
+    # Wait for iframe to load (using the specific class from the HTML)
+    print("Waiting for iframe to load...")
+    wait_for(page.locator('iframe.Z8YsjS').first, VENDOR, "form")
+    print("Iframe found!")
+
+    # Get the frame object directly
+    frame = page.frame_locator('iframe.Z8YsjS').first
+    print("Switched to iframe context")
+
+    # Wait for the search section inside iframe
+    print("Waiting for search section in iframe...")
+    wait_for(frame.locator('section[data-cb-name="cbTable"]'), VENDOR, "form")
+    print("Search section found in iframe!")
+    return frame
+
+
+def _query_part(page, frame, part_number):
+    """Search one part number on an already loaded Caspio form"""
+    print(f"Searching for part number: {part_number}")
+
+    input_element = frame.locator('input[name="Value2_1"]')
+    button_element = frame.locator('input[name="searchID"]')
+    if input_element.count() == 0 or button_element.count() == 0:
+        raise SearchFormUnusable("Value2_1 input or searchID button not found in iframe")
+
+    # Tag the previous variation's results so we only read fresh ones
+    mark_stale(frame.locator(RESULT_SELECTOR))
+
+    # Fill the part number input field in iframe
+    print("Filling part number...")
+    input_element.fill(part_number)
+
+    # Click the search button in iframe (use first one to avoid strict mode violation)
+    print("Clicking search button...")
+    button_element.first.click()
+
+    # Wait for either results table or "No records found" message
+    print("Waiting for results...")
+    try:
+        wait_for(frame.locator(fresh(RESULT_SELECTOR)).first, VENDOR, "results")
+    except Exception:
+        raise SearchFormUnusable("neither results table nor 'No records found' message appeared")
+
+    table = frame.locator(fresh('table.cbResultSetTable'))
+    if table.count() == 0:
+        no_records_text = frame.locator(fresh('p.cbResultSetRecordMessage')).first.text_content() or ""
+        if NO_RECORDS_TEXT in no_records_text:
+            print("'No records found' message detected")
             return None
-        finally:
-            print("Closing browser...")
-            browser.close()
+        raise SearchFailed(f"no result table to read, only the message '{no_records_text.strip()}'")
+
+    # Let the result rows finish rendering (this used to be a fixed 1s sleep)
+    print("Results table found!")
+    settle(table.first, VENDOR, replaced=1)
+
+    # One snapshot of the fresh result table, parsed locally
+    print("Getting result table...")
+    return _read_skb_name(table.first.evaluate("el => el.outerHTML"))
+
+
+def _read_skb_name(table_html):
+    """SKB Name of a result table; a table without one is not a no-result answer"""
+    name = skb_name(table_html)
+    if not name:
+        raise SearchFailed("result table has no SKB Name to read")
+    return name
+
+
+# Async twins of the steps above, run by async_engine.py
+
+async def _open_search_form_async(page):
+    await page.goto(SEARCH_URL, wait_until="domcontentloaded")
+    await wait_for_async(page.locator('iframe.Z8YsjS').first, VENDOR, "form")
+    frame = page.frame_locator('iframe.Z8YsjS').first
+    await wait_for_async(frame.locator('section[data-cb-name="cbTable"]'), VENDOR, "form")
+    return frame
+
+
+async def _query_part_async(page, frame, part_number):
+    input_element = frame.locator('input[name="Value2_1"]')
+    button_element = frame.locator('input[name="searchID"]')
+    if await input_element.count() == 0 or await button_element.count() == 0:
+        raise SearchFormUnusable("Value2_1 input or searchID button not found in iframe")
+
+    await mark_stale_async(frame.locator(RESULT_SELECTOR))
+    await input_element.fill(part_number)
+    await button_element.first.click()
+    try:
+        await wait_for_async(frame.locator(fresh(RESULT_SELECTOR)).first, VENDOR, "results")
+    except Exception:
+        raise SearchFormUnusable("neither results table nor 'No records found' message appeared")
+
+    table = frame.locator(fresh('table.cbResultSetTable'))
+    if await table.count() == 0:
+        no_records_text = await frame.locator(fresh('p.cbResultSetRecordMessage')).first.text_content() or ""
+        if NO_RECORDS_TEXT in no_records_text:
+            return None
+        raise SearchFailed(f"no result table to read, only the message '{no_records_text.strip()}'")
+    await settle_async(table.first, VENDOR, replaced=1)
+    return _read_skb_name(await table.first.evaluate("el => el.outerHTML"))
+
+
+register_warm_vendor(VENDOR, _open_search_form)
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def vendor_server():
+    """Base URL of fake_vendor_server.py serving fixtures/ on a free port"""
+    from fake_vendor_server import serve
+
+    server = serve()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+
+
+def fixture_html(*parts):
+    """A saved vendor page from fixtures/"""
+    from fake_vendor_server import FIXTURES_DIR
+
+    with open(os.path.join(FIXTURES_DIR, *parts), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def failing_direct_search():
+    from http_client import DirectSearchFailed
+
+    def direct_search(*args, **kwargs):
+        raise DirectSearchFailed("no result marker")
+    return direct_search
+
+
+@pytest.fixture
+def browser_search():
+    """Stand-in for the browser fallback, recording the parts it was asked for"""
+    def search(part_number, part_variations):
+        search.calls.append(part_number)
+        return "from the browser", part_number
+    search.calls = []
+    return search
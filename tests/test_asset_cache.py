@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+import asset_cache
+from asset_cache import AssetCache, context_options_with_state
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AssetCache(directory=str(tmp_path / "assets"), max_bytes=1000, ttl=3600)
+
+
+@pytest.mark.parametrize("resource_type, headers, lifetime", [
+    ("script", {"cache-control": "public, max-age=600"}, 600),
+    ("script", {}, 3600),
+    ("stylesheet", {"cache-control": "no-cache", "etag": '"abc"'}, 0),
+    ("document", {"last-modified": "Mon, 05 Oct 2026 10:00:00 GMT"}, 0),
+    ("document", {}, None),
+    ("script", {"cache-control": "no-cache"}, None),
+    ("script", {"cache-control": "no-store, max-age=600"}, None),
+])
+def test_freshness(cache, resource_type, headers, lifetime):
+    assert cache.freshness(resource_type, headers) == lifetime
+
+
+def test_stored_asset_is_served_until_it_expires(cache):
+    headers = {"content-type": "text/javascript", "etag": '"v1"', "set-cookie": "id=1"}
+    assert cache.store("https://dataio.com/app.js", "script", headers, b"var a;")
+    kept, fresh, digest = cache.lookup("https://dataio.com/app.js")
+    assert kept == {"content-type": "text/javascript", "etag": '"v1"'}
+    assert fresh
+    assert cache.read("https://dataio.com/app.js", digest) == b"var a;"
+
+    assert cache.store("https://dataio.com/frame.html", "document", {"etag": '"v2"'}, b"<html></html>")
+    assert not cache.lookup("https://dataio.com/frame.html")[1]
+    cache.refresh("https://dataio.com/frame.html", "document", {"cache-control": "max-age=60"})
+    assert cache.lookup("https://dataio.com/frame.html")[1]
+
+
+def test_least_recently_used_bodies_are_evicted(cache):
+    for name in ("a", "b", "c"):
+        assert cache.store(f"https://dataio.com/{name}.js", "script", {}, name.encode() * 100)
+    cache.read("https://dataio.com/a.js", cache.lookup("https://dataio.com/a.js")[2])
+    assert not cache.store("https://dataio.com/big.js", "script", {}, b"x" * 101)
+
+    for index in range(10):
+        cache.store(f"https://dataio.com/{index}.js", "script", {}, bytes([index]) * 100)
+    assert cache.lookup("https://dataio.com/b.js") is None
+    assert cache.stats()["bytes"] <= 1000
+    assert cache.stats()["evictions"] == 3
+    objects = [name for _, _, names in os.walk(os.path.join(cache.directory, "objects")) for name in names]
+    assert len(objects) == cache.stats()["entries"]
+
+
+def test_session_cookies_are_not_shared(tmp_path, monkeypatch):
+    monkeypatch.setattr(asset_cache, "STORAGE_STATE_ENABLED", True)
+    monkeypatch.setattr(asset_cache, "STORAGE_STATE_DIR", str(tmp_path))
+    state = {
+        "cookies": [
+            {"name": "consent", "value": "yes", "expires": 1900000000},
+            {"name": "ASP.NET_SessionId", "value": "s1", "expires": 1900000000},
+            {"name": ".ASPXAUTH", "value": "s2", "expires": 1900000000},
+            {"name": "visitor", "value": "v", "expires": -1},
+        ],
+        "origins": [{"origin": "https://dataio.com", "localStorage": []}],
+    }
+    with open(tmp_path / "dataio.json", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+    options = context_options_with_state("dataio", {"locale": "en-US"})
+    assert options["locale"] == "en-US"
+    assert [cookie["name"] for cookie in options["storage_state"]["cookies"]] == ["consent"]
+    assert options["storage_state"]["origins"] == state["origins"]
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from batch_search import BatchJobs
+from variation_search import SearchFailed
+
+
+def search_found(part_number, cancel_event=None, no_cache=False, meta=None, hints=None):
+    return "SKB-DIP48-28", part_number
+
+
+def search_failed(part_number, cancel_event=None, no_cache=False, meta=None, hints=None):
+    raise SearchFailed(f"'{part_number}' could not be searched: Timeout 30000ms exceeded")
+
+
+def test_failed_search_is_recorded_as_error(tmp_path):
+    jobs = BatchJobs(
+        [("systemgeneral", "System General", search_found), ("dataio", "DataIO", search_failed)],
+        path=str(tmp_path / "batches.sqlite3"),
+    )
+    job_id = jobs.create(["AT28C256-15PU", "W25Q128JVSIQ"], ["systemgeneral", "dataio"])
+    rows = list(jobs.iter_rows(job_id, follow=True, poll_interval=0.05))
+
+    assert len(rows) == 2
+    for row in rows:
+        assert row["results"]["systemgeneral"]["status"] == "found"
+        assert row["results"]["dataio"]["status"] == "error"
+        assert "could not be searched" in row["results"]["dataio"]["error"]
+
+
+def test_unknown_batch_has_no_rows(tmp_path):
+    jobs = BatchJobs([("dataio", "DataIO", search_found)], path=str(tmp_path / "batches.sqlite3"))
+    assert list(jobs.iter_rows("batch_unknown", follow=True)) == []
+
+
+def test_first_hit_keeps_an_answered_miss(tmp_path):
+    started = threading.Event()
+
+    def search_found_once_started(part_number, cancel_event=None, no_cache=False, meta=None, hints=None):
+        started.wait(5)
+        return search_found(part_number)
+
+    def search_missed_late(part_number, cancel_event=None, no_cache=False, meta=None, hints=None):
+        started.set()
+        # The vendor answers "no results" only after the other vendor matched
+        deadline = time.monotonic() + 5
+        while not cancel_event.is_set() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return None
+
+    jobs = BatchJobs(
+        [("systemgeneral", "System General", search_found_once_started),
+         ("dataio", "DataIO", search_missed_late)],
+        path=str(tmp_path / "batches.sqlite3"),
+    )
+    job_id = jobs.create(["AT28C256-15PU"], ["systemgeneral", "dataio"], mode="first_hit")
+    rows = list(jobs.iter_rows(job_id, follow=True, poll_interval=0.05))
+
+    assert rows[0]["results"]["systemgeneral"]["status"] == "found"
+    assert rows[0]["results"]["dataio"]["status"] == "not_found"
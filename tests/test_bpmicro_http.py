@@ -0,0 +1,50 @@
+import pytest
+
+import bpmicro_http
+import bpmicrosearch
+from http_client import DirectSearchFailed
+from variation_search import build_part_variations
+
+
+@pytest.fixture
+def app_url(vendor_server, monkeypatch):
+    url = f"{vendor_server}/bpm-app/"
+    monkeypatch.setattr(bpmicro_http, "APP_URL", url)
+    return url
+
+
+def search(part_number):
+    return bpmicro_http.search_variations(build_part_variations(part_number, vendor="bpmicro"))
+
+
+def test_found(app_url):
+    parameters, part_used = search("AT28C256-15PU")
+    assert part_used == "AT28C256-15PU"
+    assert parameters["Socket Modules"] == "FVE4ASM28DIP6\nSM48D"
+
+
+def test_not_found(app_url):
+    assert search("NOSUCHPART1") is None
+
+
+def test_app_shell_raises(app_url, monkeypatch):
+    # A guessed endpoint answering with the bare app shell must not read as a miss
+    monkeypatch.setattr(bpmicro_http, "SEARCH_ENDPOINT", "")
+    with pytest.raises(DirectSearchFailed):
+        search("AT28C256-15PU")
+
+
+def test_auto_backend_falls_back_to_the_browser(monkeypatch, failing_direct_search, browser_search):
+    monkeypatch.setattr(bpmicrosearch, "BACKEND", "auto")
+    monkeypatch.setattr(bpmicro_http, "search_variations", failing_direct_search)
+    result = bpmicrosearch.search_part_number_in_bpmicro("AT28C256-15PU", browser_search=browser_search, harvest=False)
+    assert result == ("from the browser", "AT28C256-15PU")
+    assert browser_search.calls == ["AT28C256-15PU"]
+
+
+def test_http_backend_does_not_fall_back(monkeypatch, failing_direct_search, browser_search):
+    monkeypatch.setattr(bpmicrosearch, "BACKEND", "http")
+    monkeypatch.setattr(bpmicro_http, "search_variations", failing_direct_search)
+    with pytest.raises(DirectSearchFailed):
+        bpmicrosearch.search_part_number_in_bpmicro("AT28C256-15PU", browser_search=browser_search, harvest=False)
+    assert browser_search.calls == []
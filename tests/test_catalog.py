@@ -0,0 +1,51 @@
+import pytest
+
+import app as web_app
+from catalog import Catalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return Catalog(path=str(tmp_path / "catalog.sqlite3"))
+
+
+def test_imported_list_answers_truncated_variations(catalog):
+    catalog.add([("dataio", "AT28C256-15JU", "PA32-PLCC")], "import")
+    assert catalog.lookup("dataio", "AT28C256-15JU") == ("PA32-PLCC", "AT28C256-15JU")
+    # Like the vendor search, the first variation that prefixes a known device answers
+    assert catalog.lookup("dataio", "AT28C256-15PU") == ("PA32-PLCC", "AT28C256-15")
+    assert catalog.lookup("bpmicro", "AT28C256-15JU") is None
+
+
+def test_crawled_rows_only_answer_the_full_part_number(catalog):
+    catalog.add([("bpmicro", "AT28C256-15PU", "FVE4ASM28DIP6")], "crawl")
+    assert catalog.lookup("bpmicro", "at28c256-15pu ") == ("FVE4ASM28DIP6", "at28c256-15pu")
+    assert catalog.lookup("bpmicro", "AT28C256-15") is None
+
+
+def test_suggest_lists_sockets_per_website(catalog):
+    catalog.add([
+        ("dataio", "W25Q128JVSIQ", "PA8SO-208"),
+        ("bpmicro", "W25Q128JVSIQ", "FVE4ASM8SOIC208"),
+        ("dataio", "W25Q64JVSSIQ", "PA8SO-208"),
+        ("dataio", "AT28C256-15PU", "PA28-DIP-600"),
+    ], "import")
+    suggestions = catalog.suggest("w25q")
+    assert [suggestion["part_number"] for suggestion in suggestions] == ["W25Q128JVSIQ", "W25Q64JVSSIQ"]
+    assert suggestions[0]["sockets"] == {"dataio": "PA8SO-208", "bpmicro": "FVE4ASM8SOIC208"}
+    assert catalog.suggest("w25q", limit=1, vendors={"bpmicro"}) == [
+        {"part_number": "W25Q128JVSIQ", "sockets": {"bpmicro": "FVE4ASM8SOIC208"}}
+    ]
+
+
+def test_api_suggest(catalog, monkeypatch):
+    catalog.add([("dataio", "W25Q128JVSIQ", "PA8SO-208")], "import")
+    monkeypatch.setattr(web_app, "get_catalog", lambda: catalog)
+    client = web_app.app.test_client()
+
+    response = client.get("/api/suggest?q=W25Q1")
+    assert response.get_json() == {
+        "suggestions": [{"part_number": "W25Q128JVSIQ", "sockets": {"dataio": "PA8SO-208"}}]
+    }
+    assert client.get("/api/suggest?q=W").get_json() == {"suggestions": []}
+    assert client.get("/api/suggest?q=W25&limit=x").status_code == 400
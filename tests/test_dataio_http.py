@@ -0,0 +1,40 @@
+import pytest
+
+import dataio_http
+import dataiosearch
+from conftest import fixture_html
+from http_client import DirectSearchFailed
+from variation_search import build_part_variations
+
+
+@pytest.fixture
+def search_url(vendor_server, monkeypatch):
+    url = f"{vendor_server}/Support/Device-Search"
+    monkeypatch.setattr(dataio_http, "SEARCH_URL", url)
+    return url
+
+
+def search(part_number):
+    return dataio_http.search_variations(build_part_variations(part_number, vendor="dataio"))
+
+
+def test_found(search_url):
+    assert search("AT28C256-15PU") == ("DIP-28 ZIF Socket 600 mil (PA28-DIP-600)", "AT28C256-15")
+
+
+def test_not_found(search_url):
+    assert search("NOSUCHPART1") is None
+
+
+def test_page_without_an_answer_raises(search_url):
+    # The search form itself lists no results and says nothing about them
+    with pytest.raises(DirectSearchFailed):
+        dataio_http._open_first_result(fixture_html("dataio", "device_search.html"), search_url)
+
+
+def test_auto_backend_falls_back_to_the_browser(monkeypatch, failing_direct_search, browser_search):
+    monkeypatch.setattr(dataiosearch, "BACKEND", "auto")
+    monkeypatch.setattr(dataio_http, "search_variations", failing_direct_search)
+    result = dataiosearch.search_part_number_in_dataio("AT28C256-15PU", browser_search=browser_search, harvest=False)
+    assert result == ("from the browser", "AT28C256-15PU")
+    assert browser_search.calls == ["AT28C256-15PU"]
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from extraction import run_rule
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+
+def fixture(*parts):
+    with open(os.path.join(FIXTURES_DIR, *parts), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("part_number", [None, "AT28C256-15PU"])
+def test_skb_name(part_number):
+    assert run_rule("skb_name", fixture("systemgeneral", "results", "AT28C256-15P.html"), part_number) == "SKB-DIP48-28"
+
+
+@pytest.mark.parametrize("part_number", [None, "AT28C256-15PU"])
+def test_standard_adapter(part_number):
+    html = fixture("dataio", "devices", "41873.html")
+    assert run_rule("standard_adapter", html, part_number) == "DIP-28 ZIF Socket 600 mil (PA28-DIP-600)"
+
+
+def test_device_socket():
+    html = fixture("bpmicro", "devices", "70231.html")
+    assert run_rule("device_socket", html, "AT28C256-15PU") == "FVE4ASM28DIP6, SM48D"
+
+
+def test_product_page_socket():
+    html = fixture("bpmicro", "devices", "88412.html")
+    assert run_rule("product_page_socket", html, "W25Q128JVSIQ") == "FVE4ASM8SOIC208"
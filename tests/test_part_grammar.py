@@ -0,0 +1,38 @@
+import pytest
+
+from part_grammar import generate_variations
+
+
+@pytest.mark.parametrize("part_number, variations", [
+    ("GD32F330CBT6", ["GD32F330CBT6", "GD32F330CBT", "GD32F330CB", "GD32F330"]),
+    ("STM32F103C8T6TR", ["STM32F103C8T6", "STM32F103C8T", "STM32F103C8", "STM32F103"]),
+    ("AT28C256-15PU", ["AT28C256-15PU", "AT28C256-15P", "AT28C256-15", "AT28C256"]),
+])
+def test_package_stems_fit_the_default_probe_limit(part_number, variations):
+    assert generate_variations(part_number, 4) == variations
+
+
+@pytest.mark.parametrize("part_number, variations", [
+    ("GD32F330CBT6", ["GD32F330CBT6", "GD32F330CBT", "GD32F330CB", "GD32F330", "GD32F33", "GD32F3"]),
+    ("STM32F103C8T6TR", [
+        "STM32F103C8T6", "STM32F103C8T", "STM32F103C8", "STM32F103", "STM32F10", "STM32F1",
+    ]),
+    ("AT28C256-15PU", ["AT28C256-15PU", "AT28C256-15P", "AT28C256-15", "AT28C256", "AT28C25", "AT28C2"]),
+    ("W25Q128JVSIQ", ["W25Q128JVSIQ", "W25Q128JVS", "W25Q128JV", "W25Q128J", "W25Q128", "W25Q12"]),
+    ("MX25L12835FM2I-10G", [
+        "MX25L12835FM2I-10G", "MX25L12835FM2", "MX25L12835F", "MX25L12835", "MX25L1283", "MX25L128",
+    ]),
+])
+def test_truncations_stay_below_the_family_stems(part_number, variations):
+    assert generate_variations(part_number, 6) == variations
+
+
+def test_truncations_drop_trailing_separators():
+    assert generate_variations("XC9572-7PC44", 6) == [
+        "XC9572-7PC44", "XC9572-7PC4", "XC9572-7PC", "XC9572-7P", "XC9572-7", "XC9572",
+    ]
+
+
+def test_spellings_of_one_device_are_tried_once():
+    assert generate_variations("stm32f103c8t6-tr", 2) == ["STM32F103C8T6", "STM32F103C8T"]
+    assert generate_variations("at28c256-15pu", 2) == ["at28c256-15pu", "AT28C256-15P"]
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+
+import request_filter
+from request_filter import RequestFilter, vendor_profile
+
+
+def fake_request(resource_type, url, frame_url="https://dataio.com/Support/Device-Search"):
+    return SimpleNamespace(resource_type=resource_type, url=url, frame=SimpleNamespace(url=frame_url))
+
+
+@pytest.fixture
+def dataio_filter(monkeypatch):
+    monkeypatch.setattr(request_filter, "REQUEST_FILTER", True)
+    monkeypatch.setattr(request_filter, "REQUEST_BLOCK_THIRD_PARTY", True)
+    monkeypatch.delenv("REQUEST_BLOCK_TYPES_DATAIO", raising=False)
+    monkeypatch.delenv("REQUEST_ALLOW_HOSTS_DATAIO", raising=False)
+    return RequestFilter("dataio", vendor_profile("dataio"))
+
+
+@pytest.mark.parametrize("resource_type, url", [
+    ("script", "https://dataio.com/Resources/Shared/scripts/jquery/jquery.min.js"),
+    ("xhr", "https://www.dataio.com/DesktopModules/search"),
+    ("script", "https://ajax.aspnetcdn.com/ajax/4.6/1/MicrosoftAjax.js"),
+    ("script", "https://code.jquery.com/jquery-3.6.0.min.js"),
+    ("script", "https://cdnjs.cloudflare.com/ajax/libs/jquery/3.6.0/jquery.min.js"),
+    ("document", "https://www.googletagmanager.com/ns.html"),
+])
+def test_vendor_hosts_and_library_cdns_load(dataio_filter, resource_type, url):
+    assert not dataio_filter.should_block(fake_request(resource_type, url))
+
+
+@pytest.mark.parametrize("resource_type, url", [
+    ("image", "https://dataio.com/Portals/0/logo.png"),
+    ("font", "https://dataio.com/Portals/0/fonts/site.woff2"),
+    ("stylesheet", "https://dataio.com/Portals/0/skin.css"),
+    ("script", "https://www.googletagmanager.com/gtag/js"),
+    ("script", "https://notajax.googleapis.com.example.net/lib.js"),
+])
+def test_media_and_third_party_hosts_are_blocked(dataio_filter, resource_type, url):
+    assert dataio_filter.should_block(fake_request(resource_type, url))
+
+
+def test_embedded_app_keeps_its_own_host(monkeypatch):
+    monkeypatch.setattr(request_filter, "REQUEST_FILTER", True)
+    monkeypatch.setattr(request_filter, "REQUEST_BLOCK_THIRD_PARTY", True)
+    bpmicro_filter = RequestFilter("bpmicro", vendor_profile("bpmicro"))
+    app_frame = "https://search.example-app.net/bpm/"
+    assert not bpmicro_filter.should_block(fake_request("script", "https://search.example-app.net/app.js", app_frame))
+    assert bpmicro_filter.should_block(fake_request("script", "https://tracker.example.org/t.js", app_frame))
+
+
+def test_environment_overrides_the_profile(dataio_filter, monkeypatch):
+    monkeypatch.setenv("REQUEST_BLOCK_TYPES_DATAIO", "image")
+    monkeypatch.setenv("REQUEST_ALLOW_HOSTS_DATAIO", "cdn.example.com")
+    overridden = RequestFilter("dataio", vendor_profile("dataio"))
+    assert not overridden.should_block(fake_request("stylesheet", "https://dataio.com/Portals/0/skin.css"))
+    assert not overridden.should_block(fake_request("script", "https://cdn.example.com/lib.js"))
+    monkeypatch.setattr(request_filter, "REQUEST_FILTER", False)
+    assert vendor_profile("dataio") is None
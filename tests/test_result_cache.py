@@ -0,0 +1,104 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache, cached_search
+from variation_search import SearchFailed, search_variations_in_page
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResultCache(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(result_cache, "_cache", cache)
+    return cache
+
+
+def lookup_rows(cache):
+    with sqlite3.connect(cache.path) as db:
+        return db.execute("SELECT vendor, part FROM lookups").fetchall()
+
+
+def page_search(open_form, query_part):
+    """A vendor search running the variation loop on a fake page"""
+    page = SimpleNamespace(context=object())
+
+    def search(original_part_number, cancel_event=None, part_variations=None, meta=None):
+        return search_variations_in_page(page, part_variations, open_form, query_part, cancel_event=cancel_event)
+    return search
+
+
+def test_timed_out_search_leaves_no_cache_row(cache):
+    def open_form(page):
+        raise TimeoutError("Timeout 30000ms exceeded waiting for the search form")
+
+    search = page_search(open_form, lambda page, form, part_number: None)
+    with pytest.raises(SearchFailed):
+        cached_search("dataio", "AT28C256-15PU", search)
+    assert lookup_rows(cache) == []
+
+
+def test_explicit_no_result_is_cached(cache):
+    search = page_search(lambda page: "form", lambda page, form, part_number: None)
+    assert cached_search("dataio", "AT28C256-15PU", search) is None
+    assert lookup_rows(cache)
+
+
+def test_plan_skips_only_definitive_misses(cache):
+    cache.store("dataio", ["AT28C256-15PU", "AT28C256-15"], None)
+    with sqlite3.connect(cache.path) as db:
+        db.execute("UPDATE lookups SET definitive = 0 WHERE part = ?", (result_cache.cache_key("AT28C256-15"),))
+
+    to_probe, known_hit, known_misses = cache.plan("dataio", ["AT28C256-15PU", "AT28C256-15", "AT28C256"])
+    assert to_probe == ["AT28C256-15", "AT28C256"]
+    assert known_hit is None
+    assert known_misses == ["AT28C256-15PU"]
+    assert cache.lookup("dataio", ["AT28C256-15PU", "AT28C256-15"])[0] is False
+
+
+def test_old_cache_file_gets_the_new_columns(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "CREATE TABLE lookups (vendor TEXT NOT NULL, part TEXT NOT NULL, found INTEGER NOT NULL, "
+            "result TEXT, created REAL NOT NULL, expires REAL NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (vendor, part))"
+        )
+        db.execute("INSERT INTO lookups VALUES ('dataio', 'AT28C256', 0, NULL, 0, 1e12, 0)")
+
+    cache = ResultCache(path=path)
+    assert cache.get("dataio", "AT28C256") == (False, None, 1e12, False, None)
+    assert cache.plan("dataio", ["AT28C256"]) == (["AT28C256"], None, [])
+    cache.store("dataio", ["AT28C256-15"], ({"Adapter": "PA28-DIP"}, "AT28C256-15"))
+    assert cache.lookup("dataio", ["AT28C256-15"])[1] == ({"Adapter": "PA28-DIP"}, "AT28C256-15")
+
+
+def test_harvest_stores_only_the_variations_it_searched(cache):
+    def harvest(original_part_number, cancel_event=None, part_variations=None, meta=None):
+        # One query for the shortest variation, matched on a shorter listed device
+        meta["probed"] = ["AT28C256-15"]
+        return {"Adapter": "PA28-DIP"}, "AT28C256-15"
+
+    assert cached_search("dataio", "AT28C256-15PU", harvest) == ({"Adapter": "PA28-DIP"}, "AT28C256-15")
+    assert lookup_rows(cache) == [("dataio", result_cache.cache_key("AT28C256-15"))]
+
+
+def test_part_used_is_what_the_vendor_matched(cache, monkeypatch):
+    # Keep the packaging suffix as its own variation, as with PART_KEY_STRIP_PACKAGING=0
+    monkeypatch.setattr(result_cache, "build_part_variations", lambda part_number, vendor=None: [
+        part_number.upper(), "STM32F103C8T6", "STM32F103C8",
+    ])
+    calls = []
+
+    def search(original_part_number, cancel_event=None, part_variations=None, meta=None):
+        calls.append(original_part_number)
+        return {"Adapter": "PA48-QFP"}, "STM32F103C8T6"
+
+    expected = ({"Adapter": "PA48-QFP"}, "STM32F103C8T6")
+    assert cached_search("dataio", "STM32F103C8T6TR", search) == expected
+    assert cached_search("dataio", "STM32F103C8T6TR", search) == expected
+    assert cached_search("dataio", "stm32f103c8t6tr", search) == expected
+    assert cached_search("dataio", "stm32f103c8t6", search) == ({"Adapter": "PA48-QFP"}, "STM32F103C8T6")
+    assert calls == ["STM32F103C8T6TR"]
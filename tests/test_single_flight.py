@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+CALLERS = 8
+
+
+def run_concurrently(flights, fn):
+    """Outcome (result or exception) of CALLERS identical concurrent calls"""
+    outcomes = [None] * CALLERS
+
+    def call(i):
+        try:
+            outcomes[i] = flights.run(("dataio", "AT28C256"), fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return outcomes
+
+
+def held_until_all_attached(flights, outcome):
+    """A scrape that only finishes once every caller attached to it"""
+    calls = []
+
+    def fn(cancel_event):
+        calls.append(1)
+        deadline = time.monotonic() + 5
+        while flights.stats()["attached"] < CALLERS and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return fn, calls
+
+
+def test_identical_calls_run_once_and_share_the_result():
+    flights = SingleFlight()
+    fn, calls = held_until_all_attached(flights, ("PA28-DIP-600", "AT28C256"))
+
+    outcomes = run_concurrently(flights, fn)
+    assert len(calls) == 1
+    assert outcomes == [("PA28-DIP-600", "AT28C256")] * CALLERS
+    assert flights.stats()["coalesced"] == CALLERS - 1
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_an_exception_reaches_every_waiter():
+    flights = SingleFlight()
+    error = RuntimeError("Timeout 30000ms exceeded")
+    fn, calls = held_until_all_attached(flights, error)
+
+    outcomes = run_concurrently(flights, fn)
+    assert len(calls) == 1
+    assert all(outcome is error for outcome in outcomes)
+
+
+def test_a_later_call_runs_again():
+    flights = SingleFlight()
+    assert flights.run("key", lambda cancel_event: 1) == 1
+    assert flights.run("key", lambda cancel_event: 2) == 2
+    with pytest.raises(KeyError):
+        flights.run("key", lambda cancel_event: {}["missing"])
@@ -0,0 +1,42 @@
+import pytest
+
+import systemgeneral_http
+import systemgeneralsearch
+from conftest import fixture_html
+from fake_vendor_server import CASPIO_APP_KEY
+from http_client import DirectSearchFailed
+from variation_search import build_part_variations
+
+
+@pytest.fixture
+def page_url(vendor_server, monkeypatch):
+    monkeypatch.setattr(systemgeneral_http, "CASPIO_URL", f"{vendor_server}/dp/{CASPIO_APP_KEY}")
+    return f"{vendor_server}/systemgeneral/device-search"
+
+
+def search(part_number, page_url):
+    return systemgeneral_http.search_variations(build_part_variations(part_number, vendor="systemgeneral"), page_url)
+
+
+def test_found(page_url):
+    assert search("AT28C256-15PU", page_url) == ("SKB-DIP48-28", "AT28C256-15P")
+
+
+def test_not_found(page_url):
+    assert search("NOSUCHPART1", page_url) is None
+
+
+def test_page_without_an_answer_raises():
+    # The bare DataPage form has neither a result table nor "No records found"
+    with pytest.raises(DirectSearchFailed):
+        systemgeneral_http.parse_results(fixture_html("systemgeneral", "caspio_form.html"))
+
+
+def test_auto_backend_falls_back_to_the_browser(monkeypatch, failing_direct_search, browser_search):
+    monkeypatch.setattr(systemgeneralsearch, "BACKEND", "auto")
+    monkeypatch.setattr(systemgeneral_http, "search_variations", failing_direct_search)
+    result = systemgeneralsearch.search_part_number_in_system_general_limited(
+        "AT28C256-15PU", browser_search=browser_search, harvest=False
+    )
+    assert result == ("from the browser", "AT28C256-15PU")
+    assert browser_search.calls == ["AT28C256-15PU"]
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from variation_search import HintedVariations, VariationHints, probe_order, search_variations_in_page
+
+
+VARIATIONS = ["GD32F330CBT6", "GD32F330CBT", "GD32F330CB", "GD32F330"]
+
+
+def test_hints_skip_the_full_part_number_and_list_the_latest_first():
+    hints = VariationHints()
+    hints.publish("dataio", "GD32F330CBT6", "gd32f330cbt6")
+    hints.publish("dataio", "GD32F330CBT6", "GD32F330CB")
+    hints.publish("bpmicro", "GD32F330CBT6", "GD32F330")
+    assert hints.snapshot() == [("bpmicro", "GD32F330"), ("dataio", "GD32F330CB")]
+
+
+def test_probe_order_without_hints_keeps_the_ranking():
+    assert list(probe_order(VARIATIONS)) == VARIATIONS
+
+
+def test_hinted_variation_comes_right_after_the_full_part_number():
+    hints = VariationHints()
+    hints.publish("dataio", "GD32F330CBT6", "gd32f330cb")
+    variations = HintedVariations(VARIATIONS, hints)
+
+    assert list(probe_order(variations)) == ["GD32F330CBT6", "GD32F330CB", "GD32F330CBT", "GD32F330"]
+    assert variations.probed == ["GD32F330CBT6", "GD32F330CB", "GD32F330CBT", "GD32F330"]
+    assert variations.hinted_by == "dataio"
+    assert variations.probes_saved("GD32F330CB") == 1
+    assert variations.probes_saved("GD32F330CBT6") == 0
+
+
+def test_hint_published_during_the_search_is_used_for_the_next_probe():
+    hints = VariationHints()
+    variations = HintedVariations(VARIATIONS, hints)
+    probed = []
+
+    def query_part(page, form, part_number):
+        probed.append(part_number)
+        if part_number == "GD32F330CBT6":
+            # Another vendor matches while this one is still on the full part number
+            hints.publish("bpmicro", "GD32F330CBT6", "GD32F330")
+        return {"Adapter": "PA48-QFP"} if part_number == "GD32F330" else None
+
+    page = SimpleNamespace(context=object())
+    result = search_variations_in_page(page, variations, lambda page: "form", query_part)
+
+    assert result == ({"Adapter": "PA48-QFP"}, "GD32F330")
+    assert probed == ["GD32F330CBT6", "GD32F330"]
+    assert variations.hinted_by == "bpmicro"
+    assert variations.probes_saved("GD32F330") == 2
@@ -1,9 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
-from systemgeneralsearch import search_part_number_in_system_general_limited
-from dataiosearch import search_part_number_in_dataio
-from bpmicrosearch import search_part_number_in_bpmicro
+# Routed through web_search_functions so SEARCH_ENGINE=async also applies here
+from web_search_functions import (
+    search_part_number_in_system_general_limited,
+    search_part_number_in_dataio,
+    search_part_number_in_bpmicro
+)
+from part_normalize import clean_part_number
+from variation_search import VariationHints
 
 
 class DeviceSearchUI:
@@ -100,7 +105,7 @@ class DeviceSearchUI:
         
     def start_search(self):
         """Start the search in a separate thread to prevent UI freezing"""
-        part_number = self.search_var.get().strip()
+        part_number = clean_part_number(self.search_var.get())
         
         if not part_number:
             messagebox.showerror("Error", "Please enter a part number")
@@ -130,12 +135,15 @@ class DeviceSearchUI:
             self.append_result("=" * 60 + "\n\n")
             
             results_found = False
+            # Variations that matched at one website are tried early by the next
+            hints = VariationHints()
             
             # Search System General if selected
             if self.system_general_var.get():
                 self.append_result("🔍 Searching System General...\n")
                 try:
-                    result = search_part_number_in_system_general_limited(part_number)
+                    meta = {}
+                    result = search_part_number_in_system_general_limited(part_number, meta=meta, hints=hints)
                     if result:
                         socket_info, actual_part = result
                         self.append_result(f"✅ System General: FOUND\n")
@@ -143,6 +151,8 @@ class DeviceSearchUI:
                         self.append_result(f"   Part Number Used: {actual_part}\n")
                         if actual_part != part_number:
                             self.append_result(f"   ⚠️  Original part number modified (removed {len(part_number) - len(actual_part)} characters)\n")
+                        if meta.get('probes_saved'):
+                            self.append_result(f"   💡 Hint from {meta['hinted_by']} saved {meta['probes_saved']} probe(s)\n")
                         self.append_result("\n")
                         results_found = True
                     else:
@@ -154,7 +164,8 @@ class DeviceSearchUI:
             if self.dataio_var.get():
                 self.append_result("🔍 Searching DataIO...\n")
                 try:
-                    result = search_part_number_in_dataio(part_number)
+                    meta = {}
+                    result = search_part_number_in_dataio(part_number, meta=meta, hints=hints)
                     if result:
                         socket_info, actual_part = result
                         self.append_result(f"✅ DataIO: FOUND\n")
@@ -162,6 +173,8 @@ class DeviceSearchUI:
                         self.append_result(f"   Part Number Used: {actual_part}\n")
                         if actual_part != part_number:
                             self.append_result(f"   ⚠️  Original part number modified (removed {len(part_number) - len(actual_part)} characters)\n")
+                        if meta.get('probes_saved'):
+                            self.append_result(f"   💡 Hint from {meta['hinted_by']} saved {meta['probes_saved']} probe(s)\n")
                         self.append_result("\n")
                         results_found = True
                     else:
@@ -173,7 +186,8 @@ class DeviceSearchUI:
             if self.bpmicro_var.get():
                 self.append_result("🔍 Searching BPMicro...\n")
                 try:
-                    result = search_part_number_in_bpmicro(part_number)
+                    meta = {}
+                    result = search_part_number_in_bpmicro(part_number, meta=meta, hints=hints)
                     if result:
                         socket_info, actual_part = result
                         self.append_result(f"✅ BPMicro: FOUND\n")
@@ -181,6 +195,8 @@ class DeviceSearchUI:
                         self.append_result(f"   Part Number Used: {actual_part}\n")
                         if actual_part != part_number:
                             self.append_result(f"   ⚠️  Original part number modified (removed {len(part_number) - len(actual_part)} characters)\n")
+                        if meta.get('probes_saved'):
+                            self.append_result(f"   💡 Hint from {meta['hinted_by']} saved {meta['probes_saved']} probe(s)\n")
                         self.append_result("\n")
                         results_found = True
                     else:
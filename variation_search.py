@@ -0,0 +1,356 @@
+"""Shared part-number variation loop used by the vendor search modules.
+
+The vendor search form is loaded once per session and every truncated
+variation is typed into the same page. A full reload only happens when the
+vendor query reports that the page is no longer usable.
+
+With PARALLEL_VARIATIONS=1 (or parallel=True) the variations are instead
+probed concurrently on separate pooled pages. The highest ranked matching
+variation still wins, and probes for lower ranked variations are cancelled
+once a higher ranked one has matched.
+
+During a multi-vendor search, VariationHints shares the variations that
+matched at one vendor. The loops iterate probe_order(part_variations), which
+tries a hinted variation right after the full part number, even when the
+hint arrives while the vendor is already probing.
+
+With HARVEST=1 (or harvest=True) the direct backends instead search once for
+the shortest variation and rank every candidate it lists locally with
+rank_candidates(). The candidates that lose are reported as alternates.
+"""
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from asset_cache import navigation_timer
+from browser_pool import get_browser_pool
+from extraction import STALE_ATTRIBUTE
+from part_grammar import generate_variations, max_probes
+from part_normalize import compact_part_number, part_key
+
+
+PARALLEL_VARIATIONS = os.environ.get("PARALLEL_VARIATIONS", "").lower() in ("1", "true", "yes")
+PARALLEL_PROBES_DEFAULT = int(os.environ.get("PARALLEL_PROBES", "2"))
+HARVEST = os.environ.get("HARVEST", "").lower() in ("1", "true", "yes")
+HARVEST_ALTERNATES = int(os.environ.get("HARVEST_ALTERNATES", "5"))
+
+
+class SearchFormUnusable(Exception):
+    """Raised by a vendor query when the page can no longer take a search"""
+
+
+class SearchCancelled(Exception):
+    """Raised when a probe is no longer needed"""
+
+
+class SearchFailed(Exception):
+    """Raised when a variation could not be searched, so whether it matches is unknown
+
+    Only an explicit no-result answer from the vendor makes a query return
+    None. Anything else raises, and nothing is cached for the search.
+    """
+
+
+def build_part_variations(original_part_number, max_attempts=None, vendor=None):
+    """Return the part number followed by its ranked variations (part_grammar.py)
+
+    At most max_attempts part numbers are returned, by default the probe
+    limit of vendor.
+    """
+    return generate_variations(original_part_number, max_attempts or max_probes(vendor))
+
+
+class VariationHints:
+    """Variations that matched at some vendor during one multi-vendor search"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hints = []
+
+    def publish(self, vendor, original_part_number, part_used):
+        """Share part_used, unless it is the full part number (nothing to skip then)"""
+        if part_key(part_used) == part_key(original_part_number):
+            return
+        with self._lock:
+            self._hints.append((vendor, part_used))
+        print(f"Hint from {vendor}: '{part_used}' matched")
+
+    def snapshot(self):
+        """[(vendor, part_used)], most recent first"""
+        with self._lock:
+            return list(reversed(self._hints))
+
+
+class HintedVariations(list):
+    """part_variations that probe_order() reorders by hints
+
+    probed records the order the last probe_order() pass tried them in.
+    """
+
+    def __init__(self, part_variations, hints):
+        super().__init__(part_variations)
+        self.hints = hints
+        self.probed = []
+        self.hinted_by = None
+
+    def probes_saved(self, part_used):
+        """Probes skipped by trying part_used early"""
+        if part_used not in self or part_used not in self.probed:
+            return 0
+        return max(0, self.index(part_used) - self.probed.index(part_used))
+
+
+def probe_order(part_variations):
+    """Iterate part_variations, trying hinted ones right after the full part number"""
+    hints = getattr(part_variations, "hints", None)
+    if hints is None:
+        yield from part_variations
+        return
+    part_variations.probed = []
+    remaining = list(part_variations)
+    while remaining:
+        part_number = remaining[0]
+        # The full part number always goes first, the hints are checked before every later probe
+        if part_variations.probed:
+            for vendor, hinted in hints.snapshot():
+                match = next((p for p in remaining if part_key(p) == part_key(hinted)), None)
+                if match is not None:
+                    if match != part_number:
+                        print(f"Trying '{match}' next, it matched at {vendor}")
+                        part_variations.hinted_by = vendor
+                    part_number = match
+                    break
+        remaining.remove(part_number)
+        part_variations.probed.append(part_number)
+        yield part_number
+
+
+def mark_stale(locator):
+    """Tag the currently rendered elements so fresh results can be told apart"""
+    try:
+        locator.evaluate_all(
+            f"els => els.forEach(el => el.setAttribute('{STALE_ATTRIBUTE}', '1'))"
+        )
+    except Exception:
+        pass
+
+
+async def mark_stale_async(locator):
+    try:
+        await locator.evaluate_all(
+            f"els => els.forEach(el => el.setAttribute('{STALE_ATTRIBUTE}', '1'))"
+        )
+    except Exception:
+        pass
+
+
+def fresh(selector):
+    """Selector matching only elements rendered after the last mark_stale call"""
+    return ", ".join(
+        f"{part.strip()}:not([{STALE_ATTRIBUTE}])" for part in selector.split(",")
+    )
+
+
+def search_variations_in_page(page, part_variations, open_form, query_part, form=None,
+                              cancel_event=None):
+    """Try each variation on one page and return (result, part_number) or None.
+
+    open_form(page) loads the vendor search form and returns a handle to it.
+    query_part(page, form, part_number) runs one search in place and returns
+    the result, or None only when the vendor explicitly answered that
+    nothing matched, raising otherwise. Pass form when the page is already
+    parked on the search form. Setting cancel_event raises SearchCancelled
+    before the next step. A variation that still fails after reloading the
+    form raises SearchFailed instead of counting as a miss.
+    """
+    for i, part_number in enumerate(probe_order(part_variations)):
+        print(f"\n--- Attempt {i+1}: Trying part number '{part_number}' ---")
+
+        result = None
+        error = None
+        for reload_attempt in range(2):
+            if cancel_event is not None and cancel_event.is_set():
+                raise SearchCancelled(part_number)
+            try:
+                if form is None:
+                    print("Loading vendor search form...")
+                    with navigation_timer(page):
+                        form = open_form(page)
+                result = query_part(page, form, part_number)
+                break
+            except SearchFormUnusable as e:
+                print(f"Search page unusable ({e}), reloading search form...")
+                form, error = None, e
+            except Exception as e:
+                print(f"Error searching for part number '{part_number}': {e}")
+                form, error = None, e
+        else:
+            print(f"Giving up on part number '{part_number}' after reloading")
+            raise SearchFailed(f"'{part_number}' could not be searched: {error}") from error
+
+        if result:
+            print(f"SUCCESS! Found result for part number '{part_number}': {result}")
+            return (result, part_number)
+        print(f"No results found for part number '{part_number}'")
+
+    return None
+
+
+async def search_variations_in_page_async(page, part_variations, open_form, query_part, form=None):
+    """Async twin of search_variations_in_page, cancelled by cancelling its task"""
+    for i, part_number in enumerate(probe_order(part_variations)):
+        print(f"\n--- Attempt {i+1}: Trying part number '{part_number}' ---")
+
+        result = None
+        error = None
+        for reload_attempt in range(2):
+            try:
+                if form is None:
+                    print("Loading vendor search form...")
+                    with navigation_timer(page):
+                        form = await open_form(page)
+                result = await query_part(page, form, part_number)
+                break
+            except SearchFormUnusable as e:
+                print(f"Search page unusable ({e}), reloading search form...")
+                form, error = None, e
+            except Exception as e:
+                print(f"Error searching for part number '{part_number}': {e}")
+                form, error = None, e
+        else:
+            print(f"Giving up on part number '{part_number}' after reloading")
+            raise SearchFailed(f"'{part_number}' could not be searched: {error}") from error
+
+        if result:
+            print(f"SUCCESS! Found result for part number '{part_number}': {result}")
+            return (result, part_number)
+        print(f"No results found for part number '{part_number}'")
+
+    return None
+
+
+def use_parallel_variations(parallel=None):
+    return PARALLEL_VARIATIONS if parallel is None else parallel
+
+
+def use_harvest(harvest=None):
+    return HARVEST if harvest is None else harvest
+
+
+def harvested_variations(result, part_variations):
+    """The variations a harvest's answer covers: the one it matched, else the shortest it searched
+
+    The longer variations were never sent to the vendor, so the result
+    cache must not store them as misses.
+    """
+    return [result[1]] if result else [min(part_variations, key=len)]
+
+
+def _common_prefix_length(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def rank_candidates(original_part_number, part_variations, candidate_parts):
+    """Rank one query's candidates as [(index, part_used)], best first
+
+    candidate_parts are the part numbers the vendor listed, in its order. A
+    candidate counts when it starts with one of part_variations, and
+    part_used is the first such variation, i.e. the one whose search would
+    have listed it. Candidates sharing a longer prefix with the original part
+    number rank first, then an exact match, then fewer extra characters,
+    then the vendor's own order.
+    """
+    original = compact_part_number(original_part_number)
+    variations = [compact_part_number(part_number) for part_number in part_variations]
+    ranked = []
+    for index, candidate in enumerate(candidate_parts):
+        candidate = compact_part_number(candidate)
+        part_used = None
+        for part_number, variation in zip(part_variations, variations):
+            if variation and candidate.startswith(variation):
+                part_used = part_number
+                break
+        if part_used is None:
+            continue
+        common = _common_prefix_length(candidate, original)
+        ranked.append(((-common, candidate != original, len(candidate) - common, index), index, part_used))
+    ranked.sort()
+    return [(index, part_used) for _, index, part_used in ranked]
+
+
+def parallel_probe_limit(vendor):
+    """Concurrent probes allowed per vendor (PARALLEL_PROBES_<VENDOR>)"""
+    return max(1, int(os.environ.get(f"PARALLEL_PROBES_{vendor.upper()}", PARALLEL_PROBES_DEFAULT)))
+
+
+def search_variations_in_parallel(vendor, part_variations, search_on_page, *args, max_parallel=None,
+                                  cancel_event=None):
+    """Probe every variation concurrently and return the longest match.
+
+    search_on_page(page, form, [part_number], *args, cancel_event=...) runs one
+    probe on a warm page of vendor. The result is the same as trying the
+    variations in order: the first variation that matches, once every
+    variation before it has missed. A probe that fails before the answer is
+    decided raises SearchFailed. Setting cancel_event stops every probe.
+    """
+    pool = get_browser_pool()
+    limit = max_parallel or parallel_probe_limit(vendor)
+    cancel_events = [threading.Event() for _ in part_variations]
+    futures = {}
+    outcomes = {}
+    last_needed = len(part_variations) - 1
+    next_index = 0
+
+    print(f"Probing {len(part_variations)} variations in parallel (up to {limit} at a time)")
+    try:
+        while True:
+            # Earliest decided prefix of the priority order gives the answer
+            for i in range(last_needed + 1):
+                if i not in outcomes:
+                    break
+                if isinstance(outcomes[i], Exception):
+                    raise SearchFailed(f"'{part_variations[i]}' could not be searched: {outcomes[i]}") from outcomes[i]
+                if outcomes[i]:
+                    print(f"SUCCESS! Found result for part number '{part_variations[i]}': {outcomes[i]}")
+                    return (outcomes[i], part_variations[i])
+            else:
+                return None
+
+            while len(futures) < limit and next_index <= last_needed:
+                future = pool.submit_warm(
+                    vendor, search_on_page, [part_variations[next_index]], *args,
+                    cancel_event=cancel_events[next_index],
+                )
+                futures[future] = next_index
+                next_index += 1
+
+            done, _ = wait(list(futures), timeout=0.2, return_when=FIRST_COMPLETED)
+            if cancel_event is not None and cancel_event.is_set():
+                raise SearchCancelled(part_variations[0])
+            for future in done:
+                i = futures.pop(future)
+                try:
+                    found = future.result()
+                except Exception as e:
+                    print(f"Probe for '{part_variations[i]}' failed: {e}")
+                    outcomes[i] = e
+                    continue
+                outcomes[i] = found[0] if found else None
+                if outcomes[i] and i < last_needed:
+                    # Shorter variations can no longer win
+                    print(f"'{part_variations[i]}' matched, cancelling shorter variations")
+                    last_needed = i
+                    for other, j in list(futures.items()):
+                        if j > i:
+                            cancel_events[j].set()
+                            other.cancel()
+    finally:
+        for event in cancel_events:
+            event.set()
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,238 @@
+"""Event-driven waits for the Playwright vendor flows.
+
+The browser flows used to pause for fixed times after typing, clicking or
+navigating, just in case the vendor page was still busy. Each wait here
+returns as soon as a concrete signal arrives instead:
+
+- wait_for(): a selector reached a state (visible, attached, ...)
+- expect_response() / expect_navigation(): the network response or
+  navigation an action triggers
+- wait_for_change(): an element's text, e.g. a result count, changed
+- settle(): no DOM mutations under an element for WAIT_QUIET_MS
+- wait_until(): a cheap condition (URL changed, rows rendered) became true
+
+Every wait belongs to a stage with its own timeout (WAIT_TIMEOUT_<STAGE> in
+milliseconds overrides STAGE_TIMEOUTS). How long each wait actually took is
+recorded next to the fixed sleep it replaced and reported as 'waits' in
+/api/stats. The *_async functions are the twins used by async_engine.py.
+"""
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from request_filter import record_form_wait
+
+
+STAGE_TIMEOUTS = {
+    "form": 30000,        # search form or iframe loading
+    "results": 15000,     # results or a "no results" message after searching
+    "update": 5000,       # results re-rendering after typing
+    "navigation": 15000,  # opening a result
+    "render": 3000,       # content settling before it is read
+}
+WAIT_QUIET_MS = int(os.environ.get("WAIT_QUIET_MS", "150"))
+WAIT_POLL_INTERVAL = 0.05
+
+# Resolves once el saw no mutation for quietMs, or with false after timeoutMs
+_SETTLE_SCRIPT = """(el, [quietMs, timeoutMs]) => new Promise(resolve => {
+    let quiet = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quiet);
+        quiet = setTimeout(() => done(true), quietMs);
+    });
+    const limit = setTimeout(() => done(false), timeoutMs);
+    const done = settled => {
+        observer.disconnect();
+        clearTimeout(quiet);
+        clearTimeout(limit);
+        resolve(settled);
+    };
+    observer.observe(el, {childList: true, subtree: true, characterData: true, attributes: true});
+    quiet = setTimeout(() => done(true), quietMs);
+})"""
+
+# Resolves once el's text differs from previous, or with false after timeoutMs
+_CHANGE_SCRIPT = """(el, [previous, timeoutMs]) => new Promise(resolve => {
+    const observer = new MutationObserver(() => check());
+    const limit = setTimeout(() => { observer.disconnect(); resolve(false); }, timeoutMs);
+    const check = () => {
+        if (el.textContent === previous) return false;
+        observer.disconnect();
+        clearTimeout(limit);
+        resolve(true);
+        return true;
+    };
+    if (!check()) observer.observe(el, {childList: true, subtree: true, characterData: true});
+})"""
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def stage_timeout(stage):
+    """Timeout of stage in milliseconds"""
+    value = os.environ.get(f"WAIT_TIMEOUT_{stage.upper()}")
+    return int(value) if value else STAGE_TIMEOUTS[stage]
+
+
+def record_wait(vendor, stage, elapsed, replaced=0, timed_out=False):
+    """Count one wait of elapsed seconds that replaced a replaced-second sleep"""
+    with _stats_lock:
+        counters = _stats.setdefault(vendor, {}).setdefault(stage, {
+            "waits": 0, "timeouts": 0, "waited": 0.0, "max": 0.0, "replaced": 0.0,
+        })
+        counters["waits"] += 1
+        counters["timeouts"] += bool(timed_out)
+        counters["waited"] += elapsed
+        counters["max"] = max(counters["max"], elapsed)
+        counters["replaced"] += replaced
+    if stage == "form":
+        # A form that never loads under a request filter profile points at the profile
+        record_form_wait(vendor, timed_out)
+
+
+def wait_stats():
+    """Per vendor and stage: waits, timeouts, average and max wait, old sleep time, time saved"""
+    with _stats_lock:
+        return {
+            vendor: {
+                stage: {
+                    "waits": counters["waits"],
+                    "timeouts": counters["timeouts"],
+                    "avg_ms": round(1000 * counters["waited"] / counters["waits"]),
+                    "max_ms": round(1000 * counters["max"]),
+                    "replaced_sleep_ms": round(1000 * counters["replaced"]),
+                    "saved_ms": round(1000 * (counters["replaced"] - counters["waited"])),
+                }
+                for stage, counters in stages.items()
+            }
+            for vendor, stages in _stats.items()
+        }
+
+
+@contextmanager
+def timed_wait(vendor, stage, replaced=0):
+    """Record how long the block took; an exception counts as a timeout"""
+    started = time.monotonic()
+    try:
+        yield
+    except Exception:
+        record_wait(vendor, stage, time.monotonic() - started, replaced, timed_out=True)
+        raise
+    record_wait(vendor, stage, time.monotonic() - started, replaced)
+
+
+@asynccontextmanager
+async def timed_wait_async(vendor, stage, replaced=0):
+    started = time.monotonic()
+    try:
+        yield
+    except Exception:
+        record_wait(vendor, stage, time.monotonic() - started, replaced, timed_out=True)
+        raise
+    record_wait(vendor, stage, time.monotonic() - started, replaced)
+
+
+def wait_for(locator, vendor, stage, replaced=0, state="visible"):
+    """Wait for locator to reach state, raising when the stage times out"""
+    with timed_wait(vendor, stage, replaced):
+        locator.wait_for(state=state, timeout=stage_timeout(stage))
+
+
+async def wait_for_async(locator, vendor, stage, replaced=0, state="visible"):
+    async with timed_wait_async(vendor, stage, replaced):
+        await locator.wait_for(state=state, timeout=stage_timeout(stage))
+
+
+@contextmanager
+def expect_response(page, matches, vendor, stage="results", replaced=0):
+    """Wait, on leaving the block, for a response matching matches(response)"""
+    with timed_wait(vendor, stage, replaced):
+        with page.expect_response(matches, timeout=stage_timeout(stage)) as response_info:
+            yield response_info
+
+
+@asynccontextmanager
+async def expect_response_async(page, matches, vendor, stage="results", replaced=0):
+    async with timed_wait_async(vendor, stage, replaced):
+        async with page.expect_response(matches, timeout=stage_timeout(stage)) as response_info:
+            yield response_info
+
+
+@contextmanager
+def expect_navigation(page, vendor, stage="navigation", replaced=0):
+    """Wait, on leaving the block, for the navigation it triggered to reach DOMContentLoaded"""
+    with timed_wait(vendor, stage, replaced):
+        with page.expect_navigation(wait_until="domcontentloaded", timeout=stage_timeout(stage)) as navigation:
+            yield navigation
+
+
+@asynccontextmanager
+async def expect_navigation_async(page, vendor, stage="navigation", replaced=0):
+    async with timed_wait_async(vendor, stage, replaced):
+        async with page.expect_navigation(wait_until="domcontentloaded", timeout=stage_timeout(stage)) as navigation:
+            yield navigation
+
+
+def wait_for_change(locator, previous, vendor, stage="update", replaced=0):
+    """Wait until the text of locator differs from previous; False on timeout"""
+    timeout = stage_timeout(stage)
+    with timed_wait(vendor, stage, replaced):
+        return locator.evaluate(_CHANGE_SCRIPT, [previous, timeout], timeout=timeout)
+
+
+def settle(locator, vendor, stage="render", replaced=0):
+    """Wait until nothing under locator changed for WAIT_QUIET_MS; False when it never did"""
+    timeout = stage_timeout(stage)
+    try:
+        with timed_wait(vendor, stage, replaced):
+            return locator.evaluate(_SETTLE_SCRIPT, [WAIT_QUIET_MS, timeout], timeout=timeout)
+    except Exception as e:
+        print(f"Could not wait for the page to settle: {e}")
+        return False
+
+
+async def settle_async(locator, vendor, stage="render", replaced=0):
+    timeout = stage_timeout(stage)
+    try:
+        async with timed_wait_async(vendor, stage, replaced):
+            return await locator.evaluate(_SETTLE_SCRIPT, [WAIT_QUIET_MS, timeout], timeout=timeout)
+    except Exception as e:
+        print(f"Could not wait for the page to settle: {e}")
+        return False
+
+
+def wait_until(condition, vendor, stage, replaced=0):
+    """Poll condition() until it is true; False when the stage times out"""
+    deadline = time.monotonic() + stage_timeout(stage) / 1000
+    started = time.monotonic()
+    while True:
+        try:
+            if condition():
+                record_wait(vendor, stage, time.monotonic() - started, replaced)
+                return True
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            record_wait(vendor, stage, time.monotonic() - started, replaced, timed_out=True)
+            return False
+        time.sleep(WAIT_POLL_INTERVAL)
+
+
+async def wait_until_async(condition, vendor, stage, replaced=0):
+    """condition is a coroutine function here"""
+    deadline = time.monotonic() + stage_timeout(stage) / 1000
+    started = time.monotonic()
+    while True:
+        try:
+            if await condition():
+                record_wait(vendor, stage, time.monotonic() - started, replaced)
+                return True
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            record_wait(vendor, stage, time.monotonic() - started, replaced, timed_out=True)
+            return False
+        await asyncio.sleep(WAIT_POLL_INTERVAL)
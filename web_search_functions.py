@@ -1,49 +1,110 @@
+import os
+from functools import partial
+
+from catalog import catalog_lookup
+from result_cache import cached_search
+
 # Import the original working search functions directly
 from systemgeneralsearch import search_part_number_in_system_general_limited as original_system_general_search
 from dataiosearch import search_part_number_in_dataio as original_dataio_search  
 from bpmicrosearch import search_part_number_in_bpmicro as original_bpmicro_search
 
+# "sync" runs the Playwright sync flows on the browser pool, "async" submits
+# them to the shared event loop in async_engine
+SEARCH_ENGINE = os.environ.get("SEARCH_ENGINE", "sync").lower()
+
+# Websites whose search tries a direct HTTP request before any browser
+DIRECT_BACKENDS = {"systemgeneral", "dataio", "bpmicro"}
+
+_ORIGINAL_SEARCHES = {
+    "systemgeneral": original_system_general_search,
+    "dataio": original_dataio_search,
+    "bpmicro": original_bpmicro_search,
+}
+
+
+def live_search(website, original_part_number, cancel_event=None, part_variations=None, meta=None):
+    """Search one website now, without the result cache"""
+    original_search = _ORIGINAL_SEARCHES[website]
+    if SEARCH_ENGINE == "async":
+        import async_engine
+
+        def browser_search(part_number, part_variations=None):
+            return async_engine.search(
+                website, part_number, cancel_event=cancel_event, part_variations=part_variations
+            )
+
+        if website in DIRECT_BACKENDS:
+            return original_search(
+                original_part_number, cancel_event=cancel_event, browser_search=browser_search,
+                part_variations=part_variations, meta=meta,
+            )
+        return browser_search(original_part_number, part_variations)
+    return original_search(original_part_number, cancel_event=cancel_event, part_variations=part_variations, meta=meta)
+
+
+def _run_search(website, original_part_number, cancel_event=None, no_cache=False, meta=None, hints=None):
+    result = None
+    if not no_cache:
+        result = catalog_lookup(website, original_part_number)
+        if result:
+            print(f"Found {original_part_number} on {website} in the local catalog")
+            if meta is not None:
+                meta["catalog"] = True
+    if not result:
+        result = cached_search(
+            website, original_part_number, partial(live_search, website),
+            no_cache=no_cache, meta=meta, cancel_event=cancel_event, hints=hints,
+        )
+    if result and hints is not None:
+        hints.publish(website, original_part_number, result[1])
+    return result
+
 
-def search_part_number_in_system_general_limited(original_part_number):
+def search_part_number_in_system_general_limited(original_part_number, cancel_event=None, no_cache=False, meta=None,
+                                                 hints=None):
     """Use the original working System General search function with Playwright"""
     try:
         print(f"Starting System General search for: {original_part_number}")
-        result = original_system_general_search(original_part_number)
+        result = _run_search("systemgeneral", original_part_number, cancel_event, no_cache, meta, hints)
         if result:
             print(f"System General search completed successfully: {result}")
         else:
             print("System General search completed - no results found")
         return result
     except Exception as e:
+        # Errors must not read as "no results", the caller reports them
         print(f"Error in System General search: {e}")
-        return None
+        raise
 
 
-def search_part_number_in_dataio(original_part_number):
+def search_part_number_in_dataio(original_part_number, cancel_event=None, no_cache=False, meta=None, hints=None):
     """Use the original working DataIO search function with Playwright"""
     try:
         print(f"Starting DataIO search for: {original_part_number}")
-        result = original_dataio_search(original_part_number)
+        result = _run_search("dataio", original_part_number, cancel_event, no_cache, meta, hints)
         if result:
             print(f"DataIO search completed successfully: {result}")
         else:
             print("DataIO search completed - no results found")
         return result
     except Exception as e:
+        # Errors must not read as "no results", the caller reports them
         print(f"Error in DataIO search: {e}")
-        return None
+        raise
 
 
-def search_part_number_in_bpmicro(original_part_number):
+def search_part_number_in_bpmicro(original_part_number, cancel_event=None, no_cache=False, meta=None, hints=None):
     """Use the original working BPMicro search function with Playwright"""
     try:
         print(f"Starting BPMicro search for: {original_part_number}")
-        result = original_bpmicro_search(original_part_number)
+        result = _run_search("bpmicro", original_part_number, cancel_event, no_cache, meta, hints)
         if result:
             print(f"BPMicro search completed successfully: {result}")
         else:
             print("BPMicro search completed - no results found")
         return result
     except Exception as e:
+        # Errors must not read as "no results", the caller reports them
         print(f"Error in BPMicro search: {e}")
-        return None
+        raise